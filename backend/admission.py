@@ -0,0 +1,146 @@
+import asyncio
+import math
+import random
+import time
+from collections import deque
+from typing import Deque, Dict
+
+import httpx
+
+import metrics
+
+
+class AdmissionRejected(Exception):
+    """No slot is free and the wait queue is full, or the wait timed out."""
+
+    def __init__(self, retry_after: int, reason: str):
+        super().__init__(reason)
+        self.retry_after = retry_after
+
+
+class Lease:
+    """One admitted chat turn; ``release`` gives its slot to the next waiter."""
+    __slots__ = ("_controller", "_started", "_released")
+
+    def __init__(self, controller: "AdmissionController"):
+        self._controller = controller
+        self._started = time.monotonic()
+        self._released = False
+
+    def release(self):
+        if not self._released:
+            self._released = True
+            self._controller._release(time.monotonic() - self._started)
+
+
+class AdmissionController:
+    """Caps how many chat turns run at once, with a bounded FIFO wait queue.
+
+    Up to ``max_concurrent`` turns hold a slot; up to ``max_queue`` more wait
+    at most ``queue_timeout`` seconds for one. Anything beyond that is
+    rejected at once, so a traffic spike turns into quick 429s instead of
+    a pile of agent runs hitting provider rate limits. ``Retry-After`` is
+    estimated from how long recent turns held their slot.
+
+    Runs on the event loop only, so it needs no lock.
+    """
+
+    def __init__(self, max_concurrent: int, max_queue: int, queue_timeout: float):
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self._active = 0
+        self._waiters: Deque[asyncio.Future] = deque()
+        # Moving average of slot hold time, seconds
+        self._turn_seconds = 5.0
+        self.admitted = 0
+        self.queued = 0
+        self.rejected = 0
+        self.timed_out = 0
+
+    def retry_after(self) -> int:
+        """Seconds until a new request would likely get a slot."""
+        turns_ahead = len(self._waiters) + 1
+        return max(1, math.ceil(self._turn_seconds * turns_ahead / self.max_concurrent))
+
+    async def acquire(self) -> Lease:
+        if self._active < self.max_concurrent and not self._waiters:
+            self._active += 1
+            self.admitted += 1
+            return Lease(self)
+        if len(self._waiters) >= self.max_queue:
+            self.rejected += 1
+            metrics.CHAT_REJECTED.labels("queue_full").inc()
+            raise AdmissionRejected(self.retry_after(), "Too many chat requests in progress.")
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        self.queued += 1
+        try:
+            await asyncio.wait_for(waiter, self.queue_timeout)
+        except asyncio.TimeoutError:
+            self._discard(waiter)
+            self.timed_out += 1
+            metrics.CHAT_REJECTED.labels("queue_timeout").inc()
+            raise AdmissionRejected(self.retry_after(), "Timed out waiting for a free chat slot.")
+        except asyncio.CancelledError:
+            # The slot may have been handed over just as the client went away
+            if waiter.done() and not waiter.cancelled():
+                self._release(0.0)
+            else:
+                self._discard(waiter)
+            raise
+        self.admitted += 1
+        return Lease(self)
+
+    def _discard(self, waiter: asyncio.Future):
+        try:
+            self._waiters.remove(waiter)
+        except ValueError:
+            pass
+
+    def _release(self, held_seconds: float):
+        if held_seconds:
+            self._turn_seconds = 0.8 * self._turn_seconds + 0.2 * held_seconds
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                # Hand the slot over directly, so a newcomer can't jump the queue
+                waiter.set_result(None)
+                return
+        self._active -= 1
+
+    def stats(self) -> Dict[str, object]:
+        return {
+            "max_concurrent": self.max_concurrent,
+            "max_queue": self.max_queue,
+            "active": self._active,
+            "waiting": len(self._waiters),
+            "admitted": self.admitted,
+            "queued": self.queued,
+            "rejected": self.rejected,
+            "timed_out": self.timed_out,
+            "avg_turn_seconds": round(self._turn_seconds, 3),
+        }
+
+
+_RETRYABLE_STATUS = {408, 429, 500, 502, 503, 504, 529}
+
+
+def is_retryable(error: BaseException) -> bool:
+    """Rate limits, timeouts, dropped connections and 5xx from a provider; not bad requests or auth."""
+    if isinstance(error, (httpx.TimeoutException, httpx.NetworkError, ConnectionError, TimeoutError)):
+        return True
+    status = getattr(error, "status_code", None)
+    if status is None:
+        status = getattr(getattr(error, "response", None), "status_code", None)
+    if status is not None:
+        return status in _RETRYABLE_STATUS
+    # SDK errors that carry no status: openai.APIConnectionError, APITimeoutError, ...
+    name = type(error).__name__
+    return any(word in name for word in ("RateLimit", "Timeout", "Connection", "Overloaded"))
+
+
+def backoff_delay(attempt: int, base: float) -> float:
+    """Exponential backoff with jitter, the same shape as the embedding pipeline's retries."""
+    return base * 2 ** attempt * random.uniform(0.5, 1.5)
@@ -0,0 +1,165 @@
+"""Concurrent booking mutations: correctness under contention and throughput.
+
+Worker threads read a booking and write it back with ``expected_version``
+set to the version they read: a seat change or a flight change. Every write
+either applies or fails with ``BookingConflictError`` (or
+``SeatUnavailableError`` when the seat is taken). Afterwards each
+booking's version must equal 1 plus its applied writes, so no update was
+lost, the date/route indexes must hold each booking exactly once, and no
+two bookings on a flight may share a seat.
+
+Runs with the default lock stripes and with a single lock, to show that
+writes to different bookings do not serialize.
+
+    python benchmarks/booking_concurrency.py --threads 16 --ops 20000 --bookings 1000
+    python benchmarks/booking_concurrency.py --store sqlite --bookings 50
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from booking_service import LOCK_STRIPES, BookingConflictError, BookingData, BookingService
+from models import BookingClass, BookingRecord, BookingStatus
+from seat_inventory import SeatUnavailableError, flight_key
+
+AIRPORTS = ["LAX", "YVR", "JFK", "LHR", "CDG", "ARN", "HEL", "HND", "MUC", "FRA", "MAD", "FUN", "SJC"]
+
+
+def make_records(count: int):
+    rng = random.Random(7)
+    return [
+        BookingRecord(
+            booking_number=str(1000 + i),
+            ticket_number=f"FN{100000 + i}",
+            date=date.today() + timedelta(days=rng.randint(10, 300)),
+            first_name="Load",
+            last_name=f"Test{i}",
+            status=BookingStatus.CONFIRMED,
+            from_airport=rng.choice(AIRPORTS),
+            to_airport=rng.choice(AIRPORTS),
+            seat_number=f"{i // 6 % 30 + 1}{'ABCDEF'[i % 6]}",
+            booking_class=BookingClass.ECONOMY,
+        )
+        for i in range(count)
+    ]
+
+
+def make_service(store: str, bookings: int, stripes: int, tmp_dir: str) -> BookingService:
+    if store == "sqlite":
+        from booking_store import SQLiteBookingData
+        path = os.path.join(tmp_dir, f"bookings-{stripes}.db")
+        db = SQLiteBookingData(path, pool_size=32)
+        db.add_bookings(make_records(bookings))
+    else:
+        db = BookingData()
+        db.bookings = []
+        db._rebuild_indexes()
+        for record in make_records(bookings):
+            db.add_booking(record)
+    return BookingService(db=db, lock_stripes=stripes)
+
+
+def worker(service: BookingService, keys, ops: int, seed: int, applied: Counter, conflicts: Counter,
+           seats_taken: Counter):
+    rng = random.Random(seed)
+    for n in range(ops):
+        number, first_name, last_name = rng.choice(keys)
+        version = service.find_booking(number, first_name, last_name).version
+        try:
+            if rng.random() < 0.8:
+                service.change_seat(number, first_name, last_name, f"{rng.randint(1, 30)}{rng.choice('ABCDEF')}",
+                                    expected_version=version)
+            else:
+                new_date = (date.today() + timedelta(days=rng.randint(10, 300))).isoformat()
+                service.change_booking(number, first_name, last_name, new_date,
+                                       rng.choice(AIRPORTS), rng.choice(AIRPORTS), expected_version=version)
+            applied[number] += 1
+        except BookingConflictError:
+            conflicts[number] += 1
+        except SeatUnavailableError:
+            seats_taken[number] += 1
+
+
+def check(service: BookingService, keys, applied: Counter) -> list:
+    errors = []
+    for number, first_name, last_name in keys:
+        booking = service.find_booking(number, first_name, last_name)
+        if booking.version != 1 + applied[number]:
+            errors.append(f"booking {number}: version {booking.version}, applied writes {applied[number]}")
+    seats = Counter(
+        (flight_key(b.date, b.from_airport, b.to_airport), b.seat_number)
+        for b in (service.find_booking(*key) for key in keys)
+    )
+    for (flight, seat), count in seats.items():
+        if count > 1:
+            errors.append(f"seat {seat} on {flight[0]} {flight[1]}-{flight[2]} assigned {count} times")
+        elif seat not in service.get_seat_map(*flight)["occupied"]:
+            errors.append(f"seat {seat} on {flight[0]} {flight[1]}-{flight[2]} missing from the seat inventory")
+    db = service.db
+    if isinstance(db, BookingData):
+        by_date = Counter(b.booking_number for bucket in db._by_date.values() for b in bucket)
+        by_route = Counter(b.booking_number for bucket in db._by_route.values() for b in bucket)
+        for booking in db.bookings:
+            if by_date[booking.booking_number] != 1 or booking not in db._by_date[booking.date]:
+                errors.append(f"booking {booking.booking_number}: date index out of sync")
+            route = (booking.from_airport.upper(), booking.to_airport.upper())
+            if by_route[booking.booking_number] != 1 or booking not in db._by_route[route]:
+                errors.append(f"booking {booking.booking_number}: route index out of sync")
+    return errors
+
+
+def run(store: str, threads: int, ops: int, bookings: int, stripes: int, tmp_dir: str):
+    service = make_service(store, bookings, stripes, tmp_dir)
+    keys = [(r.booking_number, r.first_name, r.last_name) for r in make_records(bookings)]
+    # One pair of counters per thread, merged afterwards; Counter updates are not atomic
+    counters = [(Counter(), Counter(), Counter()) for _ in range(threads)]
+    per_thread = ops // threads
+    pool = [
+        threading.Thread(target=worker, args=(service, keys, per_thread, seed, *counters[seed]))
+        for seed in range(threads)
+    ]
+    started = time.perf_counter()
+    for t in pool:
+        t.start()
+    for t in pool:
+        t.join()
+    seconds = time.perf_counter() - started
+    applied = sum((a for a, _, _ in counters), Counter())
+    conflicts = sum((c for _, c, _ in counters), Counter())
+    seats_taken = sum((t for _, _, t in counters), Counter())
+
+    errors = check(service, keys, applied)
+    total = per_thread * threads
+    print(f"{store:<7} stripes={stripes:<4} {total / seconds:>10,.0f} ops/s  "
+          f"applied {sum(applied.values()):>7,}  conflicts {sum(conflicts.values()):>6,}  "
+          f"seats taken {sum(seats_taken.values()):>6,}  "
+          f"{'OK' if not errors else f'{len(errors)} ERRORS'}")
+    for error in errors[:10]:
+        print(f"  {error}")
+    return not errors
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--store", choices=["memory", "sqlite"], default="memory")
+    parser.add_argument("--threads", type=int, default=16)
+    parser.add_argument("--ops", type=int, default=20_000)
+    parser.add_argument("--bookings", type=int, default=1000, help="fewer bookings means more contention")
+    args = parser.parse_args()
+    print(f"{args.threads} threads, {args.ops:,} ops on {args.bookings:,} bookings")
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        ok = all(run(args.store, args.threads, args.ops, args.bookings, stripes, tmp_dir)
+                 for stripes in (LOCK_STRIPES, 1))
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+"""Memory per booking and serialization throughput of the booking layouts.
+
+Compares the original nested pydantic ``Booking`` rows (serialized through a
+``BookingDetails`` model) with the compact ``BookingRecord`` rows used by the
+booking stores (serialized straight to JSON).
+
+    python benchmarks/booking_memory.py --rows 1000000
+"""
+import argparse
+import gc
+import os
+import random
+import sys
+import time
+import tracemalloc
+from datetime import date
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models import Booking, BookingClass, BookingDetails, BookingRecord, BookingStatus, Customer
+
+AIRPORTS = ["LAX", "YVR", "JFK", "LHR", "CDG", "ARN", "HEL", "HND", "MUC", "FRA", "MAD", "FUN", "SJC"]
+FIRST_NAMES = ["Frank", "Danny", "Michael", "Eugenia", "Robert", "Ana", "Li", "Sara"]
+LAST_NAMES = ["Li", "Smith", "Wu", "Williams", "Xiong", "Garcia", "Khan", "Novak"]
+
+
+def _fresh(value: str) -> str:
+    # A new string object, the way rows arrive from a parser or a database
+    return value.encode().decode()
+
+
+def _fields(i: int, rng: random.Random) -> dict:
+    first_name = rng.choice(FIRST_NAMES)
+    last_name = rng.choice(LAST_NAMES)
+    return dict(
+        booking_number=str(100 + i),
+        ticket_number=f"FN{rng.randint(100000, 999999)}",
+        date=date.fromordinal(date.today().toordinal() + rng.randint(0, 365)),
+        first_name=first_name,
+        last_name=last_name,
+        email=f"{first_name.lower()}.{last_name.lower()}@example.com",
+        status=rng.choice(list(BookingStatus)),
+        from_airport=_fresh(rng.choice(AIRPORTS)),
+        to_airport=_fresh(rng.choice(AIRPORTS)),
+        seat_number=f"{rng.randint(1, 30)}{rng.choice('ABCDEF')}",
+        booking_class=rng.choice(list(BookingClass)),
+    )
+
+
+def build_pydantic(i: int, rng: random.Random) -> Booking:
+    f = _fields(i, rng)
+    return Booking(
+        booking_number=f["booking_number"],
+        ticket_number=f["ticket_number"],
+        date=f["date"],
+        customer=Customer(first_name=f["first_name"], last_name=f["last_name"], email=f["email"]),
+        status=f["status"],
+        from_airport=f["from_airport"],
+        to_airport=f["to_airport"],
+        seat_number=f["seat_number"],
+        booking_class=f["booking_class"],
+    )
+
+
+def build_record(i: int, rng: random.Random) -> BookingRecord:
+    return BookingRecord(**_fields(i, rng))
+
+
+def serialize_pydantic(booking: Booking) -> str:
+    return BookingDetails(
+        booking_number=booking.booking_number,
+        ticket_number=booking.ticket_number,
+        first_name=booking.customer.first_name,
+        last_name=booking.customer.last_name,
+        date=booking.date,
+        booking_status=booking.status,
+        from_airport=booking.from_airport,
+        to_airport=booking.to_airport,
+        seat_number=booking.seat_number,
+        booking_class=booking.booking_class.value,
+    ).model_dump_json()
+
+
+def serialize_record(booking: BookingRecord) -> str:
+    return booking.to_json()
+
+
+def measure(name: str, build, serialize, rows: int):
+    rng = random.Random(42)
+    gc.collect()
+    tracemalloc.start()
+    data = [build(i, rng) for i in range(rows)]
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    started = time.perf_counter()
+    for row in data:
+        serialize(row)
+    serialize_seconds = time.perf_counter() - started
+
+    print(f"{name:<22} {current / rows:>8.0f} B/row  serialize {rows / serialize_seconds:>10,.0f} rows/s")
+    del data
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    args = parser.parse_args()
+    print(f"{args.rows:,} rows")
+    measure("pydantic Booking", build_pydantic, serialize_pydantic, args.rows)
+    measure("BookingRecord", build_record, serialize_record, args.rows)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+"""Seeded generator of synthetic bookings for the benchmarks.
+
+The same seed and count always produce the same bookings. Booking numbers
+are unique and start at 100000, so they never collide with the demo data.
+Bookings that hold a seat never share it with another on the same flight.
+
+    python benchmarks/datagen.py --count 1000000 --sqlite /tmp/bookings.db
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from datetime import date, timedelta
+from typing import Iterator, Optional
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from booking_service import BookingData
+from models import BookingClass, BookingRecord, BookingStatus
+
+AIRPORTS = ["LAX", "YVR", "JFK", "LHR", "CDG", "ARN", "HEL", "HND", "MUC", "FRA", "MAD", "FUN", "SJC"]
+FIRST_NAMES = ["Frank", "Danny", "Michael", "Eugenia", "Robert", "Ana", "Li", "Sara", "Omar", "Yuki"]
+LAST_NAMES = ["Li", "Smith", "Wu", "Williams", "Xiong", "Garcia", "Khan", "Novak", "Tanaka", "Berg"]
+FIRST_NUMBER = 100_000
+
+# Roughly what an airline's booking table looks like
+_STATUS_WEIGHTS = [(BookingStatus.CONFIRMED, 85), (BookingStatus.CANCELLED, 10), (BookingStatus.COMPLETED, 5)]
+_CLASS_WEIGHTS = [(BookingClass.ECONOMY, 75), (BookingClass.PREMIUM_ECONOMY, 15), (BookingClass.BUSINESS, 10)]
+
+
+def _weighted(weights) -> list:
+    return [value for value, weight in weights for _ in range(weight)]
+
+
+def generate_bookings(count: int, seed: int = 0, start: Optional[date] = None,
+                      days: int = 365) -> Iterator[BookingRecord]:
+    """Yield ``count`` bookings spread over ``days`` days from ``start`` (default: tomorrow).
+
+    Each flight hands out its seats in order from a random first seat.
+    Cancelled bookings hold no seat, so theirs is drawn freely; a booking
+    for a flight with no seat left is generated as cancelled.
+    """
+    rng = random.Random(seed)
+    start = start or date.today() + timedelta(days=1)
+    dates = [start + timedelta(days=d) for d in range(days)]
+    routes = [(a, b) for a in AIRPORTS for b in AIRPORTS if a != b]
+    seats = [f"{row}{letter}" for row in range(1, 31) for letter in "ABCDEF"]
+    statuses = _weighted(_STATUS_WEIGHTS)
+    classes = _weighted(_CLASS_WEIGHTS)
+    # Cheaper than rng.choice, which adds up over millions of rows
+    uniform = rng.random
+
+    # (date, route) -> [first seat, seats taken]
+    flights = {}
+
+    def pick(values: list):
+        return values[int(uniform() * len(values))]
+
+    for i in range(count):
+        route = pick(routes)
+        flight_date = pick(dates)
+        status = pick(statuses)
+        if status == BookingStatus.CANCELLED:
+            seat = pick(seats)
+        else:
+            flight = flights.get((flight_date, route))
+            if flight is None:
+                flight = flights[(flight_date, route)] = [int(uniform() * len(seats)), 0]
+            if flight[1] < len(seats):
+                seat = seats[(flight[0] + flight[1]) % len(seats)]
+                flight[1] += 1
+            else:
+                status, seat = BookingStatus.CANCELLED, pick(seats)
+        yield BookingRecord(
+            booking_number=str(FIRST_NUMBER + i),
+            ticket_number=f"FN{100000 + int(uniform() * 900000)}",
+            date=flight_date,
+            first_name=pick(FIRST_NAMES),
+            last_name=pick(LAST_NAMES),
+            status=status,
+            from_airport=route[0],
+            to_airport=route[1],
+            seat_number=seat,
+            booking_class=pick(classes),
+        )
+
+
+def fill_booking_data(count: int, seed: int = 0) -> BookingData:
+    """An in-memory ``BookingData`` holding only generated bookings, with its indexes built."""
+    db = BookingData()
+    db.bookings = list(generate_bookings(count, seed))
+    db._rebuild_indexes()
+    return db
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--count", type=int, default=1_000_000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--sqlite", help="write the bookings to this SQLite database instead")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    if args.sqlite:
+        from booking_store import SQLiteBookingData
+        db = SQLiteBookingData(args.sqlite)
+        db.add_bookings(generate_bookings(args.count, args.seed))
+        total = db.count()
+    else:
+        total = len(fill_booking_data(args.count, args.seed).bookings)
+    print(f"{total:,} bookings in {time.perf_counter() - started:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,154 @@
+"""Local stand-ins for the chat model and the embedding provider.
+
+Both are deterministic and need no network, so the benchmarks measure this
+service rather than a provider. Optional delays simulate provider latency.
+"""
+import asyncio
+import json
+import re
+import time
+import zlib
+from itertools import count
+from typing import AsyncIterator, Iterator, List
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage, HumanMessage, ToolMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+
+_BOOKING = re.compile(r"\b(?:booking|reservation)\s*(?:number\s*)?#?\s*(\d{3,10})\b", re.IGNORECASE)
+_NAME = re.compile(r"\bfor\s+([A-Z][a-z'-]+)\s+([A-Z][a-z'-]+)")
+_DATE = re.compile(r"\b(\d{4}-\d{2}-\d{2})\b")
+_ROUTE = re.compile(r"\bfrom\s+([A-Z]{3})\s+to\s+([A-Z]{3})\b")
+_POLICY = re.compile(r"\b(fee|fees|refund|baggage|luggage|policy|cancellation|change|terms)\b", re.IGNORECASE)
+
+_FILLER = ("Thanks for reaching out to Funnair. I have looked into this for you and everything you asked "
+           "about is summarized here. Let me know if there is anything else I can help you with today.").split()
+
+
+class ScriptedChatModel(BaseChatModel):
+    """Chat model that answers like a tool-using agent, from rules instead of an LLM.
+
+    On a user message it calls the booking tool the request asks for
+    (``get_booking_details``, ``change_booking`` or ``cancel_booking``,
+    reading booking number, name, date and route from the text) and
+    ``search_rag_policy`` for policy keywords. Once the tool results are in,
+    it streams a reply of ``reply_tokens`` tokens that quotes them.
+    ``first_token_delay`` and ``token_delay`` are slept per call and per
+    token to simulate a remote model.
+    """
+
+    reply_tokens: int = 40
+    first_token_delay: float = 0.0
+    token_delay: float = 0.0
+
+    @property
+    def _llm_type(self) -> str:
+        return "scripted"
+
+    def bind_tools(self, tools, **kwargs):
+        return self
+
+    @staticmethod
+    def _tool_calls(text: str) -> List[dict]:
+        calls = []
+        booking = _BOOKING.search(text)
+        name = _NAME.search(text)
+        if booking and name:
+            args = {"booking_number": booking[1], "first_name": name[1], "last_name": name[2]}
+            lowered = text.lower()
+            if "cancel" in lowered:
+                calls.append({"name": "cancel_booking", "args": args})
+            elif "change" in lowered and _DATE.search(text) and _ROUTE.search(text):
+                route = _ROUTE.search(text)
+                calls.append({"name": "change_booking", "args": {
+                    **args, "new_date": _DATE.search(text)[1], "from_airport": route[1], "to_airport": route[2],
+                }})
+            else:
+                calls.append({"name": "get_booking_details", "args": args})
+        if _POLICY.search(text) and "?" in text:
+            calls.append({"name": "search_rag_policy", "args": {"query": text}})
+        return calls
+
+    def _reply(self, messages: List[BaseMessage]) -> AIMessage:
+        last = messages[-1]
+        if isinstance(last, HumanMessage):
+            calls = self._tool_calls(str(last.content))
+            if calls:
+                ids = count()
+                return AIMessage(content="", tool_calls=[
+                    {**call, "id": f"call_{len(messages)}_{next(ids)}"} for call in calls
+                ])
+        results = []
+        for message in reversed(messages):
+            if not isinstance(message, ToolMessage):
+                break
+            results.append(str(message.content)[:200])
+        words = (" ".join(results).split() + _FILLER) * (self.reply_tokens // len(_FILLER) + 1)
+        return AIMessage(content=" ".join(words[:self.reply_tokens]))
+
+    @staticmethod
+    def _chunks(message: AIMessage) -> Iterator[AIMessageChunk]:
+        if message.tool_calls:
+            yield AIMessageChunk(content="", tool_call_chunks=[
+                {"name": call["name"], "args": json.dumps(call["args"]), "id": call["id"], "index": i}
+                for i, call in enumerate(message.tool_calls)
+            ])
+            return
+        words = message.content.split(" ")
+        for i, word in enumerate(words):
+            yield AIMessageChunk(content=word if i == len(words) - 1 else word + " ")
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        message = self._reply(messages)
+        time.sleep(self.first_token_delay + self.token_delay * len(message.content.split()))
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    def _stream(self, messages, stop=None, run_manager=None, **kwargs) -> Iterator[ChatGenerationChunk]:
+        time.sleep(self.first_token_delay)
+        for i, chunk in enumerate(self._chunks(self._reply(messages))):
+            if i and self.token_delay:
+                time.sleep(self.token_delay)
+            generation = ChatGenerationChunk(message=chunk)
+            if run_manager and chunk.content:
+                run_manager.on_llm_new_token(chunk.content, chunk=generation)
+            yield generation
+
+    async def _astream(self, messages, stop=None, run_manager=None, **kwargs) -> AsyncIterator[ChatGenerationChunk]:
+        await asyncio.sleep(self.first_token_delay)
+        for i, chunk in enumerate(self._chunks(self._reply(messages))):
+            if i and self.token_delay:
+                await asyncio.sleep(self.token_delay)
+            generation = ChatGenerationChunk(message=chunk)
+            if run_manager and chunk.content:
+                await run_manager.on_llm_new_token(chunk.content, chunk=generation)
+            yield generation
+
+
+class HashEmbeddings(Embeddings):
+    """Deterministic bag-of-words embeddings: each word adds to a hashed dimension.
+
+    Texts that share words get similar vectors, so retrieval results are
+    meaningful. Vectors are identical across processes and runs. ``delay``
+    is slept per call to simulate a remote provider.
+    """
+
+    def __init__(self, dimensions: int = 256, delay: float = 0.0):
+        self.dimensions = dimensions
+        self.delay = delay
+
+    def _embed(self, text: str) -> List[float]:
+        vector = np.zeros(self.dimensions, dtype=np.float32)
+        for word in re.findall(r"\w+", text.lower()):
+            vector[zlib.crc32(word.encode()) % self.dimensions] += 1.0
+        norm = np.linalg.norm(vector)
+        return (vector / norm if norm else vector).tolist()
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        if self.delay:
+            time.sleep(self.delay)
+        return [self._embed(text) for text in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed_documents([text])[0]
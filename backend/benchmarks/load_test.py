@@ -0,0 +1,256 @@
+"""Latency percentiles and throughput of the main request paths, offline.
+
+The chat model and the embedding provider are replaced by the local fakes
+in ``fakes.py`` and the booking store is filled by ``datagen.py``, so no
+network or API key is needed. Each target runs ``--requests`` operations at
+every ``--concurrency`` level and reports throughput, p50 and p99:
+
+- ``find_booking``: ``BookingService.find_booking`` from a thread pool
+- ``bookings``: ``GET /api/bookings`` pages, with and without filters
+- ``rag``: ``RAGService.search`` from a thread pool
+- ``chat``: ``POST /api/chat/stream``, also reporting time to first chunk
+
+HTTP targets go through uvicorn on a loopback port. The client runs in the
+same process as the server, so absolute numbers are pessimistic; compare
+runs on the same machine.
+
+    python benchmarks/load_test.py --bookings 1000000 --concurrency 1,8,32
+    python benchmarks/load_test.py --targets chat --llm-first-token 0.3 --llm-token-delay 0.02
+"""
+import argparse
+import asyncio
+import os
+import random
+import shutil
+import socket
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Awaitable, Callable, List, NamedTuple, Optional
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+POLICY_QUESTIONS = [
+    "What is the change fee for economy tickets?",
+    "Can I get a refund if I cancel my booking?",
+    "How much baggage can I bring on board?",
+    "What happens if I miss my flight?",
+    "Are there fees for changing the date of travel?",
+    "What is the cancellation policy within 48 hours?",
+]
+
+
+class Result(NamedTuple):
+    latencies: List[float]
+    first_chunk: List[float]
+    errors: int
+    seconds: float
+
+
+def percentile(values: List[float], p: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * p))]
+
+
+def report(target: str, concurrency: int, result: Result):
+    done = len(result.latencies)
+    line = (f"{target:<13} c={concurrency:<4} {done / result.seconds:>9,.0f} req/s  "
+            f"p50 {percentile(result.latencies, 0.5) * 1000:>8.2f} ms  "
+            f"p99 {percentile(result.latencies, 0.99) * 1000:>8.2f} ms")
+    if result.first_chunk:
+        line += (f"  first chunk p50 {percentile(result.first_chunk, 0.5) * 1000:>7.2f} ms"
+                 f" p99 {percentile(result.first_chunk, 0.99) * 1000:>7.2f} ms")
+    if result.errors:
+        line += f"  {result.errors} errors"
+    print(line)
+
+
+def run_threads(op: Callable[[random.Random], None], concurrency: int, requests: int) -> Result:
+    """Run ``requests`` calls of ``op`` spread over ``concurrency`` threads."""
+    per_thread = [[] for _ in range(concurrency)]
+    errors = [0] * concurrency
+
+    def worker(n: int):
+        rng = random.Random(n)
+        for _ in range(requests // concurrency):
+            started = time.perf_counter()
+            try:
+                op(rng)
+            except Exception:
+                errors[n] += 1
+                continue
+            per_thread[n].append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(worker, range(concurrency)))
+    seconds = time.perf_counter() - started
+    return Result([x for xs in per_thread for x in xs], [], sum(errors), seconds)
+
+
+async def run_tasks(op: Callable[..., Awaitable[Optional[float]]], concurrency: int, requests: int,
+                    base_url: str) -> Result:
+    """Run ``requests`` HTTP operations from ``concurrency`` tasks sharing one client.
+
+    ``op(client, rng, n)`` returns the time to the first response chunk, or None.
+    """
+    import httpx
+
+    latencies, first_chunk = [], []
+    errors = 0
+    counter = iter(range(requests))
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+
+    async with httpx.AsyncClient(base_url=base_url, timeout=120, limits=limits) as client:
+        async def worker(seed: int):
+            nonlocal errors
+            rng = random.Random(seed)
+            for n in counter:
+                started = time.perf_counter()
+                try:
+                    first = await op(client, rng, n)
+                except Exception:
+                    errors += 1
+                    continue
+                latencies.append(time.perf_counter() - started)
+                if first is not None:
+                    first_chunk.append(first)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker(seed) for seed in range(concurrency)))
+        seconds = time.perf_counter() - started
+    return Result(latencies, first_chunk, errors, seconds)
+
+
+def start_server(app) -> str:
+    """Serve ``app`` with uvicorn on a free loopback port in a daemon thread."""
+    import uvicorn
+
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning", lifespan="off"))
+    # Signal handlers can only be installed from the main thread
+    server.install_signal_handlers = lambda: None
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.01)
+    return f"http://127.0.0.1:{port}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--targets", default="find_booking,bookings,rag,chat")
+    parser.add_argument("--concurrency", default="1,8,32", help="comma-separated levels")
+    parser.add_argument("--requests", type=int, default=2000, help="operations per target and level")
+    parser.add_argument("--chat-requests", type=int, default=200, help="operations per level for chat")
+    parser.add_argument("--bookings", type=int, default=100_000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--llm-first-token", type=float, default=0.0, help="simulated seconds to first token")
+    parser.add_argument("--llm-token-delay", type=float, default=0.0, help="simulated seconds per token")
+    parser.add_argument("--embedding-delay", type=float, default=0.0, help="simulated seconds per embedding call")
+    parser.add_argument("--rag-cache", action="store_true", help="keep the RAG result cache on")
+    parser.add_argument("--router", action="store_true", help="let the intent router answer simple messages")
+    args = parser.parse_args()
+    targets = args.targets.split(",")
+    levels = [int(c) for c in args.concurrency.split(",")]
+
+    # Settings are read at import: keep indexes and caches away from the real ones
+    index_dir = tempfile.mkdtemp(prefix="rag-bench-")
+    os.environ.update({
+        "BOOKING_STORE": "memory",
+        "CHAT_CHECKPOINTER": "memory",
+        "RAG_INDEX_DIR": index_dir,
+        "RAG_EMBEDDING_CACHE_PATH": "",
+        "RAG_KNOWLEDGE_DIR": "",
+        "CHAT_INTENT_ROUTER": "true" if args.router else "false",
+    })
+    if not args.rag_cache:
+        os.environ["RAG_RESULT_CACHE_SIZE"] = "0"
+
+    import booking_service
+    import chat_service
+    import rag_service
+    from datagen import fill_booking_data
+    from fakes import HashEmbeddings, ScriptedChatModel
+
+    started = time.perf_counter()
+    booking_service._booking_service = service = booking_service.BookingService(
+        db=fill_booking_data(args.bookings, args.seed))
+    print(f"{args.bookings:,} bookings generated in {time.perf_counter() - started:.1f}s")
+    if "rag" in targets or "chat" in targets:
+        rag_service._rag_service = rag_service.RAGService(embeddings=HashEmbeddings(delay=args.embedding_delay))
+    if "chat" in targets:
+        chat_service._chat_service = chat_service.ChatService(llm=ScriptedChatModel(
+            first_token_delay=args.llm_first_token, token_delay=args.llm_token_delay))
+
+    sample = random.Random(args.seed).sample(service.db.bookings, min(1000, args.bookings))
+    keys = [(b.booking_number, b.first_name, b.last_name) for b in sample]
+    base_url = None
+    if "bookings" in targets or "chat" in targets:
+        from main import app
+        base_url = start_server(app)
+
+    def find_booking(rng: random.Random):
+        service.find_booking(*rng.choice(keys))
+
+    def rag_search(rng: random.Random):
+        query = rng.choice(POLICY_QUESTIONS)
+        if not args.rag_cache:
+            query += f" (ref {rng.random():.6f})"
+        rag_service.get_rag_service().search(query)
+
+    async def bookings_page(client, rng: random.Random, n: int) -> None:
+        params = rng.choice([
+            {"limit": 100},
+            {"limit": 100, "status": "CANCELLED"},
+            {"limit": 100, "airport": rng.choice(sample).from_airport},
+            {"limit": 100, "cursor": booking_service.encode_cursor(rng.randrange(len(service.db.bookings)))},
+        ])
+        response = await client.get("/api/bookings", params=params)
+        response.raise_for_status()
+
+    async def chat_turn(client, rng: random.Random, n: int) -> float:
+        number, first_name, last_name = rng.choice(keys)
+        message = rng.choice([
+            f"What is the status of booking {number} for {first_name} {last_name}?",
+            f"Hi, can you check booking {number} for {first_name} {last_name}? Also, what is the change fee?",
+            rng.choice(POLICY_QUESTIONS),
+        ])
+        started = time.perf_counter()
+        first = None
+        async with client.stream("POST", "/api/chat/stream",
+                                 json={"message": message, "chat_id": f"bench-{n}"}) as response:
+            response.raise_for_status()
+            async for line in response.aiter_lines():
+                if not line.startswith("data: "):
+                    continue
+                if first is None:
+                    first = time.perf_counter() - started
+                if '"[DONE]"' in line:
+                    break
+        return first
+
+    for target in targets:
+        for concurrency in levels:
+            if target == "find_booking":
+                result = run_threads(find_booking, concurrency, args.requests)
+            elif target == "rag":
+                result = run_threads(rag_search, concurrency, args.requests)
+            elif target == "bookings":
+                result = asyncio.run(run_tasks(bookings_page, concurrency, args.requests, base_url))
+            elif target == "chat":
+                result = asyncio.run(run_tasks(chat_turn, concurrency, args.chat_requests, base_url))
+            else:
+                parser.error(f"unknown target {target!r}")
+            report(target, concurrency, result)
+    shutil.rmtree(index_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
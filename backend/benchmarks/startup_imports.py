@@ -0,0 +1,60 @@
+"""Import time of the app, and a check that heavy packages stay lazy.
+
+Imports ``main`` in a fresh interpreter and fails if any of the packages the
+services import only when they are built (the LangChain agent stack, faiss,
+numpy) was loaded by the import itself.
+
+    python benchmarks/startup_imports.py
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Loaded by ChatService._init_agent and the RAG index build, never by ``import main``
+LAZY_MODULES = [
+    "langchain.agents.factory",
+    "langchain.agents.middleware",
+    "langgraph.prebuilt",
+    "langchain_community.vectorstores",
+    "faiss",
+    "numpy",
+]
+
+_PROBE = """
+import json, sys, time
+started = time.perf_counter()
+import main
+print(json.dumps({"seconds": time.perf_counter() - started,
+                  "loaded": [m for m in %r if m in sys.modules]}))
+"""
+
+
+def probe(modules: list) -> dict:
+    output = subprocess.run(
+        [sys.executable, "-c", _PROBE % modules],
+        cwd=BACKEND_DIR, capture_output=True, text=True, check=True,
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=3)
+    args = parser.parse_args()
+
+    results = [probe(LAZY_MODULES) for _ in range(args.runs)]
+    seconds = sorted(r["seconds"] for r in results)
+    loaded = results[-1]["loaded"]
+    print(f"import main  best {seconds[0]:.2f}s  median {seconds[len(seconds) // 2]:.2f}s  ({args.runs} runs)")
+    for module in LAZY_MODULES:
+        print(f"  {module:<34} {'LOADED' if module in loaded else 'lazy'}")
+    print("OK" if not loaded else "FAILED: loaded on import")
+    sys.exit(0 if not loaded else 1)
+
+
+if __name__ == "__main__":
+    main()
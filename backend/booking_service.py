@@ -1,132 +1,480 @@
 import os
 import sys
+from collections import defaultdict
 from datetime import datetime, date
-from typing import List, Optional
+from typing import Callable, Dict, Iterator, List, Optional, Tuple, Union
+import base64
 import random
+import threading
 
 # Add parent directory to path for imports
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
-from models import Booking, BookingDetails, Customer, BookingStatus, BookingClass
+from config import settings
+from models import (
+    Booking, BookingDetails, BookingFilter, BookingRecord, Customer, BookingStatus, BookingClass,
+    BatchCancelRequest, BatchChangeRequest, BatchItemResult, BatchResult, BookingSelector,
+    CancelBookingRequest, ChangeBookingRequest,
+)
+from seat_inventory import FlightKey, SeatInventory, SeatUnavailableError, flight_key
+
+
+BookingKey = Tuple[str, str, str]
+
+# Mutations lock one of these stripes, chosen by booking key, so writes to
+# different bookings rarely wait on each other
+LOCK_STRIPES = 256
+
+
+class BookingConflictError(ValueError):
+    """The booking was modified since the version the caller read."""
+
+
+def check_version(booking: BookingRecord, expected_version: Optional[int]):
+    if expected_version is not None and booking.version != expected_version:
+        raise BookingConflictError(
+            f"Booking was modified by another request (version {booking.version}, expected {expected_version})."
+        )
+
+
+def _normalize(value: str) -> str:
+    return value.lower()
+
+
+def booking_key(booking_number: str, first_name: str, last_name: str) -> BookingKey:
+    return _normalize(booking_number), _normalize(first_name), _normalize(last_name)
+
+
+def generate_demo_bookings() -> List[Booking]:
+    first_names = ["Frank", "Danny", "Michael", "Eugenia", "Robert"]
+    last_names = ["Li", "Smith", "Wu", "Williams", "Xiong"]
+    airport_codes = ["LAX", "YVR", "JFK", "LHR", "CDG", "ARN", "HEL", "HND", "MUC", "FRA", "MAD", "FUN", "SJC"]
+
+    bookings = []
+
+    for i in range(5):
+        first_name = first_names[i]
+        last_name = last_names[i]
+        from_airport = random.choice(airport_codes)
+        to_airport = random.choice(airport_codes)
+        seat_number = f"{random.randint(1, 19)}A"
+        booking_class = random.choice(list(BookingClass))
+
+        customer = Customer(
+            first_name=first_name,
+            last_name=last_name,
+            email=f"{first_name.lower()}.{last_name.lower()}@example.com"
+        )
+
+        flight_date = date.today().replace(day=(date.today().day + 2 * i) % 28 + 1)
+
+        booking = Booking(
+            booking_number=f"10{i + 1}",
+            ticket_number=f"FN{random.randint(100000, 999999)}",
+            date=flight_date,
+            customer=customer,
+            status=BookingStatus.CONFIRMED,
+            from_airport=from_airport,
+            to_airport=to_airport,
+            seat_number=seat_number,
+            booking_class=booking_class
+        )
+
+        bookings.append(booking)
+
+    return bookings
 
 
 class BookingData:
+    # Only this process writes the bookings
+    shared = False
+
     def __init__(self):
-        self.customers: List[Customer] = []
-        self.bookings: List[Booking] = []
+        self.bookings: List[BookingRecord] = []
+        # Hash indexes, rebuilt by _rebuild_indexes and kept in sync by update_flight
+        self._by_key: Dict[BookingKey, BookingRecord] = {}
+        self._by_number: Dict[str, List[BookingRecord]] = defaultdict(list)
+        self._by_date: Dict[date, List[BookingRecord]] = defaultdict(list)
+        self._by_route: Dict[Tuple[str, str], List[BookingRecord]] = defaultdict(list)
+        # Guards the shared index buckets; booking fields are guarded by BookingService's stripes
+        self._index_lock = threading.Lock()
         self._init_demo_data()
+        self._rebuild_indexes()
 
     def _init_demo_data(self):
-        first_names = ["Frank", "Danny", "Michael", "Eugenia", "Robert"]
-        last_names = ["Li", "Smith", "Wu", "Williams", "Xiong"]
-        airport_codes = ["LAX", "YVR", "JFK", "LHR", "CDG", "ARN", "HEL", "HND", "MUC", "FRA", "MAD", "FUN", "SJC"]
-
-        customers = []
-        bookings = []
-
-        for i in range(5):
-            first_name = first_names[i]
-            last_name = last_names[i]
-            from_airport = random.choice(airport_codes)
-            to_airport = random.choice(airport_codes)
-            seat_number = f"{random.randint(1, 19)}A"
-            booking_class = random.choice(list(BookingClass))
-
-            customer = Customer(
-                first_name=first_name,
-                last_name=last_name,
-                email=f"{first_name.lower()}.{last_name.lower()}@example.com"
-            )
+        self.bookings = [BookingRecord.from_booking(b) for b in generate_demo_bookings()]
 
-            flight_date = date.today().replace(day=(date.today().day + 2 * i) % 28 + 1)
-
-            booking = Booking(
-                booking_number=f"10{i + 1}",
-                ticket_number=f"FN{random.randint(100000, 999999)}",
-                date=flight_date,
-                customer=customer,
-                status=BookingStatus.CONFIRMED,
-                from_airport=from_airport,
-                to_airport=to_airport,
-                seat_number=seat_number,
-                booking_class=booking_class
-            )
+    @property
+    def customers(self) -> List[Customer]:
+        return [booking.customer for booking in self.bookings]
+
+    def _rebuild_indexes(self):
+        self._by_key.clear()
+        self._by_number.clear()
+        self._by_date.clear()
+        self._by_route.clear()
+        for booking in self.bookings:
+            self._index_booking(booking)
+
+    def _index_booking(self, booking: BookingRecord):
+        key = booking_key(booking.booking_number, booking.first_name, booking.last_name)
+        self._by_key[key] = booking
+        self._by_number[key[0]].append(booking)
+        self._by_date[booking.date].append(booking)
+        self._by_route[(booking.from_airport.upper(), booking.to_airport.upper())].append(booking)
+
+    @staticmethod
+    def _remove_from(index: dict, key, booking: BookingRecord):
+        bucket = index.get(key)
+        if not bucket:
+            return
+        bucket[:] = [b for b in bucket if b is not booking]
+        if not bucket:
+            del index[key]
+
+    def add_booking(self, booking: Union[Booking, BookingRecord]):
+        if isinstance(booking, Booking):
+            booking = BookingRecord.from_booking(booking)
+        with self._index_lock:
+            self.bookings.append(booking)
+            self._index_booking(booking)
+
+    def find_booking(self, booking_number: str, first_name: str, last_name: str) -> Optional[BookingRecord]:
+        return self._by_key.get(booking_key(booking_number, first_name, last_name))
+
+    def find_by_number(self, booking_number: str) -> List[BookingRecord]:
+        return list(self._by_number.get(_normalize(booking_number), ()))
+
+    def find_by_date(self, flight_date: date) -> List[BookingRecord]:
+        return list(self._by_date.get(flight_date, ()))
+
+    def find_by_route(self, from_airport: str, to_airport: str) -> List[BookingRecord]:
+        return list(self._by_route.get((from_airport.upper(), to_airport.upper()), ()))
+
+    def update_flight(self, booking: BookingRecord, new_date: date, from_airport: str, to_airport: str,
+                      version: int, seat_number: Optional[str] = None):
+        """Change date, route and optionally seat of a booking, moving it between the date and route indexes.
+
+        Like the other updates, applies only if the booking is still at
+        ``version`` and raises ``BookingConflictError`` otherwise.
+        """
+        check_version(booking, version)
+        with self._index_lock:
+            self._remove_from(self._by_date, booking.date, booking)
+            self._remove_from(self._by_route, (booking.from_airport.upper(), booking.to_airport.upper()), booking)
+            booking.date = new_date
+            booking.from_airport = from_airport
+            booking.to_airport = to_airport
+            if seat_number is not None:
+                booking.seat_number = seat_number
+            self._by_date[booking.date].append(booking)
+            self._by_route[(booking.from_airport.upper(), booking.to_airport.upper())].append(booking)
+        booking.version = version + 1
+
+    def update_status(self, booking: BookingRecord, status: BookingStatus, version: int):
+        check_version(booking, version)
+        booking.status = status
+        booking.version = version + 1
 
-            customers.append(customer)
-            bookings.append(booking)
+    def update_seat(self, booking: BookingRecord, seat_number: str, version: int):
+        check_version(booking, version)
+        booking.seat_number = seat_number
+        booking.version = version + 1
 
-        self.customers = customers
-        self.bookings = bookings
+    def iter_bookings(self, filters: Optional[BookingFilter] = None,
+                      after: Optional[int] = None) -> Iterator[Tuple[int, BookingRecord]]:
+        """Yield (position, booking) pairs in insertion order, starting after ``after``."""
+        if after is not None and after < 0:
+            # A negative position would index from the end of the list
+            raise ValueError("Invalid cursor")
+        start = 0 if after is None else after + 1
+        for position in range(start, len(self.bookings)):
+            booking = self.bookings[position]
+            if filters is None or filters.matches(booking):
+                yield position, booking
 
     def get_all_bookings(self) -> List[BookingDetails]:
         return [self._to_booking_details(b) for b in self.bookings]
 
-    def _to_booking_details(self, booking: Booking) -> BookingDetails:
-        return BookingDetails(
-            booking_number=booking.booking_number,
-            ticket_number=booking.ticket_number,
-            first_name=booking.customer.first_name,
-            last_name=booking.customer.last_name,
-            date=booking.date,
-            booking_status=booking.status,
-            from_airport=booking.from_airport,
-            to_airport=booking.to_airport,
-            seat_number=booking.seat_number,
-            booking_class=booking.booking_class.value
+    def _to_booking_details(self, booking: BookingRecord) -> BookingDetails:
+        return BookingDetails.from_booking(booking)
+
+
+def encode_cursor(position: int) -> str:
+    return base64.urlsafe_b64encode(str(position).encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> int:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        position = int(base64.urlsafe_b64decode(padded.encode()).decode())
+    except (ValueError, UnicodeDecodeError):
+        raise ValueError("Invalid cursor")
+    if position < 0:
+        raise ValueError("Invalid cursor")
+    return position
+
+
+def create_booking_data():
+    """Create the storage backend selected by ``settings.booking_store``."""
+    if settings.booking_store == "sqlite":
+        from booking_store import SQLiteBookingData
+        return SQLiteBookingData(
+            settings.booking_db_path,
+            pool_size=settings.booking_db_pool_size,
+            seed=generate_demo_bookings,
         )
+    return BookingData()
 
 
 class BookingService:
-    def __init__(self):
-        self.db = BookingData()
+    def __init__(self, db=None, lock_stripes: int = LOCK_STRIPES, seats: Optional[SeatInventory] = None):
+        self.db = db if db is not None else create_booking_data()
+        self._locks = [threading.Lock() for _ in range(lock_stripes)]
+        self._listeners: List[Callable[[BookingKey], None]] = []
+        self.seats = seats if seats is not None else SeatInventory(
+            self._flight_seats,
+            rows=settings.seat_rows,
+            letters=settings.seat_letters,
+            hold_ttl=settings.seat_hold_ttl_seconds,
+            shared=self.db.shared,
+        )
+
+    def _flight_seats(self, flight: FlightKey) -> Iterator[str]:
+        """Seats taken on a flight, read from the date index; loads the seat inventory."""
+        flight_date, from_airport, to_airport = flight
+        for booking in self.db.find_by_date(flight_date):
+            if (booking.status != BookingStatus.CANCELLED
+                    and flight_key(booking.date, booking.from_airport, booking.to_airport) == flight):
+                yield booking.seat_number
+
+    def add_change_listener(self, listener: Callable[[BookingKey], None]):
+        """Call ``listener`` with the booking key after every change, cancellation or seat change."""
+        self._listeners.append(listener)
+
+    def _lock(self, booking_number: str, first_name: str, last_name: str) -> threading.Lock:
+        return self._locks[hash(booking_key(booking_number, first_name, last_name)) % len(self._locks)]
+
+    def _changed(self, booking: BookingRecord):
+        key = booking_key(booking.booking_number, booking.first_name, booking.last_name)
+        for listener in self._listeners:
+            listener(key)
 
     def get_bookings(self) -> List[BookingDetails]:
         return self.db.get_all_bookings()
 
-    def find_booking(self, booking_number: str, first_name: str, last_name: str) -> Booking:
-        for booking in self.db.bookings:
-            if (booking.booking_number.lower() == booking_number.lower() and
-                booking.customer.first_name.lower() == first_name.lower() and
-                booking.customer.last_name.lower() == last_name.lower()):
-                return booking
-        raise ValueError("Booking not found")
+    def list_bookings(self, filters: Optional[BookingFilter] = None, cursor: Optional[str] = None,
+                      limit: int = 100) -> Tuple[List[BookingDetails], Optional[str]]:
+        """Return one page of bookings and the cursor of the next page, if any."""
+        after = decode_cursor(cursor) if cursor else None
+        page: List[BookingDetails] = []
+        last_position = None
+        for position, booking in self.db.iter_bookings(filters, after):
+            if len(page) == limit:
+                return page, encode_cursor(last_position)
+            page.append(self.db._to_booking_details(booking))
+            last_position = position
+        return page, None
+
+    def iter_booking_json(self, filters: Optional[BookingFilter] = None,
+                          cursor: Optional[str] = None) -> Iterator[str]:
+        """Yield matching bookings as JSON strings without building BookingDetails models."""
+        after = decode_cursor(cursor) if cursor else None
+        for _, booking in self.db.iter_bookings(filters, after):
+            yield booking.to_json()
+
+    def iter_booking_details(self, filters: Optional[BookingFilter] = None,
+                             cursor: Optional[str] = None) -> Iterator[BookingDetails]:
+        after = decode_cursor(cursor) if cursor else None
+        for _, booking in self.db.iter_bookings(filters, after):
+            yield self.db._to_booking_details(booking)
+
+    def find_booking(self, booking_number: str, first_name: str, last_name: str) -> BookingRecord:
+        booking = self.db.find_booking(booking_number, first_name, last_name)
+        if booking is None:
+            raise ValueError("Booking not found")
+        return booking
 
     def get_booking_details(self, booking_number: str, first_name: str, last_name: str) -> BookingDetails:
         booking = self.find_booking(booking_number, first_name, last_name)
         return self.db._to_booking_details(booking)
 
     def change_booking(self, booking_number: str, first_name: str, last_name: str,
-                       new_date: str, from_airport: str, to_airport: str) -> None:
-        booking = self.find_booking(booking_number, first_name, last_name)
-        
-        # Business rule: Cannot change within 24 hours
-        if booking.date <= date.today():
-            raise ValueError("Booking cannot be changed within 24 hours of the start date.")
-        
-        booking.date = date.fromisoformat(new_date)
-        booking.from_airport = from_airport
-        booking.to_airport = to_airport
-
-    def cancel_booking(self, booking_number: str, first_name: str, last_name: str) -> None:
-        booking = self.find_booking(booking_number, first_name, last_name)
-        
-        # Business rule: Cannot cancel within 48 hours
-        if booking.date <= date.today():
-            raise ValueError("Booking cannot be cancelled within 48 hours of the start date.")
-        
-        booking.status = BookingStatus.CANCELLED
-
-    def change_seat(self, booking_number: str, first_name: str, last_name: str, seat_number: str) -> None:
-        booking = self.find_booking(booking_number, first_name, last_name)
-        booking.seat_number = seat_number
+                       new_date: str, from_airport: str, to_airport: str,
+                       expected_version: Optional[int] = None) -> None:
+        with self._lock(booking_number, first_name, last_name):
+            booking = self.find_booking(booking_number, first_name, last_name)
+            check_version(booking, expected_version)
+
+            # Business rule: Cannot change within 24 hours
+            if booking.date <= date.today():
+                raise ValueError("Booking cannot be changed within 24 hours of the start date.")
+
+            new_date = date.fromisoformat(new_date)
+            old_flight = flight_key(booking.date, booking.from_airport, booking.to_airport)
+            new_flight = flight_key(new_date, from_airport, to_airport)
+            if booking.status == BookingStatus.CANCELLED or new_flight == old_flight:
+                self.db.update_flight(booking, new_date, from_airport, to_airport, booking.version)
+            else:
+                # Keep the seat number on the new flight if it is free there, else take the first free seat
+                old_seat = booking.seat_number
+                seat = self.seats.reserve_any(new_flight, preferred=old_seat)
+                try:
+                    self.db.update_flight(booking, new_date, from_airport, to_airport, booking.version,
+                                          seat_number=seat)
+                except SeatUnavailableError:
+                    # Assigned by another worker process; the seat stays marked taken here too
+                    raise
+                except Exception:
+                    self.seats.release(new_flight, seat)
+                    raise
+                self.seats.release(old_flight, old_seat)
+        self._changed(booking)
+
+    def cancel_booking(self, booking_number: str, first_name: str, last_name: str,
+                       expected_version: Optional[int] = None) -> None:
+        with self._lock(booking_number, first_name, last_name):
+            booking = self.find_booking(booking_number, first_name, last_name)
+            check_version(booking, expected_version)
+
+            # Business rule: Cannot cancel within 48 hours
+            if booking.date <= date.today():
+                raise ValueError("Booking cannot be cancelled within 48 hours of the start date.")
+
+            was_cancelled = booking.status == BookingStatus.CANCELLED
+            self.db.update_status(booking, BookingStatus.CANCELLED, booking.version)
+            if not was_cancelled:
+                self.seats.release(flight_key(booking.date, booking.from_airport, booking.to_airport),
+                                   booking.seat_number)
+        self._changed(booking)
+
+    def change_seat(self, booking_number: str, first_name: str, last_name: str, seat_number: str,
+                    expected_version: Optional[int] = None, hold_token: Optional[str] = None) -> str:
+        """Move a booking to another seat on its flight and return the seat's canonical label.
+
+        The new seat is claimed in the seat inventory before the booking is
+        written, so it cannot be given to two bookings; ``hold_token``
+        claims a seat held with ``SeatInventory.hold``.
+        """
+        with self._lock(booking_number, first_name, last_name):
+            booking = self.find_booking(booking_number, first_name, last_name)
+            check_version(booking, expected_version)
+            if booking.status == BookingStatus.CANCELLED:
+                raise ValueError("Cannot change the seat of a cancelled booking.")
+
+            flight = flight_key(booking.date, booking.from_airport, booking.to_airport)
+            old_seat = booking.seat_number
+            seat = self.seats.seat_label(self.seats.seat_index(seat_number))
+            if seat == old_seat:
+                self.db.update_seat(booking, seat, booking.version)
+            else:
+                self.seats.reserve(flight, seat, hold_token)
+                try:
+                    self.db.update_seat(booking, seat, booking.version)
+                except SeatUnavailableError:
+                    raise
+                except Exception:
+                    self.seats.release(flight, seat)
+                    raise
+                self.seats.release(flight, old_seat)
+        self._changed(booking)
+        return seat
+
+    def select_bookings(self, selector: BookingSelector) -> List[BookingRecord]:
+        """Bookings matching a selector, read from the date index or, without a date, the route index."""
+        if selector.flight_date is not None:
+            candidates = self.db.find_by_date(selector.flight_date)
+        elif selector.from_airport and selector.to_airport:
+            candidates = self.db.find_by_route(selector.from_airport, selector.to_airport)
+        else:
+            raise ValueError("A selector needs a flight_date or both from_airport and to_airport.")
+        return [booking for booking in candidates if selector.matches(booking)]
+
+    def _select_batch(self, items: list, selector: Optional[BookingSelector]) -> List[BookingRecord]:
+        if selector is not None and items:
+            raise ValueError("Pass either items or a selector, not both.")
+        selected = self.select_bookings(selector) if selector is not None else []
+        count = len(selected) if selector is not None else len(items)
+        if count > settings.bookings_batch_max_items:
+            raise ValueError(f"Batch of {count} bookings exceeds the limit of {settings.bookings_batch_max_items}.")
+        return selected
+
+    @staticmethod
+    def _run_batch(items: list, apply: Callable) -> BatchResult:
+        results = []
+        for item in items:
+            result = BatchItemResult(booking_number=item.booking_number, first_name=item.first_name,
+                                     last_name=item.last_name, success=True)
+            try:
+                apply(item)
+            except ValueError as e:
+                result.success = False
+                result.status_code = 409 if isinstance(e, (BookingConflictError, SeatUnavailableError)) else 400
+                result.error = str(e)
+            results.append(result)
+        succeeded = sum(result.success for result in results)
+        return BatchResult(total=len(results), succeeded=succeeded, failed=len(results) - succeeded,
+                           results=results)
+
+    def change_bookings(self, request: BatchChangeRequest) -> BatchResult:
+        """Apply many booking changes in one call; each item succeeds or fails on its own.
+
+        With a selector every selected booking moves to ``new_date`` (and
+        the given airports), and only if it is unchanged since it was
+        selected, so a booking cancelled in the meantime is reported as a
+        conflict rather than changed.
+        """
+        if request.selector is not None and not request.new_date:
+            raise ValueError("new_date is required with a selector.")
+        selected = self._select_batch(request.items, request.selector)
+        items = request.items or [
+            ChangeBookingRequest(
+                booking_number=booking.booking_number,
+                first_name=booking.first_name,
+                last_name=booking.last_name,
+                new_date=request.new_date,
+                from_airport=request.from_airport or booking.from_airport,
+                to_airport=request.to_airport or booking.to_airport,
+                expected_version=booking.version,
+            )
+            for booking in selected
+        ]
+        return self._run_batch(items, lambda item: self.change_booking(
+            item.booking_number, item.first_name, item.last_name, item.new_date,
+            item.from_airport, item.to_airport, expected_version=item.expected_version,
+        ))
+
+    def cancel_bookings(self, request: BatchCancelRequest) -> BatchResult:
+        """Cancel many bookings in one call; each item succeeds or fails on its own."""
+        selected = self._select_batch(request.items, request.selector)
+        items = request.items or [
+            CancelBookingRequest(booking_number=booking.booking_number, first_name=booking.first_name,
+                                 last_name=booking.last_name, expected_version=booking.version)
+            for booking in selected
+        ]
+        return self._run_batch(items, lambda item: self.cancel_booking(
+            item.booking_number, item.first_name, item.last_name, expected_version=item.expected_version,
+        ))
+
+    def get_seat_map(self, flight_date: date, from_airport: str, to_airport: str) -> dict:
+        return self.seats.seat_map(flight_key(flight_date, from_airport, to_airport))
+
+    def hold_seat(self, flight_date: date, from_airport: str, to_airport: str, seat_number: str) -> dict:
+        """Set a seat aside for ``change_seat(..., hold_token=...)`` and return the token."""
+        seat = self.seats.seat_label(self.seats.seat_index(seat_number))
+        token = self.seats.hold(flight_key(flight_date, from_airport, to_airport), seat)
+        return {"seat_number": seat, "hold_token": token, "expires_in_seconds": self.seats.hold_ttl}
 
 
 # Singleton instance
 _booking_service: Optional[BookingService] = None
+_booking_service_lock = threading.Lock()
 
 
 def get_booking_service() -> BookingService:
     global _booking_service
     if _booking_service is None:
-        _booking_service = BookingService()
+        with _booking_service_lock:
+            if _booking_service is None:
+                _booking_service = BookingService()
     return _booking_service
@@ -0,0 +1,259 @@
+import os
+import sys
+from datetime import date
+from typing import Callable, Iterable, Iterator, List, Optional, Tuple, Union
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from booking_service import BookingConflictError
+from db import SQLiteConnectionPool
+from models import Booking, BookingDetails, BookingFilter, BookingRecord, BookingStatus, BookingClass
+from seat_inventory import SeatUnavailableError
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS bookings (
+    id INTEGER PRIMARY KEY,
+    booking_number TEXT NOT NULL,
+    ticket_number TEXT NOT NULL,
+    first_name TEXT NOT NULL,
+    last_name TEXT NOT NULL,
+    email TEXT,
+    phone TEXT,
+    date TEXT NOT NULL,
+    status TEXT NOT NULL,
+    from_airport TEXT NOT NULL,
+    to_airport TEXT NOT NULL,
+    seat_number TEXT NOT NULL,
+    booking_class TEXT NOT NULL,
+    booking_number_key TEXT NOT NULL,
+    first_name_key TEXT NOT NULL,
+    last_name_key TEXT NOT NULL,
+    version INTEGER NOT NULL DEFAULT 1
+);
+CREATE UNIQUE INDEX IF NOT EXISTS idx_bookings_key
+    ON bookings (booking_number_key, first_name_key, last_name_key);
+CREATE INDEX IF NOT EXISTS idx_bookings_date ON bookings (date);
+CREATE INDEX IF NOT EXISTS idx_bookings_route ON bookings (upper(from_airport), upper(to_airport));
+"""
+
+_COLUMNS = ("booking_number, ticket_number, first_name, last_name, email, phone, date, status, "
+            "from_airport, to_airport, seat_number, booking_class")
+
+_SELECT_COLUMNS = f"{_COLUMNS}, version"
+
+SQL_COUNT = "SELECT COUNT(*) FROM bookings"
+SQL_ADD_VERSION = "ALTER TABLE bookings ADD COLUMN version INTEGER NOT NULL DEFAULT 1"
+SQL_INSERT = (f"INSERT OR IGNORE INTO bookings ({_COLUMNS}, booking_number_key, first_name_key, last_name_key) "
+              "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)")
+SQL_SELECT_ALL = f"SELECT {_SELECT_COLUMNS} FROM bookings ORDER BY id"
+SQL_SELECT_BY_KEY = (f"SELECT {_SELECT_COLUMNS} FROM bookings "
+                     "WHERE booking_number_key = ? AND first_name_key = ? AND last_name_key = ?")
+SQL_SELECT_BY_NUMBER = f"SELECT {_SELECT_COLUMNS} FROM bookings WHERE booking_number_key = ? ORDER BY id"
+SQL_SELECT_BY_DATE = f"SELECT {_SELECT_COLUMNS} FROM bookings WHERE date = ? ORDER BY id"
+SQL_SELECT_BY_ROUTE = (f"SELECT {_SELECT_COLUMNS} FROM bookings "
+                       "WHERE upper(from_airport) = ? AND upper(to_airport) = ? ORDER BY id")
+
+SQL_SCAN_PAGE_SIZE = 500
+
+# Compare-and-swap: each update applies only if the row is still at the version that was read
+_WHERE_VERSION = "WHERE booking_number_key = ? AND first_name_key = ? AND last_name_key = ? AND version = ?"
+SQL_UPDATE_FLIGHT = f"UPDATE bookings SET date = ?, from_airport = ?, to_airport = ?, version = version + 1 {_WHERE_VERSION}"
+SQL_UPDATE_STATUS = f"UPDATE bookings SET status = ?, version = version + 1 {_WHERE_VERSION}"
+# Seat writes also check that no other live booking on the flight has the seat, since
+# each worker process keeps its own seat inventory
+_SEAT_FREE = ("AND NOT EXISTS (SELECT 1 FROM bookings AS other WHERE other.date = ? "
+              "AND upper(other.from_airport) = ? AND upper(other.to_airport) = ? AND other.seat_number = ? "
+              f"AND other.status != '{BookingStatus.CANCELLED.value}' AND other.id != bookings.id)")
+SQL_MOVE_FLIGHT = (f"UPDATE bookings SET date = ?, from_airport = ?, to_airport = ?, seat_number = ?, "
+                   f"version = version + 1 {_WHERE_VERSION} {_SEAT_FREE}")
+SQL_UPDATE_SEAT = f"UPDATE bookings SET seat_number = ?, version = version + 1 {_WHERE_VERSION} {_SEAT_FREE}"
+
+
+def _filter_clause(filters: Optional[BookingFilter]) -> Tuple[str, tuple]:
+    if filters is None:
+        return "", ()
+    conditions = []
+    params = []
+    if filters.status is not None:
+        conditions.append("status = ?")
+        params.append(filters.status.value)
+    if filters.date_from is not None:
+        conditions.append("date >= ?")
+        params.append(filters.date_from.isoformat())
+    if filters.date_to is not None:
+        conditions.append("date <= ?")
+        params.append(filters.date_to.isoformat())
+    if filters.airport is not None:
+        conditions.append("(upper(from_airport) = ? OR upper(to_airport) = ?)")
+        params.extend([filters.airport.upper()] * 2)
+    if filters.booking_class is not None:
+        conditions.append("booking_class = ?")
+        params.append(filters.booking_class.value)
+    return "".join(f" AND {c}" for c in conditions), tuple(params)
+
+
+def _key(booking: BookingRecord) -> tuple:
+    return booking.booking_number.lower(), booking.first_name.lower(), booking.last_name.lower()
+
+
+def _seat_guard(flight_date: date, from_airport: str, to_airport: str, seat_number: str) -> tuple:
+    return flight_date.isoformat(), from_airport.upper(), to_airport.upper(), seat_number
+
+
+def _row_to_booking(row) -> BookingRecord:
+    return BookingRecord(
+        booking_number=row["booking_number"],
+        ticket_number=row["ticket_number"],
+        date=date.fromisoformat(row["date"]),
+        first_name=row["first_name"],
+        last_name=row["last_name"],
+        email=row["email"],
+        phone=row["phone"],
+        status=BookingStatus(row["status"]),
+        from_airport=row["from_airport"],
+        to_airport=row["to_airport"],
+        seat_number=row["seat_number"],
+        booking_class=BookingClass(row["booking_class"]),
+        version=row["version"],
+    )
+
+
+def _booking_to_row(booking: Union[Booking, BookingRecord]) -> tuple:
+    if isinstance(booking, Booking):
+        booking = BookingRecord.from_booking(booking)
+    return (
+        booking.booking_number,
+        booking.ticket_number,
+        booking.first_name,
+        booking.last_name,
+        booking.email,
+        booking.phone,
+        booking.date.isoformat(),
+        booking.status.value,
+        booking.from_airport,
+        booking.to_airport,
+        booking.seat_number,
+        booking.booking_class.value,
+    ) + _key(booking)
+
+
+class SQLiteBookingData:
+    """Booking storage backed by a SQLite database in WAL mode.
+
+    Mirrors the interface of ``BookingData`` so ``BookingService`` can use
+    either. The database file can be shared by several uvicorn workers;
+    each process holds its own connection pool.
+    """
+
+    # Other worker processes may write the same file
+    shared = True
+
+    def __init__(self, path: str, pool_size: int = 8,
+                 seed: Optional[Callable[[], Iterable[Booking]]] = None):
+        self.pool = SQLiteConnectionPool(path, size=pool_size)
+        with self.pool.connection() as conn:
+            conn.executescript(SCHEMA)
+            columns = {row["name"] for row in conn.execute("PRAGMA table_info(bookings)")}
+            if "version" not in columns:
+                # Database files created before bookings were versioned
+                conn.execute(SQL_ADD_VERSION)
+        if seed is not None:
+            self._seed(seed)
+
+    def _seed(self, seed: Callable[[], Iterable[Booking]]):
+        with self.pool.transaction() as conn:
+            # Re-checked inside the write lock so concurrent workers seed only once
+            if conn.execute(SQL_COUNT).fetchone()[0] == 0:
+                conn.executemany(SQL_INSERT, (_booking_to_row(b) for b in seed()))
+
+    def _select(self, sql: str, params: tuple = ()) -> List[BookingRecord]:
+        with self.pool.connection() as conn:
+            return [_row_to_booking(row) for row in conn.execute(sql, params)]
+
+    def _update(self, sql: str, params: tuple, booking: BookingRecord, version: int, guard: tuple = ()):
+        with self.pool.connection() as conn:
+            updated = conn.execute(sql, params + _key(booking) + (version,) + guard).rowcount
+        if not updated:
+            current = self.find_booking(*_key(booking)) if guard else None
+            if current is not None and current.version == version:
+                # The row is unchanged, so the seat guard failed: another worker assigned the seat
+                raise SeatUnavailableError(f"Seat {guard[-1]} is not available.")
+            # Changed by another worker process since it was read
+            raise BookingConflictError("Booking was modified by another request, please retry.")
+        booking.version = version + 1
+
+    @property
+    def bookings(self) -> List[BookingRecord]:
+        return self._select(SQL_SELECT_ALL)
+
+    def add_booking(self, booking: Union[Booking, BookingRecord]):
+        self.add_bookings([booking])
+
+    def add_bookings(self, bookings: Iterable[Union[Booking, BookingRecord]]):
+        with self.pool.transaction() as conn:
+            conn.executemany(SQL_INSERT, (_booking_to_row(b) for b in bookings))
+
+    def count(self) -> int:
+        with self.pool.connection() as conn:
+            return conn.execute(SQL_COUNT).fetchone()[0]
+
+    def find_booking(self, booking_number: str, first_name: str, last_name: str) -> Optional[BookingRecord]:
+        rows = self._select(SQL_SELECT_BY_KEY, (booking_number.lower(), first_name.lower(), last_name.lower()))
+        return rows[0] if rows else None
+
+    def find_by_number(self, booking_number: str) -> List[BookingRecord]:
+        return self._select(SQL_SELECT_BY_NUMBER, (booking_number.lower(),))
+
+    def find_by_date(self, flight_date: date) -> List[BookingRecord]:
+        return self._select(SQL_SELECT_BY_DATE, (flight_date.isoformat(),))
+
+    def find_by_route(self, from_airport: str, to_airport: str) -> List[BookingRecord]:
+        return self._select(SQL_SELECT_BY_ROUTE, (from_airport.upper(), to_airport.upper()))
+
+    def update_flight(self, booking: BookingRecord, new_date: date, from_airport: str, to_airport: str,
+                      version: int, seat_number: Optional[str] = None):
+        if seat_number is None:
+            self._update(SQL_UPDATE_FLIGHT, (new_date.isoformat(), from_airport, to_airport), booking, version)
+        else:
+            self._update(SQL_MOVE_FLIGHT, (new_date.isoformat(), from_airport, to_airport, seat_number),
+                         booking, version, _seat_guard(new_date, from_airport, to_airport, seat_number))
+            booking.seat_number = seat_number
+        booking.date = new_date
+        booking.from_airport = from_airport
+        booking.to_airport = to_airport
+
+    def update_status(self, booking: BookingRecord, status: BookingStatus, version: int):
+        self._update(SQL_UPDATE_STATUS, (status.value,), booking, version)
+        booking.status = status
+
+    def update_seat(self, booking: BookingRecord, seat_number: str, version: int):
+        self._update(SQL_UPDATE_SEAT, (seat_number,), booking, version,
+                     _seat_guard(booking.date, booking.from_airport, booking.to_airport, seat_number))
+        booking.seat_number = seat_number
+
+    def iter_bookings(self, filters: Optional[BookingFilter] = None,
+                      after: Optional[int] = None) -> Iterator[Tuple[int, BookingRecord]]:
+        """Yield (row id, booking) pairs in id order, starting after ``after``.
+
+        Rows are fetched in keyset pages so no connection is held while the
+        caller consumes them.
+        """
+        if after is not None and after < 0:
+            raise ValueError("Invalid cursor")
+        clause, params = _filter_clause(filters)
+        sql = f"SELECT id, {_SELECT_COLUMNS} FROM bookings WHERE id > ?{clause} ORDER BY id LIMIT {SQL_SCAN_PAGE_SIZE}"
+        last_id = -1 if after is None else after
+        while True:
+            with self.pool.connection() as conn:
+                rows = conn.execute(sql, (last_id,) + params).fetchall()
+            for row in rows:
+                yield row["id"], _row_to_booking(row)
+            if len(rows) < SQL_SCAN_PAGE_SIZE:
+                return
+            last_id = rows[-1]["id"]
+
+    def get_all_bookings(self) -> List[BookingDetails]:
+        return [BookingDetails.from_booking(b) for b in self.bookings]
+
+    def _to_booking_details(self, booking: BookingRecord) -> BookingDetails:
+        return BookingDetails.from_booking(booking)
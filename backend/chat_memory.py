@@ -0,0 +1,588 @@
+import asyncio
+import hashlib
+import os
+import random
+import sys
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional, Sequence, Set, Tuple
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from langchain_core.runnables import RunnableConfig
+from langgraph.checkpoint.base import (
+    WRITES_IDX_MAP,
+    BaseCheckpointSaver,
+    ChannelVersions,
+    Checkpoint,
+    CheckpointMetadata,
+    CheckpointTuple,
+    get_checkpoint_id,
+    get_checkpoint_metadata,
+)
+from langgraph.checkpoint.memory import InMemorySaver
+
+from config import settings
+from db import SQLiteConnectionPool
+
+
+class _ThreadEntry:
+    __slots__ = ("last_access", "messages", "checkpoints", "blob_keys", "write_keys")
+
+    def __init__(self):
+        self.last_access = time.monotonic()
+        self.messages = 0
+        # (checkpoint_ns, checkpoint_id) -> channel versions, oldest first
+        self.checkpoints: "OrderedDict[Tuple[str, str], ChannelVersions]" = OrderedDict()
+        self.blob_keys: Set[tuple] = set()
+        self.write_keys: Set[tuple] = set()
+
+
+class BoundedMemorySaver(InMemorySaver):
+    """In-memory checkpointer that forgets old conversations.
+
+    Threads are kept in LRU order and evicted when there are more than
+    ``max_threads`` of them, when they have been idle for ``idle_ttl``
+    seconds, or while the latest checkpoints of all threads together hold
+    more than ``max_messages`` messages. Within a thread only the newest
+    ``max_checkpoints`` checkpoints are kept, together with the channel
+    blobs and pending writes they still reference.
+    """
+
+    def __init__(self, max_threads: int = 1000, idle_ttl: Optional[float] = 3600,
+                 max_messages: Optional[int] = 100_000, max_checkpoints: int = 2, **kwargs: Any):
+        super().__init__(**kwargs)
+        self.max_threads = max_threads
+        self.idle_ttl = idle_ttl
+        self.max_messages = max_messages
+        self.max_checkpoints = max(1, max_checkpoints)
+        self.total_messages = 0
+        self._threads: "OrderedDict[str, _ThreadEntry]" = OrderedDict()
+        self._lock = threading.RLock()
+
+    def _touch(self, thread_id: str) -> _ThreadEntry:
+        entry = self._threads.get(thread_id)
+        if entry is None:
+            entry = self._threads[thread_id] = _ThreadEntry()
+        else:
+            self._threads.move_to_end(thread_id)
+            entry.last_access = time.monotonic()
+        return entry
+
+    def get_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        with self._lock:
+            thread_id = config["configurable"]["thread_id"]
+            if thread_id in self._threads:
+                self._touch(thread_id)
+            self._evict_idle()
+            return super().get_tuple(config)
+
+    def put(self, config: RunnableConfig, checkpoint: Checkpoint, metadata: CheckpointMetadata,
+            new_versions: ChannelVersions) -> RunnableConfig:
+        with self._lock:
+            result = super().put(config, checkpoint, metadata, new_versions)
+            thread_id = config["configurable"]["thread_id"]
+            checkpoint_ns = config["configurable"]["checkpoint_ns"]
+            entry = self._touch(thread_id)
+            entry.blob_keys.update((thread_id, checkpoint_ns, k, v) for k, v in new_versions.items())
+            entry.checkpoints[(checkpoint_ns, checkpoint["id"])] = dict(checkpoint["channel_versions"])
+            if checkpoint_ns == "":
+                messages = len(checkpoint["channel_values"].get("messages") or ())
+                self.total_messages += messages - entry.messages
+                entry.messages = messages
+            self._prune_thread(thread_id, entry)
+            self._evict(keep=thread_id)
+            return result
+
+    def put_writes(self, config: RunnableConfig, writes, task_id: str, task_path: str = "") -> None:
+        with self._lock:
+            super().put_writes(config, writes, task_id, task_path)
+            configurable = config["configurable"]
+            entry = self._touch(configurable["thread_id"])
+            entry.write_keys.add((configurable["thread_id"], configurable.get("checkpoint_ns", ""),
+                                  configurable["checkpoint_id"]))
+
+    def delete_thread(self, thread_id: str) -> None:
+        with self._lock:
+            entry = self._threads.pop(thread_id, None)
+            if entry is None:
+                super().delete_thread(thread_id)
+                return
+            self.total_messages -= entry.messages
+            self.storage.pop(thread_id, None)
+            for key in entry.write_keys:
+                self.writes.pop(key, None)
+            for key in entry.blob_keys:
+                self.blobs.pop(key, None)
+
+    def message_count(self, thread_id: str) -> int:
+        with self._lock:
+            entry = self._threads.get(thread_id)
+            return entry.messages if entry else 0
+
+    def _prune_thread(self, thread_id: str, entry: _ThreadEntry):
+        if len(entry.checkpoints) <= self.max_checkpoints:
+            return
+        while len(entry.checkpoints) > self.max_checkpoints:
+            (checkpoint_ns, checkpoint_id), _ = entry.checkpoints.popitem(last=False)
+            ns_storage = self.storage.get(thread_id, {}).get(checkpoint_ns)
+            if ns_storage is not None:
+                ns_storage.pop(checkpoint_id, None)
+            write_key = (thread_id, checkpoint_ns, checkpoint_id)
+            self.writes.pop(write_key, None)
+            entry.write_keys.discard(write_key)
+
+        referenced = {
+            (thread_id, checkpoint_ns, channel, version)
+            for (checkpoint_ns, _), versions in entry.checkpoints.items()
+            for channel, version in versions.items()
+        }
+        for key in entry.blob_keys - referenced:
+            self.blobs.pop(key, None)
+        entry.blob_keys &= referenced
+
+    def _evict_idle(self):
+        if self.idle_ttl is None:
+            return
+        deadline = time.monotonic() - self.idle_ttl
+        while self._threads:
+            thread_id, entry = next(iter(self._threads.items()))
+            if entry.last_access > deadline:
+                break
+            self.delete_thread(thread_id)
+
+    def _evict(self, keep: Optional[str] = None):
+        self._evict_idle()
+        while self._threads and (
+            len(self._threads) > self.max_threads
+            or (self.max_messages is not None and self.total_messages > self.max_messages)
+        ):
+            thread_id = next(iter(self._threads))
+            if thread_id == keep:
+                # Only the thread being written is left; keep it even if it is over the cap
+                break
+            self.delete_thread(thread_id)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"threads": len(self._threads), "messages": self.total_messages}
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS checkpoints (
+    thread_id TEXT NOT NULL,
+    checkpoint_ns TEXT NOT NULL DEFAULT '',
+    checkpoint_id TEXT NOT NULL,
+    parent_checkpoint_id TEXT,
+    type TEXT NOT NULL,
+    checkpoint BLOB NOT NULL,
+    metadata_type TEXT NOT NULL,
+    metadata BLOB NOT NULL,
+    PRIMARY KEY (thread_id, checkpoint_ns, checkpoint_id)
+);
+CREATE TABLE IF NOT EXISTS checkpoint_blobs (
+    thread_id TEXT NOT NULL,
+    checkpoint_ns TEXT NOT NULL DEFAULT '',
+    channel TEXT NOT NULL,
+    version TEXT NOT NULL,
+    type TEXT NOT NULL,
+    blob BLOB,
+    PRIMARY KEY (thread_id, checkpoint_ns, channel, version)
+);
+CREATE TABLE IF NOT EXISTS checkpoint_writes (
+    thread_id TEXT NOT NULL,
+    checkpoint_ns TEXT NOT NULL DEFAULT '',
+    checkpoint_id TEXT NOT NULL,
+    task_id TEXT NOT NULL,
+    idx INTEGER NOT NULL,
+    channel TEXT NOT NULL,
+    type TEXT NOT NULL,
+    blob BLOB,
+    task_path TEXT NOT NULL DEFAULT '',
+    PRIMARY KEY (thread_id, checkpoint_ns, checkpoint_id, task_id, idx)
+);
+CREATE TABLE IF NOT EXISTS thread_messages (
+    thread_id TEXT NOT NULL,
+    checkpoint_ns TEXT NOT NULL DEFAULT '',
+    seq INTEGER NOT NULL,
+    digest BLOB NOT NULL,
+    type TEXT NOT NULL,
+    blob BLOB NOT NULL,
+    PRIMARY KEY (thread_id, checkpoint_ns, seq)
+);
+CREATE TABLE IF NOT EXISTS threads (
+    thread_id TEXT PRIMARY KEY,
+    updated_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_threads_updated_at ON threads (updated_at);
+"""
+
+# Blob type marking an incrementally stored channel; the blob holds the message count
+INCREMENTAL_TYPE = "incremental"
+
+SQL_SELECT_LATEST = (
+    "SELECT checkpoint_id, parent_checkpoint_id, type, checkpoint, metadata_type, metadata FROM checkpoints "
+    "WHERE thread_id = ? AND checkpoint_ns = ? ORDER BY checkpoint_id DESC LIMIT 1"
+)
+SQL_SELECT_CHECKPOINT = (
+    "SELECT checkpoint_id, parent_checkpoint_id, type, checkpoint, metadata_type, metadata FROM checkpoints "
+    "WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id = ?"
+)
+SQL_SELECT_BLOB = (
+    "SELECT type, blob FROM checkpoint_blobs "
+    "WHERE thread_id = ? AND checkpoint_ns = ? AND channel = ? AND version = ?"
+)
+SQL_SELECT_WRITES = (
+    "SELECT task_id, channel, type, blob FROM checkpoint_writes "
+    "WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id = ? ORDER BY task_path, task_id, idx"
+)
+SQL_SELECT_MESSAGES = (
+    "SELECT type, blob FROM thread_messages "
+    "WHERE thread_id = ? AND checkpoint_ns = ? AND seq < ? ORDER BY seq"
+)
+SQL_SELECT_DIGESTS = "SELECT digest FROM thread_messages WHERE thread_id = ? AND checkpoint_ns = ? ORDER BY seq"
+SQL_SELECT_LAST_MESSAGE = (
+    "SELECT seq, digest FROM thread_messages WHERE thread_id = ? AND checkpoint_ns = ? ORDER BY seq DESC LIMIT 1"
+)
+SQL_INSERT_CHECKPOINT = "INSERT OR REPLACE INTO checkpoints VALUES (?, ?, ?, ?, ?, ?, ?, ?)"
+SQL_INSERT_BLOB = "INSERT OR REPLACE INTO checkpoint_blobs VALUES (?, ?, ?, ?, ?, ?)"
+SQL_INSERT_WRITE = "INSERT OR IGNORE INTO checkpoint_writes VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)"
+SQL_UPSERT_WRITE = "INSERT OR REPLACE INTO checkpoint_writes VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)"
+SQL_INSERT_MESSAGE = "INSERT INTO thread_messages VALUES (?, ?, ?, ?, ?, ?)"
+SQL_TRUNCATE_MESSAGES = "DELETE FROM thread_messages WHERE thread_id = ? AND checkpoint_ns = ? AND seq >= ?"
+SQL_TOUCH_THREAD = "INSERT OR REPLACE INTO threads VALUES (?, ?)"
+SQL_SELECT_IDLE_THREADS = "SELECT thread_id FROM threads WHERE updated_at < ?"
+SQL_SELECT_NAMESPACES = "SELECT DISTINCT checkpoint_ns FROM checkpoints WHERE thread_id = ?"
+SQL_SELECT_KEPT = (
+    "SELECT checkpoint_id, type, checkpoint FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = ? "
+    "ORDER BY checkpoint_id DESC LIMIT ?"
+)
+SQL_DELETE_OLD_CHECKPOINTS = "DELETE FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id < ?"
+SQL_DELETE_OLD_WRITES = "DELETE FROM checkpoint_writes WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id < ?"
+SQL_SELECT_BLOB_KEYS = "SELECT channel, version FROM checkpoint_blobs WHERE thread_id = ? AND checkpoint_ns = ?"
+SQL_DELETE_BLOB = "DELETE FROM checkpoint_blobs WHERE thread_id = ? AND checkpoint_ns = ? AND channel = ? AND version = ?"
+SQL_DELETE_THREAD = [
+    "DELETE FROM checkpoints WHERE thread_id = ?",
+    "DELETE FROM checkpoint_blobs WHERE thread_id = ?",
+    "DELETE FROM checkpoint_writes WHERE thread_id = ?",
+    "DELETE FROM thread_messages WHERE thread_id = ?",
+    "DELETE FROM threads WHERE thread_id = ?",
+]
+
+
+class SQLiteSaver(BaseCheckpointSaver[str]):
+    """Durable checkpointer in a SQLite file shared by every worker process.
+
+    Channel values are stored per channel version, so a step only writes the
+    channels it changed. Channels listed in ``incremental_channels`` (the
+    agent's ``messages`` list) are stored one message per row: a step appends
+    the new messages and only rewrites the tail from the first message that
+    differs, e.g. after history is trimmed. A checkpoint of such a channel
+    records the message count, so older checkpoints of a thread whose history
+    was rewritten see the current messages; only the latest checkpoint is
+    meant to be resumed.
+
+    Threads are compacted as they are written: only the newest
+    ``max_checkpoints`` checkpoints per thread are kept, and ``compact``
+    also drops threads idle for longer than ``idle_ttl`` seconds.
+    """
+
+    def __init__(self, path: str, pool_size: int = 8, max_checkpoints: int = 2,
+                 idle_ttl: Optional[float] = None, incremental_channels: Sequence[str] = ("messages",),
+                 compact_every: int = 500, **kwargs: Any):
+        super().__init__(**kwargs)
+        self.pool = SQLiteConnectionPool(path, size=pool_size)
+        self.max_checkpoints = max(1, max_checkpoints)
+        self.idle_ttl = idle_ttl
+        self.incremental_channels = frozenset(incremental_channels)
+        self.compact_every = compact_every
+        self._puts = 0
+        self._puts_lock = threading.Lock()
+        with self.pool.connection() as conn:
+            conn.executescript(SCHEMA)
+
+    # ---- reads ----
+
+    def get_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        checkpoint_id = get_checkpoint_id(config)
+        with self.pool.connection() as conn:
+            if checkpoint_id:
+                row = conn.execute(SQL_SELECT_CHECKPOINT, (thread_id, checkpoint_ns, checkpoint_id)).fetchone()
+            else:
+                row = conn.execute(SQL_SELECT_LATEST, (thread_id, checkpoint_ns)).fetchone()
+            if row is None:
+                return None
+            return self._load_tuple(conn, thread_id, checkpoint_ns, row)
+
+    def list(self, config: Optional[RunnableConfig], *, filter: Optional[Dict[str, Any]] = None,
+             before: Optional[RunnableConfig] = None, limit: Optional[int] = None) -> Iterator[CheckpointTuple]:
+        conditions = []
+        params: List[Any] = []
+        if config:
+            conditions.append("thread_id = ?")
+            params.append(config["configurable"]["thread_id"])
+            checkpoint_ns = config["configurable"].get("checkpoint_ns")
+            if checkpoint_ns is not None:
+                conditions.append("checkpoint_ns = ?")
+                params.append(checkpoint_ns)
+            if checkpoint_id := get_checkpoint_id(config):
+                conditions.append("checkpoint_id = ?")
+                params.append(checkpoint_id)
+        if before and (before_id := get_checkpoint_id(before)):
+            conditions.append("checkpoint_id < ?")
+            params.append(before_id)
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        sql = (f"SELECT thread_id, checkpoint_ns, checkpoint_id, parent_checkpoint_id, type, checkpoint, "
+               f"metadata_type, metadata FROM checkpoints {where} ORDER BY checkpoint_id DESC")
+        with self.pool.connection() as conn:
+            rows = conn.execute(sql, params).fetchall()
+            results = []
+            for row in rows:
+                if limit is not None and len(results) >= limit:
+                    break
+                if filter:
+                    metadata = self.serde.loads_typed((row["metadata_type"], row["metadata"]))
+                    if not all(metadata.get(k) == v for k, v in filter.items()):
+                        continue
+                results.append(self._load_tuple(conn, row["thread_id"], row["checkpoint_ns"], row))
+        yield from results
+
+    def _load_tuple(self, conn, thread_id: str, checkpoint_ns: str, row) -> CheckpointTuple:
+        checkpoint = self.serde.loads_typed((row["type"], row["checkpoint"]))
+        channel_values = {}
+        for channel, version in checkpoint["channel_versions"].items():
+            blob = conn.execute(SQL_SELECT_BLOB, (thread_id, checkpoint_ns, channel, version)).fetchone()
+            if blob is None or blob["type"] == "empty":
+                continue
+            if blob["type"] == INCREMENTAL_TYPE:
+                count = int(blob["blob"])
+                channel_values[channel] = [
+                    self.serde.loads_typed((m["type"], m["blob"]))
+                    for m in conn.execute(SQL_SELECT_MESSAGES, (thread_id, checkpoint_ns, count))
+                ]
+            else:
+                channel_values[channel] = self.serde.loads_typed((blob["type"], blob["blob"]))
+        writes = conn.execute(SQL_SELECT_WRITES, (thread_id, checkpoint_ns, row["checkpoint_id"])).fetchall()
+        parent_id = row["parent_checkpoint_id"]
+        return CheckpointTuple(
+            config={
+                "configurable": {
+                    "thread_id": thread_id,
+                    "checkpoint_ns": checkpoint_ns,
+                    "checkpoint_id": row["checkpoint_id"],
+                }
+            },
+            checkpoint={**checkpoint, "channel_values": channel_values},
+            metadata=self.serde.loads_typed((row["metadata_type"], row["metadata"])),
+            parent_config=(
+                {"configurable": {"thread_id": thread_id, "checkpoint_ns": checkpoint_ns, "checkpoint_id": parent_id}}
+                if parent_id else None
+            ),
+            pending_writes=[
+                (w["task_id"], w["channel"], self.serde.loads_typed((w["type"], w["blob"]))) for w in writes
+            ],
+        )
+
+    # ---- writes ----
+
+    def put(self, config: RunnableConfig, checkpoint: Checkpoint, metadata: CheckpointMetadata,
+            new_versions: ChannelVersions) -> RunnableConfig:
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"]["checkpoint_ns"]
+        c = checkpoint.copy()
+        values: Dict[str, Any] = c.pop("channel_values")  # type: ignore[misc]
+        checkpoint_type, checkpoint_blob = self.serde.dumps_typed(c)
+        metadata_type, metadata_blob = self.serde.dumps_typed(get_checkpoint_metadata(config, metadata))
+
+        # Serialize the changed message tails before taking the write lock
+        plans = {}
+        with self.pool.connection() as conn:
+            for channel in new_versions:
+                if channel in self.incremental_channels and isinstance(values.get(channel), list):
+                    plans[channel] = self._plan_messages(conn, thread_id, checkpoint_ns, values[channel])
+
+        with self.pool.transaction() as conn:
+            for channel, version in new_versions.items():
+                if channel not in values:
+                    blob = ("empty", None)
+                elif channel in plans:
+                    count = self._write_messages(conn, thread_id, checkpoint_ns, values[channel], plans[channel])
+                    blob = (INCREMENTAL_TYPE, str(count).encode())
+                else:
+                    blob = self.serde.dumps_typed(values[channel])
+                conn.execute(SQL_INSERT_BLOB, (thread_id, checkpoint_ns, channel, version) + tuple(blob))
+            conn.execute(SQL_INSERT_CHECKPOINT, (
+                thread_id, checkpoint_ns, checkpoint["id"], config["configurable"].get("checkpoint_id"),
+                checkpoint_type, checkpoint_blob, metadata_type, metadata_blob,
+            ))
+            conn.execute(SQL_TOUCH_THREAD, (thread_id, time.time()))
+            self._prune(conn, thread_id, checkpoint_ns)
+
+        self._maybe_compact()
+        return {
+            "configurable": {
+                "thread_id": thread_id,
+                "checkpoint_ns": checkpoint_ns,
+                "checkpoint_id": checkpoint["id"],
+            }
+        }
+
+    def _stored_tail(self, conn, thread_id: str, checkpoint_ns: str) -> Tuple[int, Optional[bytes]]:
+        """Number of stored messages and the digest of the last one."""
+        row = conn.execute(SQL_SELECT_LAST_MESSAGE, (thread_id, checkpoint_ns)).fetchone()
+        return (0, None) if row is None else (row["seq"] + 1, row["digest"])
+
+    def _serialize(self, messages: list) -> List[Tuple[bytes, str, bytes]]:
+        rows = []
+        for message in messages:
+            type_, data = self.serde.dumps_typed(message)
+            rows.append((hashlib.blake2b(data, digest_size=16).digest(), type_, data))
+        return rows
+
+    def _plan_messages(self, conn, thread_id: str, checkpoint_ns: str, messages: list) -> tuple:
+        """``(stored tail, first changed index, serialized messages from there on)``.
+
+        Messages are normally only appended, so the stored count and last
+        digest are enough: if the message at that position is unchanged,
+        only the new ones are serialized. Anything else (a removed or
+        edited message) falls back to comparing every digest.
+        """
+        tail = self._stored_tail(conn, thread_id, checkpoint_ns)
+        count, last_digest = tail
+        if count == 0:
+            return tail, 0, self._serialize(messages)
+        if count <= len(messages):
+            rows = self._serialize(messages[count - 1:])
+            if rows[0][0] == last_digest:
+                return tail, count, rows[1:]
+        stored = [row[0] for row in conn.execute(SQL_SELECT_DIGESTS, (thread_id, checkpoint_ns))]
+        rows = self._serialize(messages)
+        first_change = 0
+        for old, (new, _, _) in zip(stored, rows):
+            if old != new:
+                break
+            first_change += 1
+        return tail, first_change, rows[first_change:]
+
+    def _write_messages(self, conn, thread_id: str, checkpoint_ns: str, messages: list, plan: tuple) -> int:
+        """Append new messages and rewrite only the tail that changed."""
+        tail, first_change, rows = plan
+        if self._stored_tail(conn, thread_id, checkpoint_ns) != tail:
+            # Another writer got in between; plan again, now under the lock
+            tail, first_change, rows = self._plan_messages(conn, thread_id, checkpoint_ns, messages)
+        if first_change < tail[0]:
+            conn.execute(SQL_TRUNCATE_MESSAGES, (thread_id, checkpoint_ns, first_change))
+        conn.executemany(SQL_INSERT_MESSAGE, (
+            (thread_id, checkpoint_ns, first_change + i, digest, type_, data)
+            for i, (digest, type_, data) in enumerate(rows)
+        ))
+        return len(messages)
+
+    def put_writes(self, config: RunnableConfig, writes: Sequence[Tuple[str, Any]], task_id: str,
+                   task_path: str = "") -> None:
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        checkpoint_id = config["configurable"]["checkpoint_id"]
+        upserts, inserts = [], []
+        for idx, (channel, value) in enumerate(writes):
+            type_, blob = self.serde.dumps_typed(value)
+            row = (thread_id, checkpoint_ns, checkpoint_id, task_id,
+                   WRITES_IDX_MAP.get(channel, idx), channel, type_, blob, task_path)
+            # Special channels overwrite, regular writes are kept from the first attempt
+            (upserts if channel in WRITES_IDX_MAP else inserts).append(row)
+        with self.pool.transaction() as conn:
+            conn.executemany(SQL_UPSERT_WRITE, upserts)
+            conn.executemany(SQL_INSERT_WRITE, inserts)
+
+    def delete_thread(self, thread_id: str) -> None:
+        with self.pool.transaction() as conn:
+            for sql in SQL_DELETE_THREAD:
+                conn.execute(sql, (thread_id,))
+
+    def get_next_version(self, current: Optional[str], channel: None) -> str:
+        if current is None:
+            current_v = 0
+        elif isinstance(current, int):
+            current_v = current
+        else:
+            current_v = int(current.split(".")[0])
+        return f"{current_v + 1:032}.{random.random():016}"
+
+    # ---- compaction ----
+
+    def _prune(self, conn, thread_id: str, checkpoint_ns: str):
+        kept = conn.execute(SQL_SELECT_KEPT, (thread_id, checkpoint_ns, self.max_checkpoints)).fetchall()
+        if len(kept) < self.max_checkpoints:
+            return
+        oldest_kept = kept[-1]["checkpoint_id"]
+        conn.execute(SQL_DELETE_OLD_CHECKPOINTS, (thread_id, checkpoint_ns, oldest_kept))
+        conn.execute(SQL_DELETE_OLD_WRITES, (thread_id, checkpoint_ns, oldest_kept))
+        referenced = set()
+        for row in kept:
+            versions = self.serde.loads_typed((row["type"], row["checkpoint"]))["channel_versions"]
+            referenced.update(versions.items())
+        stale = [
+            (thread_id, checkpoint_ns, row["channel"], row["version"])
+            for row in conn.execute(SQL_SELECT_BLOB_KEYS, (thread_id, checkpoint_ns))
+            if (row["channel"], row["version"]) not in referenced
+        ]
+        conn.executemany(SQL_DELETE_BLOB, stale)
+
+    def _maybe_compact(self):
+        if self.idle_ttl is None or not self.compact_every:
+            return
+        with self._puts_lock:
+            self._puts += 1
+            due = self._puts % self.compact_every == 0
+        if due:
+            self.compact()
+
+    def compact(self) -> int:
+        """Delete threads idle for longer than ``idle_ttl``; returns how many were deleted."""
+        if self.idle_ttl is None:
+            return 0
+        with self.pool.connection() as conn:
+            idle = [row[0] for row in conn.execute(SQL_SELECT_IDLE_THREADS, (time.time() - self.idle_ttl,))]
+        for thread_id in idle:
+            self.delete_thread(thread_id)
+        return len(idle)
+
+    # ---- async ----
+
+    async def aget_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        return await asyncio.to_thread(self.get_tuple, config)
+
+    async def alist(self, config: Optional[RunnableConfig], *, filter: Optional[Dict[str, Any]] = None,
+                    before: Optional[RunnableConfig] = None,
+                    limit: Optional[int] = None) -> AsyncIterator[CheckpointTuple]:
+        items = await asyncio.to_thread(lambda: list(self.list(config, filter=filter, before=before, limit=limit)))
+        for item in items:
+            yield item
+
+    async def aput(self, config: RunnableConfig, checkpoint: Checkpoint, metadata: CheckpointMetadata,
+                   new_versions: ChannelVersions) -> RunnableConfig:
+        return await asyncio.to_thread(self.put, config, checkpoint, metadata, new_versions)
+
+    async def aput_writes(self, config: RunnableConfig, writes: Sequence[Tuple[str, Any]], task_id: str,
+                          task_path: str = "") -> None:
+        return await asyncio.to_thread(self.put_writes, config, writes, task_id, task_path)
+
+    async def adelete_thread(self, thread_id: str) -> None:
+        return await asyncio.to_thread(self.delete_thread, thread_id)
+
+
+def create_checkpointer() -> BaseCheckpointSaver:
+    """Create the conversation checkpointer selected by ``settings.chat_checkpointer``."""
+    if settings.chat_checkpointer == "sqlite":
+        return SQLiteSaver(
+            settings.chat_db_path,
+            idle_ttl=settings.chat_thread_ttl_seconds,
+        )
+    return BoundedMemorySaver(
+        max_threads=settings.chat_max_threads,
+        idle_ttl=settings.chat_thread_ttl_seconds,
+        max_messages=settings.chat_max_messages,
+    )
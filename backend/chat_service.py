@@ -1,21 +1,25 @@
+import asyncio
 import os
 import sys
-from typing import Iterator, Optional, Union, Dict, Any
+import threading
+import time
+from typing import AsyncIterator, Iterator, Optional, Union, Dict, Any
 from uuid import uuid4
 
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
-from langchain.chat_models import init_chat_model
-from langchain_nvidia_ai_endpoints import ChatNVIDIA
-from langchain_core.messages import HumanMessage
-from langchain.agents import create_agent
-
-from langgraph.checkpoint.memory import InMemorySaver
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, HumanMessage, ToolMessage
 from langchain_core.runnables import RunnableConfig
 
+import metrics
+from admission import backoff_delay, is_retryable
+from chat_memory import create_checkpointer
 from config import settings
+from http_clients import shared_pool_kwargs
+from intent_router import IntentRouter, RoutedReply
 from rag_service import get_rag_service, search_rag_policy
-from tools import get_booking_tools
+from tools import get_booking_tools, get_tool_cache
 
 SYSTEM_PROMPT = """You are a customer chat support agent of an airline named "Funnair".
 Respond in a friendly, helpful, and joyful manner.
@@ -44,69 +48,258 @@ Use the appropriate tool based on the customer's request.
 Always be polite, professional, and helpful."""
 
 
+def _message_text(msg) -> str:
+    content = getattr(msg, "content", None)
+    if isinstance(content, str):
+        return content
+    if isinstance(content, list):
+        return "".join(
+            block.get("text", "") if isinstance(block, dict) else str(block)
+            for block in content
+            if not isinstance(block, dict) or block.get("type") == "text"
+        )
+    return ""
+
+
 class ChatService:
-    def __init__(self):
+    def __init__(self, llm: Optional[BaseChatModel] = None):
+        """``llm`` replaces the model configured in settings, e.g. a local fake for benchmarks."""
         try:
             config = settings.get_llm_config()
             config["streaming"] = True
-            if config.get("model_provider") == "nvidia":
+            if llm is not None:
+                self.llm = llm
+            elif config.get("model_provider") == "nvidia":
+                # Provider packages are imported only when used: they dominate startup time
+                from langchain_nvidia_ai_endpoints import ChatNVIDIA
                 self.llm = ChatNVIDIA(
                     model=config.get("model"),
                     api_key=config.get("api_key"),
                     streaming=True,
                 )
             else:
-                self.llm = init_chat_model(**config)
+                from langchain.chat_models import init_chat_model
+                self.llm = init_chat_model(**config, **shared_pool_kwargs(config.get("model_provider")))
 
         except Exception as e:
             raise RuntimeError(f"Failed to initialize LLM: {str(e)}")
-        self.checkpointer = InMemorySaver()
+        self.checkpointer = create_checkpointer()
+        self.router = IntentRouter() if settings.chat_intent_router else None
         self._init_agent()
 
     def _init_agent(self):
+        from langchain.agents import create_agent
+
+        from context_budget import ContextBudgetMiddleware
+
         tools = get_booking_tools()
         tools.append(search_rag_policy)
 
+        self.context_budget = ContextBudgetMiddleware(
+            max_tokens=settings.chat_context_max_tokens,
+            keep_turns=settings.chat_context_keep_turns,
+            tool_chars=settings.chat_context_tool_chars,
+        ) if settings.chat_context_max_tokens > 0 else None
         self.agent = create_agent(
             model=self.llm,
             tools=tools,
             system_prompt=SYSTEM_PROMPT,
             checkpointer=self.checkpointer,
+            middleware=[self.context_budget] if self.context_budget else [],
         )
 
-    def chat_stream(self, message: str, chat_id: str) -> Iterator[str]:
+    @staticmethod
+    def _stream_args(message: str, chat_id: str) -> tuple:
+        config: RunnableConfig = {
+            "configurable": {"thread_id": chat_id},
+            "callbacks": [metrics.get_callback_handler()],
+        }
+        inputs = {"messages": [HumanMessage(content=message)]}
+        if settings.chat_token_streaming:
+            stream_mode = ["messages", "updates"]
+        else:
+            stream_mode = ["updates"]
+        return inputs, config, stream_mode
+
+    def chat_events(self, message: str, chat_id: str) -> Iterator[Dict[str, Any]]:
+        """Stream a chat turn as events.
+
+        Yields ``{"type": "token", "content": ...}`` for answer text (incremental
+        deltas when ``settings.chat_token_streaming`` is on, whole messages
+        otherwise), ``tool_start``/``tool_end`` events around tool calls and a
+        single ``error`` event if the turn fails. An agent step that fails on a
+        rate limit, timeout or 5xx before streaming anything is retried from
+        the last checkpoint, up to ``settings.chat_turn_retries`` times.
+        """
+        started = time.perf_counter()
+        try:
+            routed = self.router.route(message) if self.router else None
+            if routed is not None:
+                config: RunnableConfig = {"configurable": {"thread_id": chat_id}}
+                self.agent.update_state(config, {"messages": routed.messages}, as_node="model")
+                yield from self._routed_events(routed)
+                metrics.CHAT_TURN_SECONDS.labels("router").observe(time.perf_counter() - started)
+                return
+            inputs, config, stream_mode = self._stream_args(message, chat_id)
+            self._reset_tokens_saved(chat_id)
+            attempt = 0
+            while True:
+                # Whether tokens of the step in progress already reached the client
+                streamed = False
+                try:
+                    for mode, data in self.agent.stream(inputs, config=config, stream_mode=stream_mode):
+                        for event in self._stream_events(mode, data):
+                            streamed = streamed or mode == "messages"
+                            yield event
+                        if mode == "updates":
+                            # An update closes a step, and a finished step is never redone
+                            streamed = False
+                    break
+                except Exception as e:
+                    if not self._should_retry(e, attempt, streamed):
+                        raise
+                    time.sleep(backoff_delay(attempt, settings.chat_retry_backoff_seconds))
+                attempt += 1
+                # Resume from the last checkpoint: the user message and the finished steps are kept
+                inputs = None
+            self._agent_turn_done(started, chat_id)
+        except Exception as e:
+            yield self._error_event(e)
+
+    async def achat_events(self, message: str, chat_id: str) -> AsyncIterator[Dict[str, Any]]:
+        """Async variant of ``chat_events`` built on the agent's ``astream``.
+
+        The turn runs on the event loop, so an open chat stream does not hold
+        a threadpool worker while waiting on the LLM.
+        """
+        started = time.perf_counter()
         try:
-            config: RunnableConfig = {"configurable": {"thread_id": chat_id}}
-            inputs = {"messages": [HumanMessage(content=message)]}
-
-            for chunk in self.agent.stream(inputs, config=config, stream_mode="updates"):
-                if isinstance(chunk, dict):
-                    if "agent" in chunk:
-                        msg = chunk["agent"]["messages"][-1]
-                        if hasattr(msg, "content") and msg.content:
-                            yield msg.content
-                    elif "model" in chunk:
-                        msg = chunk["model"]["messages"][-1]
-                        if hasattr(msg, "content") and msg.content:
-                            yield msg.content
-                    elif "tools" in chunk:
-                        pass
+            routed = await asyncio.to_thread(self.router.route, message) if self.router else None
+            if routed is not None:
+                config: RunnableConfig = {"configurable": {"thread_id": chat_id}}
+                await self.agent.aupdate_state(config, {"messages": routed.messages}, as_node="model")
+                for event in self._routed_events(routed):
+                    yield event
+                metrics.CHAT_TURN_SECONDS.labels("router").observe(time.perf_counter() - started)
+                return
+            inputs, config, stream_mode = self._stream_args(message, chat_id)
+            self._reset_tokens_saved(chat_id)
+            attempt = 0
+            while True:
+                # Whether tokens of the step in progress already reached the client
+                streamed = False
+                try:
+                    async for mode, data in self.agent.astream(inputs, config=config, stream_mode=stream_mode):
+                        for event in self._stream_events(mode, data):
+                            streamed = streamed or mode == "messages"
+                            yield event
+                        if mode == "updates":
+                            # An update closes a step, and a finished step is never redone
+                            streamed = False
+                    break
+                except Exception as e:
+                    if not self._should_retry(e, attempt, streamed):
+                        raise
+                    await asyncio.sleep(backoff_delay(attempt, settings.chat_retry_backoff_seconds))
+                attempt += 1
+                # Resume from the last checkpoint: the user message and the finished steps are kept
+                inputs = None
+            self._agent_turn_done(started, chat_id)
         except Exception as e:
-            error_msg = f"I apologize, but I'm having trouble connecting to the AI service right now. Please try again later. (Error: {str(e)[:200]})"
-            yield error_msg
+            yield self._error_event(e)
+
+    @staticmethod
+    def _routed_events(routed: RoutedReply) -> Iterator[Dict[str, Any]]:
+        """Events of a turn answered by the intent router, shaped like an agent turn."""
+        tool_message = routed.messages[2]
+        yield {"type": "tool_start", "tool": routed.tool, "id": tool_message.tool_call_id}
+        yield {"type": "tool_end", "tool": routed.tool, "id": tool_message.tool_call_id, "status": tool_message.status}
+        yield {"type": "token", "content": routed.text}
+
+    def _reset_tokens_saved(self, chat_id: str):
+        # A failed turn leaves its count behind; don't add it to this one
+        if self.context_budget:
+            self.context_budget.pop_tokens_saved(chat_id)
+
+    @staticmethod
+    def _should_retry(error: Exception, attempt: int, streamed: bool) -> bool:
+        """Retry a failed agent step only if nothing of it reached the client yet."""
+        if attempt >= settings.chat_turn_retries or streamed or not is_retryable(error):
+            return False
+        metrics.CHAT_RETRIES.labels(type(error).__name__).inc()
+        print(f"Warning: retrying agent step after {type(error).__name__}: {str(error)[:200]}")
+        return True
+
+    def _agent_turn_done(self, started: float, chat_id: str):
+        seconds = time.perf_counter() - started
+        metrics.CHAT_TURN_SECONDS.labels("agent").observe(seconds)
+        if self.context_budget:
+            metrics.PROMPT_TOKENS_SAVED.observe(self.context_budget.pop_tokens_saved(chat_id))
+        if self.router:
+            self.router.record_agent_turn(seconds)
+
+    @staticmethod
+    def _error_event(error: Exception) -> Dict[str, Any]:
+        metrics.CHAT_ERRORS.labels(type(error).__name__).inc()
+        error_msg = f"I apologize, but I'm having trouble connecting to the AI service right now. Please try again later. (Error: {str(error)[:200]})"
+        return {"type": "error", "content": error_msg}
+
+    def _stream_events(self, mode: str, data) -> Iterator[Dict[str, Any]]:
+        if mode == "messages":
+            msg, metadata = data
+            if metadata.get("langgraph_node") in ("model", "agent") and isinstance(msg, (AIMessage, AIMessageChunk)):
+                text = _message_text(msg)
+                if text:
+                    yield {"type": "token", "content": text}
+        else:
+            yield from self._update_events(data, emit_text=not settings.chat_token_streaming)
+
+    @staticmethod
+    def _update_events(update: dict, emit_text: bool) -> Iterator[Dict[str, Any]]:
+        for node, values in update.items():
+            messages = (values or {}).get("messages", []) if isinstance(values, dict) else []
+            if node in ("model", "agent") and messages:
+                msg = messages[-1]
+                if emit_text:
+                    text = _message_text(msg)
+                    if text:
+                        yield {"type": "token", "content": text}
+                for tool_call in getattr(msg, "tool_calls", None) or []:
+                    yield {"type": "tool_start", "tool": tool_call["name"], "id": tool_call.get("id")}
+            elif node == "tools":
+                for msg in messages:
+                    if isinstance(msg, ToolMessage):
+                        yield {
+                            "type": "tool_end",
+                            "tool": msg.name,
+                            "id": msg.tool_call_id,
+                            "status": getattr(msg, "status", "success"),
+                        }
+
+    def chat_stream(self, message: str, chat_id: str) -> Iterator[str]:
+        for event in self.chat_events(message, chat_id):
+            if event["type"] in ("token", "error"):
+                yield event["content"]
 
     def clear_chat_history(self, chat_id: str) -> None:
-        pass
+        self.checkpointer.delete_thread(chat_id)
+        get_tool_cache().clear_thread(chat_id)
 
     def get_chat_history_length(self, chat_id: str) -> int:
-        return 0
+        config: RunnableConfig = {"configurable": {"thread_id": chat_id}}
+        state = self.agent.get_state(config)
+        return len(state.values.get("messages", [])) if state and state.values else 0
 
 
 _chat_service: Optional[ChatService] = None
+_chat_service_lock = threading.Lock()
 
 
 def get_chat_service() -> ChatService:
     global _chat_service
     if _chat_service is None:
-        _chat_service = ChatService()
+        # Warm-up and the first requests may race here; only one of them builds
+        with _chat_service_lock:
+            if _chat_service is None:
+                _chat_service = ChatService()
     return _chat_service
@@ -0,0 +1,117 @@
+import asyncio
+import time
+from typing import AsyncIterator, Callable, Dict, List, Optional, Tuple
+from uuid import uuid4
+
+
+class TurnInProgressError(ValueError):
+    """The conversation already has a reply being generated."""
+
+
+class _Turn:
+    """Frames of one chat turn, appended by its generation task and read by any number of clients."""
+    __slots__ = ("chat_id", "turn_id", "frames", "done", "finished_at", "task", "_changed")
+
+    def __init__(self, chat_id: str):
+        self.chat_id = chat_id
+        self.turn_id = uuid4().hex[:12]
+        self.frames: List[dict] = []
+        self.done = False
+        self.finished_at: Optional[float] = None
+        self.task: Optional[asyncio.Task] = None
+        self._changed = asyncio.Event()
+
+    def event_id(self, seq: int) -> str:
+        return f"{self.turn_id}:{seq}"
+
+    def _notify(self):
+        changed, self._changed = self._changed, asyncio.Event()
+        changed.set()
+
+    def append(self, frame: dict):
+        self.frames.append(frame)
+        self._notify()
+
+    def finish(self):
+        self.done = True
+        self.finished_at = time.monotonic()
+        self._notify()
+
+    async def follow(self, after: int = 0) -> AsyncIterator[Tuple[str, dict]]:
+        """``(event id, frame)`` for every frame after sequence number ``after``, live until the turn ends."""
+        seq = after
+        while True:
+            while seq < len(self.frames):
+                seq += 1
+                yield self.event_id(seq), self.frames[seq - 1]
+            if self.done:
+                return
+            await self._changed.wait()
+
+
+class ChatStreamRegistry:
+    """Runs each chat turn as a task that outlives the request which started it.
+
+    The turn's frames are buffered per ``chat_id``; frame ``n`` of turn ``t``
+    has event id ``t:n``. A client that lost its connection sends the last
+    id it saw and gets the missed frames followed by the live ones, with no
+    second agent run. A finished turn stays resumable for ``ttl`` seconds.
+
+    Event-loop only, like the admission controller. Buffers live in this
+    worker, so resuming needs the reconnect to reach the same worker.
+    """
+
+    def __init__(self, ttl: float):
+        self.ttl = ttl
+        self._turns: Dict[str, _Turn] = {}
+        self.started = 0
+        self.resumed = 0
+        self.expired = 0
+
+    def _purge(self):
+        cutoff = time.monotonic() - self.ttl
+        for chat_id in [c for c, t in self._turns.items() if t.done and t.finished_at < cutoff]:
+            del self._turns[chat_id]
+            self.expired += 1
+
+    def start(self, chat_id: str, frames: AsyncIterator[dict], on_done: Callable[[], None]) -> _Turn:
+        """Start generating a turn in the background; ``on_done`` runs when it ends, however it ends."""
+        self._purge()
+        current = self._turns.get(chat_id)
+        if current is not None and not current.done:
+            raise TurnInProgressError("A reply is still being generated for this conversation.")
+        turn = _Turn(chat_id)
+        self._turns[chat_id] = turn
+        turn.task = asyncio.create_task(self._run(turn, frames, on_done))
+        self.started += 1
+        return turn
+
+    @staticmethod
+    async def _run(turn: _Turn, frames: AsyncIterator[dict], on_done: Callable[[], None]):
+        try:
+            async for frame in frames:
+                turn.append(frame)
+        except Exception as e:
+            print(f"Warning: chat turn of {turn.chat_id} failed: {e}")
+        finally:
+            turn.finish()
+            on_done()
+
+    def resume(self, chat_id: str, last_event_id: str) -> Optional[Tuple[_Turn, int]]:
+        """The turn ``last_event_id`` belongs to and the sequence number to replay after, if still buffered."""
+        self._purge()
+        turn_id, _, seq = last_event_id.strip().partition(":")
+        turn = self._turns.get(chat_id)
+        if turn is None or turn.turn_id != turn_id or not seq.isdigit() or int(seq) > len(turn.frames):
+            return None
+        self.resumed += 1
+        return turn, int(seq)
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "buffered_turns": len(self._turns),
+            "in_flight": sum(1 for t in self._turns.values() if not t.done),
+            "started": self.started,
+            "resumed": self.resumed,
+            "expired": self.expired,
+        }
@@ -19,6 +19,88 @@ class Settings(BaseSettings):
     llm_embedded_model: str = os.getenv("LLM_EMBEDDED_MODEL", "text-embedding-3-small")
     llm_embedded_provider: str = os.getenv("LLM_EMBEDDED_PROVIDER", "openai")
 
+    # Stream answer tokens as they arrive instead of whole messages
+    chat_token_streaming: bool = os.getenv("CHAT_TOKEN_STREAMING", "true").lower() == "true"
+    # Answer fully specified booking status/cancel messages without the LLM
+    chat_intent_router: bool = os.getenv("CHAT_INTENT_ROUTER", "true").lower() == "true"
+
+    # Directory where built RAG indexes are cached, one subdirectory per content hash
+    rag_index_dir: str = os.getenv("RAG_INDEX_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), ".rag_index"))
+
+    # Knowledge base directory (*.txt, *.md, recursive); empty indexes the bundled terms_of_service.txt
+    rag_knowledge_dir: str = os.getenv("RAG_KNOWLEDGE_DIR", "")
+    # Seconds between checks of the knowledge base for changed files (0 disables polling)
+    rag_reload_interval_seconds: float = float(os.getenv("RAG_RELOAD_INTERVAL_SECONDS", "60"))
+
+    # Retrieval: "vector" (FAISS), "hybrid" (FAISS + BM25 fused) or "lexical" (BM25 only, no embedding calls)
+    rag_search_mode: str = os.getenv("RAG_SEARCH_MODE", "hybrid").lower()
+    # Query embeddings slower than this fall back to lexical search
+    rag_embedding_timeout_seconds: float = float(os.getenv("RAG_EMBEDDING_TIMEOUT_SECONDS", "5"))
+
+    # Index builds: chunks per embedding request, requests in flight and retries per failed batch
+    rag_embedding_batch_size: int = int(os.getenv("RAG_EMBEDDING_BATCH_SIZE", "64"))
+    rag_embedding_concurrency: int = int(os.getenv("RAG_EMBEDDING_CONCURRENCY", "4"))
+    rag_embedding_max_retries: int = int(os.getenv("RAG_EMBEDDING_MAX_RETRIES", "3"))
+
+    # Embedding cache: in-memory LRU size and SQLite file shared by workers (empty disables the file)
+    rag_embedding_cache_size: int = int(os.getenv("RAG_EMBEDDING_CACHE_SIZE", "10000"))
+    rag_embedding_cache_path: str = os.getenv("RAG_EMBEDDING_CACHE_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), ".rag_index", "embeddings.db"))
+
+    # search_rag_policy result cache: entries, TTL and cosine similarity for near-duplicate queries
+    rag_result_cache_size: int = int(os.getenv("RAG_RESULT_CACHE_SIZE", "1000"))
+    rag_result_cache_ttl_seconds: float = float(os.getenv("RAG_RESULT_CACHE_TTL_SECONDS", "3600"))
+    rag_result_cache_similarity: float = float(os.getenv("RAG_RESULT_CACHE_SIMILARITY", "0.95"))
+
+    # Conversation memory limits: LRU thread count, idle TTL and total messages kept
+    chat_max_threads: int = int(os.getenv("CHAT_MAX_THREADS", "1000"))
+    chat_thread_ttl_seconds: float = float(os.getenv("CHAT_THREAD_TTL_SECONDS", "3600"))
+    chat_max_messages: int = int(os.getenv("CHAT_MAX_MESSAGES", "100000"))
+
+    # Per-conversation cache of get_booking_details results (0 disables) and its TTL
+    chat_tool_cache_size: int = int(os.getenv("CHAT_TOOL_CACHE_SIZE", "32"))
+    chat_tool_cache_ttl_seconds: float = float(os.getenv("CHAT_TOOL_CACHE_TTL_SECONDS", "300"))
+
+    # Prompt token budget per model call (0 = off): older tool outputs are trimmed and older turns summarized
+    chat_context_max_tokens: int = int(os.getenv("CHAT_CONTEXT_MAX_TOKENS", "8000"))
+    # Most recent turns always sent word for word, and the length older tool outputs are cut to
+    chat_context_keep_turns: int = int(os.getenv("CHAT_CONTEXT_KEEP_TURNS", "3"))
+    chat_context_tool_chars: int = int(os.getenv("CHAT_CONTEXT_TOOL_CHARS", "300"))
+
+    # Admission control: chat turns running at once, how many more may wait and for how long (then 429)
+    chat_max_concurrent_turns: int = int(os.getenv("CHAT_MAX_CONCURRENT_TURNS", "16"))
+    chat_max_queued_turns: int = int(os.getenv("CHAT_MAX_QUEUED_TURNS", "64"))
+    chat_queue_timeout_seconds: float = float(os.getenv("CHAT_QUEUE_TIMEOUT_SECONDS", "30"))
+    # Retries of a failed agent step on rate limits, timeouts and 5xx, with jittered exponential backoff
+    chat_turn_retries: int = int(os.getenv("CHAT_TURN_RETRIES", "2"))
+    chat_retry_backoff_seconds: float = float(os.getenv("CHAT_RETRY_BACKOFF_SECONDS", "1.0"))
+    # How long a finished chat reply stays buffered for clients resuming with Last-Event-ID
+    chat_stream_buffer_ttl_seconds: float = float(os.getenv("CHAT_STREAM_BUFFER_TTL_SECONDS", "120"))
+    # Connection pool shared by the OpenAI-compatible chat model and embedding clients
+    llm_http_max_connections: int = int(os.getenv("LLM_HTTP_MAX_CONNECTIONS", "100"))
+    llm_http_timeout_seconds: float = float(os.getenv("LLM_HTTP_TIMEOUT_SECONDS", "60"))
+
+    # Conversation checkpointer: "memory" (per process) or "sqlite" (shared file)
+    chat_checkpointer: str = os.getenv("CHAT_CHECKPOINTER", "memory")
+    chat_db_path: str = os.getenv("CHAT_DB_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "chat.db"))
+
+    # Booking storage: "memory" (demo data, per process) or "sqlite" (shared file)
+    booking_store: str = os.getenv("BOOKING_STORE", "memory")
+    booking_db_path: str = os.getenv("BOOKING_DB_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "bookings.db"))
+    booking_db_pool_size: int = int(os.getenv("BOOKING_DB_POOL_SIZE", "8"))
+
+    # Seat inventory layout (rows x letters per flight) and how long a seat hold lasts
+    seat_rows: int = int(os.getenv("SEAT_ROWS", "30"))
+    seat_letters: str = os.getenv("SEAT_LETTERS", "ABCDEF")
+    seat_hold_ttl_seconds: float = float(os.getenv("SEAT_HOLD_TTL_SECONDS", "300"))
+
+    bookings_page_size: int = int(os.getenv("BOOKINGS_PAGE_SIZE", "100"))
+    bookings_max_page_size: int = int(os.getenv("BOOKINGS_MAX_PAGE_SIZE", "1000"))
+    # Most bookings one batch change/cancel request may touch
+    bookings_batch_max_items: int = int(os.getenv("BOOKINGS_BATCH_MAX_ITEMS", "10000"))
+
+    # Build the booking, RAG and chat services in the background at startup instead of on first use
+    startup_warmup: bool = os.getenv("STARTUP_WARMUP", "true").lower() == "true"
+
     cors_origins: list = ["http://localhost:3000", "http://localhost:5173"]
     port: int = int(os.getenv("PORT", "8000"))
 
@@ -0,0 +1,193 @@
+import re
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+from langchain.agents.middleware import AgentMiddleware, ModelRequest
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage, SystemMessage, ToolMessage
+from langchain_core.messages.utils import count_tokens_approximately
+from langgraph.config import get_config
+
+# Booking fields worth keeping when a tool result is compacted
+_KEEP_FIELDS = ("success", "booking_number", "booking_status", "status", "date", "from_airport", "to_airport",
+                "seat_number", "booking_class", "message", "error")
+_FIELD = re.compile(
+    r"""["'](%s)["']:\s*("(?:[^"\\]|\\.)*"|'(?:[^'\\]|\\.)*'|datetime\.date\((\d+), (\d+), (\d+)\)"""
+    r"""|<\w+\.\w+: '([^']*)'>|[\w.-]+)""" % "|".join(_KEEP_FIELDS)
+)
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s")
+
+
+def _clip(text: str, limit: int) -> str:
+    text = " ".join(text.split())
+    return text if len(text) <= limit else text[:limit].rstrip() + "…"
+
+
+def compact_tool_output(content: str, limit: int) -> str:
+    """The booking fields of a dict-shaped tool result, or the start of any other output."""
+    if content.lstrip().startswith("{"):
+        fields = []
+        for found in _FIELD.finditer(content):
+            key, value, year, month, day, enum = found.groups()
+            if year:
+                value = f"{int(year):04}-{int(month):02}-{int(day):02}"
+            elif enum is not None:
+                value = enum
+            else:
+                value = value.strip("'\"")
+            fields.append(f"{key}={value}")
+        if fields:
+            return _clip(" ".join(dict.fromkeys(fields)), limit)
+    return _clip(content, limit)
+
+
+def _text(message: BaseMessage) -> str:
+    return message.text if isinstance(message.content, list) else str(message.content)
+
+
+def _split_turns(messages: List[BaseMessage]) -> List[List[BaseMessage]]:
+    """Group messages into turns, each starting at a user message."""
+    turns: List[List[BaseMessage]] = []
+    for message in messages:
+        if isinstance(message, HumanMessage) or not turns:
+            turns.append([])
+        turns[-1].append(message)
+    return turns
+
+
+class ContextBudgetMiddleware(AgentMiddleware):
+    """Keeps the prompt sent to the model under ``max_tokens``.
+
+    Only the request is compacted; the conversation kept by the
+    checkpointer stays complete. Under budget, nothing changes. Over it,
+    the last ``keep_turns`` turns are always sent word for word, tool
+    outputs in older turns are cut to their booking fields or first
+    ``tool_chars`` characters, and if that is not enough the oldest turns
+    are folded, one line each, into a summary appended to the system
+    prompt. Summary lines are extractive (no LLM call) and cached per
+    turn, so the summary rolls forward as turns age out.
+    Tokens are counted with ``count_tokens_approximately``.
+    """
+
+    def __init__(self, max_tokens: int, keep_turns: int = 3, tool_chars: int = 300,
+                 summary_cache_size: int = 4096):
+        super().__init__()
+        self.max_tokens = max_tokens
+        self.keep_turns = max(1, keep_turns)
+        self.tool_chars = tool_chars
+        self.summary_cache_size = summary_cache_size
+        self._lock = threading.Lock()
+        # id of a turn's first message -> its summary line
+        self._summaries: "OrderedDict[str, str]" = OrderedDict()
+        # chat thread -> tokens saved by the model calls of its running turn
+        self._saved: Dict[Optional[str], int] = {}
+        self.calls = 0
+        self.compacted_calls = 0
+        self.tokens_before = 0
+        self.tokens_after = 0
+
+    def _summary_line(self, turn: List[BaseMessage]) -> str:
+        key = turn[0].id
+        if key is not None:
+            with self._lock:
+                line = self._summaries.get(key)
+            if line is not None:
+                return line
+        asked = next((_text(m) for m in turn if isinstance(m, HumanMessage)), "")
+        tools = [f"{m.name}: {compact_tool_output(_text(m), 120)}" for m in turn if isinstance(m, ToolMessage)]
+        answers = [_text(m) for m in turn if isinstance(m, AIMessage) and not m.tool_calls and _text(m).strip()]
+        line = f"User: {_clip(asked, 160)}"
+        if tools:
+            line += f" | Tools: {'; '.join(tools)}"
+        if answers:
+            line += f" | Assistant: {_clip(_SENTENCE_END.split(answers[-1].strip(), 1)[0], 200)}"
+        if key is not None:
+            with self._lock:
+                self._summaries[key] = line
+                while len(self._summaries) > self.summary_cache_size:
+                    self._summaries.popitem(last=False)
+        return line
+
+    def _compact_turn(self, turn: List[BaseMessage]) -> List[BaseMessage]:
+        return [
+            m.model_copy(update={"content": compact_tool_output(_text(m), self.tool_chars)})
+            if isinstance(m, ToolMessage) and len(_text(m)) > self.tool_chars else m
+            for m in turn
+        ]
+
+    def compact(self, system: Optional[SystemMessage],
+                messages: List[BaseMessage]) -> Tuple[Optional[SystemMessage], List[BaseMessage], int, int]:
+        """The system message and messages to send, with the token counts before and after."""
+        system_tokens = count_tokens_approximately([system]) if system is not None else 0
+        before = system_tokens + count_tokens_approximately(messages)
+        if before <= self.max_tokens:
+            return system, messages, before, before
+
+        turns = _split_turns(messages)
+        recent = turns[-self.keep_turns:]
+        older = [self._compact_turn(turn) for turn in turns[:-self.keep_turns]]
+        recent_tokens = sum(count_tokens_approximately(turn) for turn in recent)
+        older_tokens = [count_tokens_approximately(turn) for turn in older]
+
+        lines: List[str] = []
+        summary_tokens = 0
+        while older and system_tokens + summary_tokens + sum(older_tokens) + recent_tokens > self.max_tokens:
+            lines.append(self._summary_line(older.pop(0)))
+            older_tokens.pop(0)
+            summary_tokens = count_tokens_approximately([SystemMessage(content="\n".join(lines))])
+        # The summary itself must fit too; its oldest lines go first
+        omitted = 0
+        while len(lines) > 1 and system_tokens + summary_tokens + recent_tokens > self.max_tokens:
+            lines.pop(0)
+            omitted += 1
+            summary_tokens = count_tokens_approximately([SystemMessage(content="\n".join(lines))])
+
+        if lines:
+            header = "Summary of the earlier conversation"
+            if omitted:
+                header += f" ({omitted} older turns omitted)"
+            summary = f"{header}:\n" + "\n".join(f"- {line}" for line in lines)
+            base = _text(system) if system is not None else ""
+            system = SystemMessage(content=f"{base}\n\n{summary}" if base else summary)
+        compacted = [m for turn in older + recent for m in turn]
+        after = (count_tokens_approximately([system]) if system is not None else 0) + count_tokens_approximately(compacted)
+        return system, compacted, before, after
+
+    def _prepare(self, request: ModelRequest) -> ModelRequest:
+        system, messages, before, after = self.compact(request.system_message, request.messages)
+        try:
+            thread_id = get_config().get("configurable", {}).get("thread_id")
+        except RuntimeError:
+            thread_id = None
+        with self._lock:
+            self.calls += 1
+            self.tokens_before += before
+            self.tokens_after += after
+            if after < before:
+                self.compacted_calls += 1
+                self._saved[thread_id] = self._saved.get(thread_id, 0) + before - after
+        if after == before:
+            return request
+        return request.override(system_message=system, messages=messages)
+
+    def wrap_model_call(self, request, handler):
+        return handler(self._prepare(request))
+
+    async def awrap_model_call(self, request, handler):
+        return await handler(self._prepare(request))
+
+    def pop_tokens_saved(self, thread_id: str) -> int:
+        """Tokens saved across the model calls of the turn that just ended in ``thread_id``."""
+        with self._lock:
+            return self._saved.pop(thread_id, 0)
+
+    def stats(self) -> Dict[str, object]:
+        with self._lock:
+            return {
+                "max_tokens": self.max_tokens,
+                "model_calls": self.calls,
+                "compacted_calls": self.compacted_calls,
+                "prompt_tokens_before": self.tokens_before,
+                "prompt_tokens_after": self.tokens_after,
+                "prompt_tokens_saved": self.tokens_before - self.tokens_after,
+            }
@@ -0,0 +1,166 @@
+import asyncio
+import hashlib
+import os
+import sys
+import threading
+from array import array
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Sequence, Tuple
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from langchain_core.embeddings import Embeddings
+
+import metrics
+from db import SQLiteConnectionPool
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS embeddings (
+    key TEXT PRIMARY KEY,
+    vector BLOB NOT NULL
+);
+"""
+
+SQL_SELECT = "SELECT vector FROM embeddings WHERE key = ?"
+SQL_INSERT = "INSERT OR IGNORE INTO embeddings VALUES (?, ?)"
+
+
+class CachedEmbeddings(Embeddings):
+    """Embeddings wrapper that caches vectors by model and text hash.
+
+    Lookups go to an in-memory LRU of ``memory_size`` vectors first, then to
+    an optional SQLite store at ``path`` shared by all workers, and only then
+    to the wrapped provider. Document and query embeddings are cached
+    separately because some providers embed them differently.
+    """
+
+    def __init__(self, underlying: Embeddings, model: str, path: Optional[str] = None,
+                 memory_size: int = 10_000):
+        self.underlying = underlying
+        self.model = model
+        self.memory_size = memory_size
+        self.pool = SQLiteConnectionPool(path, size=4) if path else None
+        self._memory: "OrderedDict[str, array]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        if self.pool is not None:
+            with self.pool.connection() as conn:
+                conn.executescript(SCHEMA)
+
+    def _key(self, kind: str, text: str) -> str:
+        return hashlib.sha256(f"{self.model}\0{kind}\0{text}".encode()).hexdigest()
+
+    def _remember(self, key: str, vector: array):
+        self._memory[key] = vector
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_size:
+            self._memory.popitem(last=False)
+
+    def _lookup_memory(self, keys: Sequence[str]) -> Dict[str, array]:
+        found = {}
+        with self._lock:
+            for key in keys:
+                vector = self._memory.get(key)
+                if vector is not None:
+                    self._memory.move_to_end(key)
+                    found[key] = vector
+            self.memory_hits += len(found)
+        return found
+
+    def _lookup_disk(self, keys: Sequence[str]) -> Dict[str, array]:
+        if self.pool is None or not keys:
+            return {}
+        found = {}
+        with self.pool.connection() as conn:
+            for key in keys:
+                row = conn.execute(SQL_SELECT, (key,)).fetchone()
+                if row is not None:
+                    vector = array("f")
+                    vector.frombytes(row[0])
+                    found[key] = vector
+        with self._lock:
+            self.disk_hits += len(found)
+            for key, vector in found.items():
+                self._remember(key, vector)
+        return found
+
+    def _store(self, items: Sequence[Tuple[str, List[float]]]) -> Dict[str, array]:
+        stored = {key: array("f", vector) for key, vector in items}
+        with self._lock:
+            self.misses += len(stored)
+            for key, vector in stored.items():
+                self._remember(key, vector)
+        if self.pool is not None and stored:
+            # One transaction per batch rather than one autocommit per row
+            with self.pool.transaction() as conn:
+                conn.executemany(SQL_INSERT, ((key, vector.tobytes()) for key, vector in stored.items()))
+        return stored
+
+    def _cached(self, kind: str, texts: Sequence[str]) -> Tuple[List[str], Dict[str, array], Dict[str, str]]:
+        keys = [self._key(kind, text) for text in texts]
+        found = self._lookup_memory(keys)
+        found.update(self._lookup_disk([k for k in keys if k not in found]))
+        # Deduplicated texts still to embed, by key
+        missing = {key: text for key, text in zip(keys, texts) if key not in found}
+        return keys, found, missing
+
+    @contextmanager
+    def _provider_call(self, kind: str, texts: int):
+        """Time a call to the wrapped provider and count it in the metrics."""
+        metrics.EMBEDDED_TEXTS.labels(kind).inc(texts)
+        try:
+            with metrics.EMBEDDING_SECONDS.labels(kind).time():
+                yield
+        except Exception:
+            metrics.EMBEDDING_FAILURES.labels(kind).inc()
+            raise
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        keys, found, missing = self._cached("document", texts)
+        if missing:
+            with self._provider_call("document", len(missing)):
+                vectors = self.underlying.embed_documents(list(missing.values()))
+            found.update(self._store(list(zip(missing.keys(), vectors))))
+        return [found[key].tolist() for key in keys]
+
+    def embed_query(self, text: str) -> List[float]:
+        keys, found, missing = self._cached("query", [text])
+        if missing:
+            with self._provider_call("query", 1):
+                vector = self.underlying.embed_query(text)
+            found.update(self._store([(keys[0], vector)]))
+        return found[keys[0]].tolist()
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        keys, found, missing = await asyncio.to_thread(self._cached, "document", texts)
+        if missing:
+            with self._provider_call("document", len(missing)):
+                vectors = await self.underlying.aembed_documents(list(missing.values()))
+            found.update(await asyncio.to_thread(self._store, list(zip(missing.keys(), vectors))))
+        return [found[key].tolist() for key in keys]
+
+    async def aembed_query(self, text: str) -> List[float]:
+        keys = [self._key("query", text)]
+        found = self._lookup_memory(keys)
+        if not found:
+            keys, found, missing = await asyncio.to_thread(self._cached, "query", [text])
+            if missing:
+                with self._provider_call("query", 1):
+                    vector = await self.underlying.aembed_query(text)
+                found.update(await asyncio.to_thread(self._store, [(keys[0], vector)]))
+        return found[keys[0]].tolist()
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            hits = self.memory_hits + self.disk_hits
+            total = hits + self.misses
+            return {
+                "memory_hits": self.memory_hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_rate": hits / total if total else 0.0,
+                "memory_entries": len(self._memory),
+            }
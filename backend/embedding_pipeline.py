@@ -0,0 +1,120 @@
+import random
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from itertools import islice
+from typing import Dict, Hashable, Iterable, Iterator, List, Tuple
+
+from langchain_core.embeddings import Embeddings
+
+
+class EmbeddingBuildError(RuntimeError):
+    """Raised at the end of a run in which some batches failed after all retries."""
+
+    def __init__(self, failed_batches: int, failed_chunks: int, last_error: Exception):
+        super().__init__(f"{failed_batches} embedding batches ({failed_chunks} chunks) failed: {last_error}")
+        self.failed_batches = failed_batches
+        self.failed_chunks = failed_chunks
+        self.last_error = last_error
+
+
+class EmbeddingPipeline:
+    """Embeds a stream of texts in batches on a bounded thread pool.
+
+    Texts are pulled from the input iterator only as batches are submitted,
+    so chunking overlaps with embedding and at most ``2 * concurrency``
+    batches are held in memory. Each batch is retried with jittered
+    exponential backoff; a batch that still fails is counted and the rest
+    of the run carries on, so a retry only has to redo the failed batches.
+    """
+
+    def __init__(self, embeddings: Embeddings, batch_size: int = 64, concurrency: int = 4,
+                 max_retries: int = 3, backoff: float = 1.0, progress_interval: float = 5.0):
+        self.embeddings = embeddings
+        self.batch_size = batch_size
+        self.concurrency = concurrency
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.progress_interval = progress_interval
+        self.total = 0
+        self.embedded = 0
+        self.retries = 0
+        self.failed_batches = 0
+        self.failed_chunks = 0
+        self.started_at = 0.0
+        self.finished_at = 0.0
+        self._lock = threading.Lock()
+
+    def _embed_batch(self, texts: List[str]) -> List[List[float]]:
+        for attempt in range(self.max_retries + 1):
+            try:
+                return self.embeddings.embed_documents(texts)
+            except Exception:
+                if attempt == self.max_retries:
+                    raise
+                with self._lock:
+                    self.retries += 1
+                time.sleep(self.backoff * 2 ** attempt * random.uniform(0.5, 1.5))
+
+    def run(self, items: Iterable[Tuple[Hashable, str]],
+            total: int = 0) -> Iterator[Tuple[List[Hashable], List[List[float]]]]:
+        """Yield ``(keys, vectors)`` for each batch as it completes.
+
+        ``items`` are ``(key, text)`` pairs; ``total`` is only used for
+        progress reporting. Raises ``EmbeddingBuildError`` after the last
+        batch if any batch failed.
+        """
+        self.total = total
+        self.started_at = time.monotonic()
+        last_report = self.started_at
+        last_error = None
+        items = iter(items)
+        pending: Dict[Future, List[Hashable]] = {}
+        with ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix="embed") as executor:
+            while True:
+                while len(pending) < 2 * self.concurrency:
+                    batch = list(islice(items, self.batch_size))
+                    if not batch:
+                        break
+                    keys, texts = zip(*batch)
+                    pending[executor.submit(self._embed_batch, list(texts))] = list(keys)
+                if not pending:
+                    break
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    keys = pending.pop(future)
+                    try:
+                        vectors = future.result()
+                    except Exception as e:
+                        last_error = e
+                        self.failed_batches += 1
+                        self.failed_chunks += len(keys)
+                        continue
+                    self.embedded += len(keys)
+                    yield keys, vectors
+                now = time.monotonic()
+                if now - last_report >= self.progress_interval:
+                    last_report = now
+                    print(f"RAG embedding: {self.progress_text()}")
+        self.finished_at = time.monotonic()
+        if self.failed_batches:
+            raise EmbeddingBuildError(self.failed_batches, self.failed_chunks, last_error)
+
+    def progress_text(self) -> str:
+        stats = self.stats()
+        of_total = f"/{self.total}" if self.total else ""
+        return f"{self.embedded}{of_total} chunks, {stats['chunks_per_second']:.0f}/s, {self.failed_batches} failed batches"
+
+    def stats(self) -> Dict[str, float]:
+        end = self.finished_at or time.monotonic()
+        elapsed = end - self.started_at if self.started_at else 0.0
+        return {
+            "total": self.total,
+            "embedded": self.embedded,
+            "retries": self.retries,
+            "failed_batches": self.failed_batches,
+            "failed_chunks": self.failed_chunks,
+            "seconds": round(elapsed, 3),
+            "chunks_per_second": self.embedded / elapsed if elapsed else 0.0,
+            "running": bool(self.started_at) and not self.finished_at,
+        }
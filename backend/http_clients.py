@@ -0,0 +1,58 @@
+import threading
+from typing import Optional
+
+import httpx
+
+from config import settings
+
+# Providers whose LangChain clients accept http_client / http_async_client
+SHARED_POOL_PROVIDERS = ("openai", "azure_openai")
+
+_lock = threading.Lock()
+_client: Optional[httpx.Client] = None
+_async_client: Optional[httpx.AsyncClient] = None
+
+
+def _limits() -> httpx.Limits:
+    return httpx.Limits(
+        max_connections=settings.llm_http_max_connections,
+        max_keepalive_connections=settings.llm_http_max_connections,
+    )
+
+
+def get_http_client() -> httpx.Client:
+    """Connection pool shared by the sync chat model and embedding clients."""
+    global _client
+    if _client is None:
+        with _lock:
+            if _client is None:
+                _client = httpx.Client(limits=_limits(), timeout=settings.llm_http_timeout_seconds)
+    return _client
+
+
+def get_async_http_client() -> httpx.AsyncClient:
+    """Connection pool shared by the async chat model and embedding clients."""
+    global _async_client
+    if _async_client is None:
+        with _lock:
+            if _async_client is None:
+                _async_client = httpx.AsyncClient(limits=_limits(), timeout=settings.llm_http_timeout_seconds)
+    return _async_client
+
+
+def shared_pool_kwargs(provider: Optional[str]) -> dict:
+    """Client kwargs that make a provider's LangChain client use the shared pools, if it supports them."""
+    if provider not in SHARED_POOL_PROVIDERS:
+        return {}
+    return {"http_client": get_http_client(), "http_async_client": get_async_http_client()}
+
+
+async def close_http_clients():
+    global _client, _async_client
+    with _lock:
+        client, async_client = _client, _async_client
+        _client = _async_client = None
+    if client is not None:
+        client.close()
+    if async_client is not None:
+        await async_client.aclose()
@@ -0,0 +1,143 @@
+import json
+import os
+import re
+import sys
+import threading
+import time
+from typing import Dict, List, NamedTuple, Optional
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage, ToolMessage
+
+import metrics
+from models import BookingDetails
+from tools import cancel_booking, get_booking_details
+
+# Each pattern must match the whole message, so anything beyond a single,
+# fully specified request ("...and what is the refund fee?") goes to the agent
+_GREETING = r"(?:(?:hi|hello|hey)\b[\s,!.]*)?(?:please\s+)?(?:(?:can|could|would)\s+you\s+(?:please\s+)?)?"
+_BOOKING = r"(?:my\s+)?(?:booking|reservation)?\s*(?:number\s*|no\.?\s*)?#?\s*(?P<number>\d{3,10})"
+_NAME = (r"(?:\s*,\s*|\s+)(?:for\s+|under\s+|name\s+|name:\s*)?"
+         r"(?P<first>[a-z][a-z'-]*)\s+(?P<last>[a-z][a-z'-]*)")
+_END = r"(?:\s*,?\s*(?:please|thanks|thank\s+you))?[\s?.!]*"
+
+_PATTERNS = {
+    "status": re.compile(
+        _GREETING
+        + r"(?:(?:what(?:'s|\s+is)\s+the\s+)?(?:status|details)\s+(?:of|for|on)\s+"
+          r"|(?:check|show|get|look\s*up)\s+(?:me\s+)?(?:the\s+)?(?:(?:status|details)\s+(?:of|for|on)\s+)?)"
+        + _BOOKING + _NAME + _END,
+        re.IGNORECASE,
+    ),
+    "cancel": re.compile(_GREETING + r"cancel\s+" + _BOOKING + _NAME + _END, re.IGNORECASE),
+}
+
+_TOOLS = {"status": get_booking_details, "cancel": cancel_booking}
+
+
+class Intent(NamedTuple):
+    action: str
+    booking_number: str
+    first_name: str
+    last_name: str
+
+
+class RoutedReply(NamedTuple):
+    """Templated answer and the messages that record the turn as if the agent had run it."""
+    tool: str
+    text: str
+    messages: List[BaseMessage]
+
+
+def match_intent(message: str) -> Optional[Intent]:
+    text = " ".join(message.split())
+    for action, pattern in _PATTERNS.items():
+        found = pattern.fullmatch(text)
+        if found:
+            return Intent(action, found["number"], found["first"], found["last"])
+    return None
+
+
+def _status_text(booking: BookingDetails) -> str:
+    return (
+        f"Here are the details of booking {booking.booking_number} for "
+        f"{booking.first_name} {booking.last_name}:\n"
+        f"- Status: {booking.booking_status.value}\n"
+        f"- Flight: {booking.from_airport} to {booking.to_airport} on {booking.date.isoformat()}\n"
+        f"- Seat: {booking.seat_number} ({booking.booking_class})\n"
+        f"- Ticket: {booking.ticket_number}"
+    )
+
+
+class IntentRouter:
+    """Answers fully specified booking lookups and cancellations without the LLM.
+
+    A message is routed only if it matches one of the request patterns in
+    full and its tool call succeeds; everything else, including typos in
+    the name or a booking that cannot be cancelled, falls through to the
+    agent. Routed turns call the same booking tools the agent would, so
+    the recorded history is the same as an agent turn.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.messages = 0
+        self.bypassed: Dict[str, int] = {action: 0 for action in _PATTERNS}
+        self.bypass_seconds = 0.0
+        self.agent_turns = 0
+        self.agent_seconds = 0.0
+
+    def route(self, message: str) -> Optional[RoutedReply]:
+        started = time.perf_counter()
+        intent = match_intent(message)
+        reply = self._answer(message, intent) if intent else None
+        with self._lock:
+            self.messages += 1
+            if reply is not None:
+                self.bypassed[intent.action] += 1
+                self.bypass_seconds += time.perf_counter() - started
+        return reply
+
+    def _answer(self, message: str, intent: Intent) -> Optional[RoutedReply]:
+        tool = _TOOLS[intent.action]
+        args = {"booking_number": intent.booking_number,
+                "first_name": intent.first_name, "last_name": intent.last_name}
+        started = time.perf_counter()
+        result = tool.func(**args)
+        metrics.TOOL_SECONDS.labels(tool.name, metrics.tool_status(result)).observe(time.perf_counter() - started)
+        if not result["success"]:
+            return None
+        if intent.action == "status":
+            text = _status_text(BookingDetails.model_validate(result["booking"]))
+        else:
+            text = result["message"]
+
+        call_id = f"route_{time.time_ns()}"
+        messages = [
+            HumanMessage(content=message),
+            AIMessage(content="", tool_calls=[{"name": tool.name, "args": args, "id": call_id}]),
+            ToolMessage(content=json.dumps(result, default=str), tool_call_id=call_id, name=tool.name),
+            AIMessage(content=text),
+        ]
+        return RoutedReply(tool.name, text, messages)
+
+    def record_agent_turn(self, seconds: float):
+        with self._lock:
+            self.agent_turns += 1
+            self.agent_seconds += seconds
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            bypassed = sum(self.bypassed.values())
+            avg_agent = self.agent_seconds / self.agent_turns if self.agent_turns else 0.0
+            avg_bypass = self.bypass_seconds / bypassed if bypassed else 0.0
+            return {
+                "messages": self.messages,
+                "bypassed": dict(self.bypassed),
+                "bypass_rate": bypassed / self.messages if self.messages else 0.0,
+                "avg_bypass_ms": avg_bypass * 1000,
+                "avg_agent_turn_ms": avg_agent * 1000,
+                # Estimated from the average agent turn seen by this process
+                "latency_saved_seconds": max(avg_agent - avg_bypass, 0.0) * bypassed if self.agent_turns else None,
+            }
@@ -1,10 +1,18 @@
+import time
+
+# Taken before the heavy imports so time-to-ready covers them
+_STARTED = time.perf_counter()
+
 import os
 import sys
-from fastapi import FastAPI, HTTPException, Depends
+from contextlib import asynccontextmanager
+from datetime import date
+from fastapi import FastAPI, HTTPException, Depends, Header, Query, Response
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
-from typing import Optional, Iterator
+from typing import AsyncIterator, Optional, Iterator
+import asyncio
 import json
 
 # Based on: https://github.com/tzolov/playground-flight-booking
@@ -13,18 +21,50 @@ import json
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
 from models import (
-    BookingDetails, ChangeBookingRequest, CancelBookingRequest,
-    ChatRequest
+    BookingDetails, BookingFilter, BookingStatus, BookingClass,
+    ChangeBookingRequest, CancelBookingRequest, ChatRequest,
+    BatchChangeRequest, BatchCancelRequest, BatchResult,
 )
-from booking_service import get_booking_service
+from booking_service import BookingConflictError, get_booking_service, decode_cursor
+from seat_inventory import SeatUnavailableError
 from chat_service import get_chat_service
+from rag_service import get_rag_service
+from tools import get_tool_cache
 from config import settings
+from admission import AdmissionController, AdmissionRejected
+from chat_streams import ChatStreamRegistry, TurnInProgressError
+from http_clients import close_http_clients
+from warmup import Readiness
+import metrics
+
+readiness = Readiness(_STARTED)
+admission = AdmissionController(
+    max_concurrent=settings.chat_max_concurrent_turns,
+    max_queue=settings.chat_max_queued_turns,
+    queue_timeout=settings.chat_queue_timeout_seconds,
+)
+chat_streams = ChatStreamRegistry(ttl=settings.chat_stream_buffer_ttl_seconds)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Build the services in the background so the first user doesn't pay for it;
+    # the app accepts requests meanwhile and /ready reports progress
+    readiness.start({
+        "bookings": get_booking_service,
+        "rag": get_rag_service,
+        "chat": get_chat_service,
+    } if settings.startup_warmup else {})
+    yield
+    await close_http_clients()
+
 
 # Create FastAPI app
 app = FastAPI(
     title=settings.app_name,
     description="AI-powered Flight Booking Assistant with LangChain",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan,
 )
 
 # CORS middleware
@@ -34,16 +74,71 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],
 )
 
+# Latency of the booking and seat endpoints, per route
+app.add_middleware(metrics.RequestMetricsMiddleware, prefixes=("/api/bookings", "/api/flights"))
+
 
 # ============ Booking API Endpoints ============
 
+NDJSON_BATCH_SIZE = 100
+
+
+def _ndjson_lines(rows: Iterator[str]) -> Iterator[str]:
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) == NDJSON_BATCH_SIZE:
+            yield "\n".join(batch) + "\n"
+            batch = []
+    if batch:
+        yield "\n".join(batch) + "\n"
+
+
 @app.get("/api/bookings", response_model=list[BookingDetails])
-def get_bookings():
-    """Get all bookings"""
+def get_bookings(
+    response: Response,
+    status: Optional[BookingStatus] = None,
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+    airport: Optional[str] = None,
+    booking_class: Optional[BookingClass] = None,
+    cursor: Optional[str] = None,
+    limit: Optional[int] = Query(None, ge=1, le=settings.bookings_max_page_size),
+    format: str = Query("json", pattern="^(json|ndjson)$"),
+):
+    """Get bookings, one page at a time or streamed as NDJSON
+
+    The cursor of the next page is returned in the X-Next-Cursor header.
+    With format=ndjson every matching booking after the cursor is streamed
+    lazily, one JSON object per line.
+    """
     service = get_booking_service()
-    return service.get_bookings()
+    filters = BookingFilter(
+        status=status,
+        date_from=date_from,
+        date_to=date_to,
+        airport=airport,
+        booking_class=booking_class,
+    )
+    if cursor:
+        try:
+            decode_cursor(cursor)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+
+    if format == "ndjson":
+        rows = service.iter_booking_json(filters, cursor)
+        if limit is not None:
+            rows = (row for _, row in zip(range(limit), rows))
+        return StreamingResponse(_ndjson_lines(rows), media_type="application/x-ndjson")
+
+    page, next_cursor = service.list_bookings(filters, cursor, limit or settings.bookings_page_size)
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return page
 
 
 @app.get("/api/bookings/{booking_number}", response_model=BookingDetails)
@@ -67,9 +162,12 @@ def change_booking(request: ChangeBookingRequest):
             request.last_name,
             request.new_date,
             request.from_airport,
-            request.to_airport
+            request.to_airport,
+            expected_version=request.expected_version,
         )
         return {"success": True, "message": f"Booking {request.booking_number} changed successfully"}
+    except (BookingConflictError, SeatUnavailableError) as e:
+        raise HTTPException(status_code=409, detail=str(e))
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
 
@@ -79,33 +177,134 @@ def cancel_booking(request: CancelBookingRequest):
     """Cancel a booking"""
     service = get_booking_service()
     try:
-        service.cancel_booking(request.booking_number, request.first_name, request.last_name)
+        service.cancel_booking(request.booking_number, request.first_name, request.last_name,
+                               expected_version=request.expected_version)
         return {"success": True, "message": f"Booking {request.booking_number} cancelled successfully"}
+    except BookingConflictError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@app.post("/api/bookings/batch/change", response_model=BatchResult)
+def change_bookings(request: BatchChangeRequest):
+    """Change many bookings, listed as items or picked by a selector
+
+    Every item gets its own result with the status code and error the
+    single-item endpoint would have returned.
+    """
+    service = get_booking_service()
+    try:
+        return service.change_bookings(request)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@app.post("/api/bookings/batch/cancel", response_model=BatchResult)
+def cancel_bookings(request: BatchCancelRequest):
+    """Cancel many bookings, listed as items or picked by a selector"""
+    service = get_booking_service()
+    try:
+        return service.cancel_bookings(request)
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
 
 
 @app.post("/api/bookings/{booking_number}/seat")
-def change_seat(booking_number: str, first_name: str, last_name: str, seat_number: str):
-    """Change seat number"""
+def change_seat(booking_number: str, first_name: str, last_name: str, seat_number: str,
+                expected_version: Optional[int] = None, hold_token: Optional[str] = None):
+    """Change seat number
+
+    The seat must be free, or held with hold_token. Taken seats return 409.
+    """
+    service = get_booking_service()
+    try:
+        seat = service.change_seat(booking_number, first_name, last_name, seat_number,
+                                   expected_version=expected_version, hold_token=hold_token)
+        return {"success": True, "message": f"Seat changed to {seat}", "seat_number": seat}
+    except (BookingConflictError, SeatUnavailableError) as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+# ============ Seat Inventory Endpoints ============
+
+@app.get("/api/flights/{flight_date}/{from_airport}/{to_airport}/seats")
+def get_seat_map(flight_date: date, from_airport: str, to_airport: str):
+    """Get the seat layout of a flight with its occupied and held seats"""
+    return get_booking_service().get_seat_map(flight_date, from_airport, to_airport)
+
+
+@app.post("/api/flights/{flight_date}/{from_airport}/{to_airport}/seats/{seat_number}/hold")
+def hold_seat(flight_date: date, from_airport: str, to_airport: str, seat_number: str):
+    """Hold a free seat for a few minutes; pass the returned hold_token to the seat change"""
     service = get_booking_service()
     try:
-        service.change_seat(booking_number, first_name, last_name, seat_number)
-        return {"success": True, "message": f"Seat changed to {seat_number}"}
+        return service.hold_seat(flight_date, from_airport, to_airport, seat_number)
+    except SeatUnavailableError as e:
+        raise HTTPException(status_code=409, detail=str(e))
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
 
 
 # ============ Chat API Endpoints ============
 
+def _sse_frame(data: dict, endpoint: str, event_id: Optional[str] = None) -> str:
+    frame = f"data: {json.dumps(data)}\n\n"
+    if event_id is not None:
+        frame = f"id: {event_id}\n{frame}"
+    metrics.SSE_CHUNKS.labels(endpoint).inc()
+    # json.dumps escapes non-ASCII, so characters are bytes
+    metrics.SSE_BYTES.labels(endpoint).inc(len(frame))
+    return frame
+
+
+async def _chat_frames(message: str, chat_id: str) -> AsyncIterator[dict]:
+    chat_service = await asyncio.to_thread(get_chat_service)
+    async for event in chat_service.achat_events(message, chat_id):
+        if event["type"] in ("token", "error"):
+            yield {"chunk": event["content"]}
+        else:
+            yield {"event": event["type"], **{k: v for k, v in event.items() if k != "type"}}
+    yield {"chunk": "[DONE]"}
+
+
 @app.post("/api/chat/stream")
-async def chat_stream(request: ChatRequest):
-    """Chat streaming endpoint for AI responses"""
-    def generate():
-        chat_service = get_chat_service()
-        for chunk in chat_service.chat_stream(request.message, request.chat_id):
-            yield f"data: {json.dumps({'chunk': chunk})}\n\n"
-        yield f"data: {json.dumps({'chunk': '[DONE]'})}\n\n"
+async def chat_stream(request: ChatRequest, last_event_id: Optional[str] = Header(None)):
+    """Chat streaming endpoint for AI responses
+
+    Answer text is sent as {"chunk": ...} frames; tool activity is sent as
+    {"event": "tool_start" | "tool_end", "tool": ...} frames. Every frame has
+    an id; sending the last one seen as Last-Event-ID replays the rest of
+    that reply without generating it again (410 once it has expired).
+    Beyond the configured concurrent turns and wait queue, answers 429
+    with Retry-After.
+    """
+    if last_event_id:
+        resumed = chat_streams.resume(request.chat_id, last_event_id)
+        if resumed is None:
+            metrics.SSE_RESUMES.labels("gone").inc()
+            raise HTTPException(status_code=410, detail="That reply is no longer available to resume.")
+        metrics.SSE_RESUMES.labels("resumed").inc()
+        turn, after = resumed
+    else:
+        try:
+            lease = await admission.acquire()
+        except AdmissionRejected as e:
+            raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": str(e.retry_after)})
+        # The slot is held by the generation, which keeps going if the client drops
+        try:
+            turn = chat_streams.start(request.chat_id, _chat_frames(request.message, request.chat_id),
+                                      on_done=lease.release)
+        except TurnInProgressError as e:
+            lease.release()
+            raise HTTPException(status_code=409, detail=str(e))
+        after = 0
+
+    async def generate():
+        async for event_id, frame in turn.follow(after):
+            yield _sse_frame(frame, "chat", event_id)
 
     return StreamingResponse(
         generate(),
@@ -118,14 +317,61 @@ async def chat_stream(request: ChatRequest):
     )
 
 
+@app.get("/api/chat/{chat_id}/history")
+def get_chat_history(chat_id: str):
+    """Get the number of messages kept for a conversation"""
+    chat_service = get_chat_service()
+    return {"chat_id": chat_id, "messages": chat_service.get_chat_history_length(chat_id)}
+
+
+@app.delete("/api/chat/{chat_id}")
+def clear_chat(chat_id: str):
+    """Forget a conversation"""
+    chat_service = get_chat_service()
+    chat_service.clear_chat_history(chat_id)
+    return {"success": True, "message": f"Chat {chat_id} cleared"}
+
+
+@app.get("/api/chat/router/stats")
+def chat_router_stats():
+    """Get intent router bypass rate and estimated latency saved"""
+    chat_service = get_chat_service()
+    return chat_service.router.stats() if chat_service.router else {"enabled": False}
+
+
+@app.get("/api/chat/admission/stats")
+def chat_admission_stats():
+    """Get running/waiting chat turns and rejection counters"""
+    return admission.stats()
+
+
+@app.get("/api/chat/streams/stats")
+def chat_stream_stats():
+    """Get buffered and in-flight chat turns and resume counters"""
+    return chat_streams.stats()
+
+
+@app.get("/api/chat/context/stats")
+def chat_context_stats():
+    """Get prompt tokens before and after context compaction"""
+    chat_service = get_chat_service()
+    return chat_service.context_budget.stats() if chat_service.context_budget else {"enabled": False}
+
+
+@app.get("/api/chat/tools/stats")
+def chat_tool_cache_stats():
+    """Get per-conversation booking tool cache counters"""
+    return get_tool_cache().stats()
+
+
 @app.post("/api/chat/rag")
 async def chat_with_rag(request: ChatRequest):
     """Chat with RAG context for policy questions"""
     def generate():
         chat_service = get_chat_service()
         for chunk in chat_service.chat_with_rag(request.message, request.chat_id):
-            yield f"data: {json.dumps({'chunk': chunk})}\n\n"
-        yield f"data: {json.dumps({'chunk': '[DONE]'})}\n\n"
+            yield _sse_frame({"chunk": chunk}, "chat_rag")
+        yield _sse_frame({"chunk": "[DONE]"}, "chat_rag")
 
     return StreamingResponse(
         generate(),
@@ -138,6 +384,32 @@ async def chat_with_rag(request: ChatRequest):
     )
 
 
+# ============ RAG API Endpoints ============
+
+@app.get("/api/rag/stats")
+def rag_stats():
+    """Get RAG cache counters"""
+    return get_rag_service().stats()
+
+
+@app.post("/api/rag/reload")
+def rag_reload():
+    """Re-index changed knowledge base files"""
+    try:
+        return get_rag_service().reload()
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Reload failed: {e}")
+
+
+# ============ Monitoring ============
+
+@app.get("/metrics")
+def get_metrics():
+    """Prometheus metrics: LLM, tool, RAG, embedding, SSE and booking API latencies"""
+    body, content_type = metrics.render()
+    return Response(content=body, media_type=content_type)
+
+
 # ============ Health Check ============
 
 @app.get("/health")
@@ -145,6 +417,15 @@ def health_check():
     return {"status": "healthy", "service": settings.app_name}
 
 
+@app.get("/ready")
+def ready_check(response: Response):
+    """503 until the booking, RAG and chat services are built; reports time-to-ready"""
+    status = readiness.status()
+    if not status["ready"]:
+        response.status_code = 503
+    return status
+
+
 @app.get("/")
 def root():
     return {
@@ -153,7 +434,8 @@ def root():
         "endpoints": {
             "bookings": "/api/bookings",
             "chat": "/api/chat/stream",
-            "health": "/health"
+            "health": "/health",
+            "ready": "/ready"
         }
     }
 
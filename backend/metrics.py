@@ -0,0 +1,152 @@
+import os
+import time
+from typing import Any, Dict, Optional, Tuple
+from uuid import UUID
+
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.messages import ToolMessage
+from prometheus_client import (
+    CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Gauge, Histogram, generate_latest, multiprocess,
+)
+
+# LLM calls take seconds, not milliseconds
+_LLM_BUCKETS = (0.1, 0.25, 0.5, 1, 2, 4, 8, 16, 32, 64)
+
+LLM_SECONDS = Histogram("llm_request_seconds", "Duration of chat model calls", ["model"], buckets=_LLM_BUCKETS)
+LLM_TTFT_SECONDS = Histogram("llm_time_to_first_token_seconds", "Time from a chat model call to its first streamed token",
+                             ["model"], buckets=_LLM_BUCKETS)
+LLM_FAILURES = Counter("llm_requests_failed_total", "Chat model calls that raised", ["model"])
+TOOL_SECONDS = Histogram("tool_seconds", "Duration of agent tool calls", ["tool", "status"])
+CHAT_TURN_SECONDS = Histogram("chat_turn_seconds", "Duration of a whole chat turn", ["path"], buckets=_LLM_BUCKETS)
+CHAT_RETRIES = Counter("chat_turn_retries_total", "Agent runs resumed after a retryable provider error", ["error"])
+CHAT_REJECTED = Counter("chat_admission_rejected_total", "Chat requests turned away with 429", ["reason"])
+PROMPT_TOKENS_SAVED = Histogram("chat_prompt_tokens_saved", "Prompt tokens removed by context compaction, per agent turn",
+                                buckets=(0, 100, 500, 1000, 2000, 5000, 10000, 20000, 50000))
+CHAT_ERRORS = Counter("chat_errors_total", "Chat turns that failed and were answered with an apology", ["error"])
+RAG_SEARCH_SECONDS = Histogram("rag_search_seconds", "Duration of RAGService searches, caches included")
+RAG_RETRIEVAL_SECONDS = Histogram("rag_retrieval_seconds", "Duration of index ranking, without query embedding",
+                                  ["mode"])
+RAG_FALLBACKS = Counter("rag_lexical_fallbacks_total", "Searches answered by BM25 because query embedding failed")
+EMBEDDING_SECONDS = Histogram("embedding_request_seconds", "Duration of embedding provider calls", ["kind"])
+EMBEDDING_FAILURES = Counter("embedding_requests_failed_total", "Embedding provider calls that raised", ["kind"])
+EMBEDDED_TEXTS = Counter("embedded_texts_total", "Texts sent to the embedding provider", ["kind"])
+SSE_BYTES = Counter("sse_bytes_total", "Bytes of server-sent event frames sent", ["endpoint"])
+SSE_RESUMES = Counter("sse_resumes_total", "Chat stream reconnects with Last-Event-ID", ["outcome"])
+SSE_CHUNKS = Counter("sse_chunks_total", "Server-sent event frames sent", ["endpoint"])
+STARTUP_SECONDS = Gauge("startup_seconds", "Seconds from app start until a component was warmed up", ["component"])
+HTTP_SECONDS = Histogram("http_request_seconds", "Duration of booking API requests", ["method", "route", "status"])
+
+
+def tool_status(output: Any) -> str:
+    """"success", or "failed" for the booking tools' ``{"success": False}`` results and error ToolMessages."""
+    if isinstance(output, ToolMessage):
+        return "failed" if output.status == "error" else "success"
+    if isinstance(output, dict) and output.get("success") is False:
+        return "failed"
+    return "success"
+
+
+class MetricsCallbackHandler(BaseCallbackHandler):
+    """Records chat model latency, time to first token and tool durations.
+
+    Pass it in the ``callbacks`` of the agent's run config. One instance
+    serves all conversations; in-flight runs are tracked by run id.
+    """
+
+    # Only timestamps and counters: cheap enough to run on the event loop
+    run_inline = True
+
+    def __init__(self):
+        # run id -> (model, start time, first token seen)
+        self._llm_runs: Dict[UUID, Tuple[str, float, bool]] = {}
+        # run id -> (tool name, start time)
+        self._tool_runs: Dict[UUID, Tuple[str, float]] = {}
+
+    def on_chat_model_start(self, serialized: Optional[Dict[str, Any]], messages, *, run_id: UUID,
+                            metadata: Optional[Dict[str, Any]] = None, **kwargs):
+        model = (metadata or {}).get("ls_model_name") or (serialized or {}).get("name") or "unknown"
+        self._llm_runs[run_id] = (model, time.perf_counter(), False)
+
+    def on_llm_new_token(self, token: str, *, run_id: UUID, **kwargs):
+        run = self._llm_runs.get(run_id)
+        if run is not None and not run[2]:
+            self._llm_runs[run_id] = (run[0], run[1], True)
+            LLM_TTFT_SECONDS.labels(run[0]).observe(time.perf_counter() - run[1])
+
+    def on_llm_end(self, response, *, run_id: UUID, **kwargs):
+        run = self._llm_runs.pop(run_id, None)
+        if run is not None:
+            LLM_SECONDS.labels(run[0]).observe(time.perf_counter() - run[1])
+
+    def on_llm_error(self, error: BaseException, *, run_id: UUID, **kwargs):
+        run = self._llm_runs.pop(run_id, None)
+        if run is not None:
+            LLM_FAILURES.labels(run[0]).inc()
+
+    def on_tool_start(self, serialized: Optional[Dict[str, Any]], input_str: str, *, run_id: UUID, **kwargs):
+        name = (serialized or {}).get("name") or kwargs.get("name") or "unknown"
+        self._tool_runs[run_id] = (name, time.perf_counter())
+
+    def on_tool_end(self, output: Any, *, run_id: UUID, **kwargs):
+        run = self._tool_runs.pop(run_id, None)
+        if run is not None:
+            TOOL_SECONDS.labels(run[0], tool_status(output)).observe(time.perf_counter() - run[1])
+
+    def on_tool_error(self, error: BaseException, *, run_id: UUID, **kwargs):
+        run = self._tool_runs.pop(run_id, None)
+        if run is not None:
+            TOOL_SECONDS.labels(run[0], "error").observe(time.perf_counter() - run[1])
+
+
+class RequestMetricsMiddleware:
+    """ASGI middleware timing requests whose path starts with one of ``prefixes``.
+
+    Requests are labelled by route template (``/api/bookings/{booking_number}``),
+    not by raw path, to keep the number of series bounded. The time runs
+    until the response body has been sent.
+    """
+
+    def __init__(self, app, prefixes: Tuple[str, ...]):
+        self.app = app
+        self.prefixes = prefixes
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not scope["path"].startswith(self.prefixes):
+            await self.app(scope, receive, send)
+            return
+        status = 500
+        started = time.perf_counter()
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            route = scope.get("route")
+            HTTP_SECONDS.labels(scope["method"], getattr(route, "path", "unmatched"), str(status)).observe(
+                time.perf_counter() - started)
+
+
+def render() -> Tuple[bytes, str]:
+    """Metrics in the Prometheus text format, and its content type.
+
+    With ``PROMETHEUS_MULTIPROC_DIR`` set, the samples of all worker
+    processes are aggregated; otherwise only this process is reported.
+    """
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return generate_latest(registry), CONTENT_TYPE_LATEST
+
+
+_callback_handler = MetricsCallbackHandler()
+
+
+def get_callback_handler() -> MetricsCallbackHandler:
+    return _callback_handler
@@ -1,5 +1,7 @@
+import sys
+from json.encoder import encode_basestring_ascii as _json_str
 from datetime import datetime, date
-from typing import Optional, List
+from typing import Dict, Optional, List
 from enum import Enum
 from pydantic import BaseModel
 
@@ -35,6 +37,116 @@ class Booking(BaseModel):
     booking_class: BookingClass
 
 
+_interned_dates: Dict[date, date] = {}
+
+
+def _intern_date(value: date) -> date:
+    return _interned_dates.setdefault(value, value)
+
+
+class BookingRecord:
+    """Compact in-memory booking row used by the booking stores.
+
+    Holds the customer fields inline instead of a nested ``Customer`` model,
+    shares airport codes and flight dates between rows, and keeps status and
+    class as enum members. ``BookingDetails`` is only built when a row is
+    serialized.
+    """
+
+    __slots__ = (
+        "booking_number", "ticket_number", "date", "first_name", "last_name", "email", "phone",
+        "status", "from_airport", "to_airport", "seat_number", "booking_class", "version",
+    )
+
+    def __init__(self, booking_number: str, ticket_number: str, date: date, first_name: str,
+                 last_name: str, status: BookingStatus, from_airport: str, to_airport: str,
+                 seat_number: str, booking_class: BookingClass, email: Optional[str] = None,
+                 phone: Optional[str] = None, version: int = 1):
+        self.booking_number = booking_number
+        self.ticket_number = ticket_number
+        self.date = date
+        self.first_name = first_name
+        self.last_name = last_name
+        self.email = email
+        self.phone = phone
+        self.status = BookingStatus(status)
+        self.from_airport = from_airport
+        self.to_airport = to_airport
+        self.seat_number = seat_number
+        self.booking_class = BookingClass(booking_class)
+        # Incremented by every write; used for compare-and-swap updates
+        self.version = version
+
+    def __setattr__(self, name, value):
+        if name == "date":
+            value = _intern_date(value)
+        elif name in ("from_airport", "to_airport"):
+            value = sys.intern(value)
+        object.__setattr__(self, name, value)
+
+    def __repr__(self) -> str:
+        return (f"BookingRecord(booking_number={self.booking_number!r}, first_name={self.first_name!r}, "
+                f"last_name={self.last_name!r}, date={self.date.isoformat()}, status={self.status.value})")
+
+    @classmethod
+    def from_booking(cls, booking: Booking) -> "BookingRecord":
+        return cls(
+            booking_number=booking.booking_number,
+            ticket_number=booking.ticket_number,
+            date=booking.date,
+            first_name=booking.customer.first_name,
+            last_name=booking.customer.last_name,
+            email=booking.customer.email,
+            phone=booking.customer.phone,
+            status=booking.status,
+            from_airport=booking.from_airport,
+            to_airport=booking.to_airport,
+            seat_number=booking.seat_number,
+            booking_class=booking.booking_class,
+        )
+
+    @property
+    def customer(self) -> Customer:
+        return Customer(first_name=self.first_name, last_name=self.last_name, email=self.email, phone=self.phone)
+
+    def to_dict(self) -> dict:
+        return {
+            "booking_number": self.booking_number,
+            "ticket_number": self.ticket_number,
+            "first_name": self.first_name,
+            "last_name": self.last_name,
+            "date": self.date.isoformat(),
+            "booking_status": self.status.value,
+            "from_airport": self.from_airport,
+            "to_airport": self.to_airport,
+            "seat_number": self.seat_number,
+            "booking_class": self.booking_class.value,
+            "version": self.version,
+        }
+
+    def to_json(self) -> str:
+        """Serialize to the ``BookingDetails`` JSON shape without building the model."""
+        return _BOOKING_JSON % (
+            _json_str(self.booking_number),
+            _json_str(self.ticket_number),
+            _json_str(self.first_name),
+            _json_str(self.last_name),
+            self.date.isoformat(),
+            self.status.value,
+            _json_str(self.from_airport),
+            _json_str(self.to_airport),
+            _json_str(self.seat_number),
+            self.booking_class.value,
+            self.version,
+        )
+
+
+_BOOKING_JSON = (
+    '{"booking_number":%s,"ticket_number":%s,"first_name":%s,"last_name":%s,"date":"%s",'
+    '"booking_status":"%s","from_airport":%s,"to_airport":%s,"seat_number":%s,"booking_class":"%s","version":%d}'
+)
+
+
 class BookingDetails(BaseModel):
     booking_number: str
     ticket_number: str
@@ -46,6 +158,46 @@ class BookingDetails(BaseModel):
     to_airport: str
     seat_number: str
     booking_class: str
+    version: int = 1
+
+    @classmethod
+    def from_booking(cls, booking: "BookingRecord") -> "BookingDetails":
+        return cls(
+            booking_number=booking.booking_number,
+            ticket_number=booking.ticket_number,
+            first_name=booking.first_name,
+            last_name=booking.last_name,
+            date=booking.date,
+            booking_status=booking.status,
+            from_airport=booking.from_airport,
+            to_airport=booking.to_airport,
+            seat_number=booking.seat_number,
+            booking_class=booking.booking_class.value,
+            version=booking.version,
+        )
+
+
+class BookingFilter(BaseModel):
+    status: Optional[BookingStatus] = None
+    date_from: Optional[date] = None
+    date_to: Optional[date] = None
+    airport: Optional[str] = None
+    booking_class: Optional[BookingClass] = None
+
+    def matches(self, booking: BookingRecord) -> bool:
+        if self.status is not None and booking.status != self.status:
+            return False
+        if self.date_from is not None and booking.date < self.date_from:
+            return False
+        if self.date_to is not None and booking.date > self.date_to:
+            return False
+        if self.airport is not None:
+            airport = self.airport.upper()
+            if booking.from_airport.upper() != airport and booking.to_airport.upper() != airport:
+                return False
+        if self.booking_class is not None and booking.booking_class != self.booking_class:
+            return False
+        return True
 
 
 class ChangeBookingRequest(BaseModel):
@@ -55,12 +207,66 @@ class ChangeBookingRequest(BaseModel):
     new_date: str
     from_airport: str
     to_airport: str
+    # Reject the change with 409 if the booking was modified since this version was read
+    expected_version: Optional[int] = None
 
 
 class CancelBookingRequest(BaseModel):
     booking_number: str
     first_name: str
     last_name: str
+    expected_version: Optional[int] = None
+
+
+class BookingSelector(BaseModel):
+    """Bookings on a date and/or route, looked up through the date and route indexes."""
+    flight_date: Optional[date] = None
+    from_airport: Optional[str] = None
+    to_airport: Optional[str] = None
+    status: Optional[BookingStatus] = None
+
+    def matches(self, booking: BookingRecord) -> bool:
+        if self.flight_date is not None and booking.date != self.flight_date:
+            return False
+        if self.from_airport and booking.from_airport.upper() != self.from_airport.upper():
+            return False
+        if self.to_airport and booking.to_airport.upper() != self.to_airport.upper():
+            return False
+        if self.status is not None and booking.status != self.status:
+            return False
+        return True
+
+
+class BatchChangeRequest(BaseModel):
+    # Either explicit operations or a selector, not both
+    items: List[ChangeBookingRequest] = []
+    selector: Optional[BookingSelector] = None
+    # New flight for the selected bookings; airports default to each booking's own
+    new_date: Optional[str] = None
+    from_airport: Optional[str] = None
+    to_airport: Optional[str] = None
+
+
+class BatchCancelRequest(BaseModel):
+    items: List[CancelBookingRequest] = []
+    selector: Optional[BookingSelector] = None
+
+
+class BatchItemResult(BaseModel):
+    booking_number: str
+    first_name: str
+    last_name: str
+    success: bool
+    # HTTP status the single-item endpoint would have returned
+    status_code: int = 200
+    error: Optional[str] = None
+
+
+class BatchResult(BaseModel):
+    total: int
+    succeeded: int
+    failed: int
+    results: List[BatchItemResult]
 
 
 class ChatMessage(BaseModel):
@@ -1,93 +1,591 @@
+import asyncio
+import hashlib
 import os
+import pickle
+import shutil
 import sys
+import tempfile
+import threading
 from pathlib import Path
-from typing import List
+from typing import TYPE_CHECKING, Dict, Iterator, List, Optional, Tuple
 
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
-from langchain_community.document_loaders import TextLoader
 from langchain_text_splitters import RecursiveCharacterTextSplitter
-from langchain_openai import OpenAIEmbeddings
-from langchain_nvidia_ai_endpoints import NVIDIAEmbeddings
 
-from langchain_community.vectorstores import FAISS
-from langchain_core.tools import tool
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from langchain_core.tools import StructuredTool
 
+import metrics
 from config import settings
+from embedding_cache import CachedEmbeddings
+from embedding_pipeline import EmbeddingPipeline
+from http_clients import shared_pool_kwargs
+from lexical_index import BM25Index, reciprocal_rank_fusion
+
+# faiss, numpy, the LangChain FAISS wrapper and the numpy-based result cache are
+# imported where they are used, so importing the app doesn't pay for them
+if TYPE_CHECKING:
+    import faiss
+    import numpy as np
+    from langchain_community.vectorstores import FAISS
+
+
+CHUNK_SIZE = 1000
+CHUNK_OVERLAP = 200
+SEARCH_K = 4
+# Candidates taken from each ranking before hybrid fusion
+HYBRID_CANDIDATES = 10
+# Files indexed from RAG_KNOWLEDGE_DIR, searched recursively
+KNOWLEDGE_PATTERNS = ("*.txt", "*.md")
+
+_SPLITTER = RecursiveCharacterTextSplitter(
+    chunk_size=CHUNK_SIZE,
+    chunk_overlap=CHUNK_OVERLAP,
+    length_function=len,
+)
+
+
+def _create_embeddings(config: dict) -> CachedEmbeddings:
+    # Provider packages are imported only when used: they dominate startup time
+    if config.get("model_provider") == "nvidia":
+        from langchain_nvidia_ai_endpoints import NVIDIAEmbeddings
+        embeddings = NVIDIAEmbeddings(
+            model=config.get("model"),
+            api_key=config.get("api_key"),
+        )
+    else:
+        from langchain_openai import OpenAIEmbeddings
+        embeddings = OpenAIEmbeddings(
+            model=config.get("model"),
+            api_key=config.get("api_key"),
+            base_url=config.get("base_url"),
+            **shared_pool_kwargs("openai"),
+        )
+    return CachedEmbeddings(
+        embeddings,
+        model=f"{config.get('model_provider')}/{config.get('model')}",
+        path=settings.rag_embedding_cache_path or None,
+        memory_size=settings.rag_embedding_cache_size,
+    )
+
+
+def index_key(manifest: Dict[str, str], config: dict) -> str:
+    """Hash of everything the index depends on: source files, splitter and embedding model."""
+    digest = hashlib.sha256()
+    for name in sorted(manifest):
+        digest.update(f"{name}\0{manifest[name]}\0".encode())
+    digest.update(f"|{CHUNK_SIZE}|{CHUNK_OVERLAP}|{config.get('model_provider')}|{config.get('model')}".encode())
+    return digest.hexdigest()
+
+
+def save_index(vector_store: "FAISS", path: Path):
+    """Write the index next to its final location, then rename it into place."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = Path(tempfile.mkdtemp(prefix=f".{path.name}-", dir=path.parent))
+    try:
+        vector_store.save_local(str(tmp_path))
+        os.replace(tmp_path, path)
+    except OSError:
+        # Another worker saved the same key first
+        shutil.rmtree(tmp_path, ignore_errors=True)
+        if not path.exists():
+            raise
+
+
+def prune_indexes(index_dir: Path, keep: str):
+    """Remove indexes saved for older versions of the source content."""
+    for entry in index_dir.iterdir():
+        if entry.is_dir() and not entry.name.startswith(".") and entry.name != keep:
+            shutil.rmtree(entry, ignore_errors=True)
+
+
+def load_index(path: Path, embeddings) -> "FAISS":
+    """Load an index saved by ``save_index`` with the vectors memory-mapped."""
+    import faiss
+    from langchain_community.vectorstores import FAISS
+
+    index = faiss.read_index(str(path / "index.faiss"), faiss.IO_FLAG_MMAP)
+    # The pickle is only ever written by save_index in our own index directory
+    with open(path / "index.pkl", "rb") as f:
+        docstore, index_to_docstore_id = pickle.load(f)
+    return FAISS(embeddings, index, docstore, index_to_docstore_id)
+
+
+def chunk_text(content: bytes) -> List[str]:
+    return _SPLITTER.split_text(content.decode("utf-8"))
+
+
+class KnowledgeFile:
+    """Chunks and vectors of one source file, reused across reloads while its hash is unchanged.
+
+    The file is chunked on first access to ``texts``, so chunking happens
+    as the embedding pipeline reaches it. Vectors are filled row by row as
+    batches complete, and rows already filled survive a failed build. For a
+    file loaded from a saved index they are read back from that index
+    (``rows``) only when a reload needs them.
+    """
+
+    __slots__ = ("digest", "signature", "_content", "_texts", "_vectors", "_filled", "_rows")
+
+    def __init__(self, digest: str, signature: tuple, content: Optional[bytes] = None,
+                 texts: Optional[List[str]] = None, rows: Optional[Tuple["faiss.Index", int]] = None):
+        self.digest = digest
+        self.signature = signature
+        self._content = content
+        self._texts = texts
+        self._vectors: Optional["np.ndarray"] = None
+        self._filled: Optional["np.ndarray"] = None
+        self._rows = rows
+
+    @property
+    def texts(self) -> List[str]:
+        if self._texts is None:
+            self._texts = chunk_text(self._content)
+            self._content = None
+        return self._texts
+
+    @property
+    def has_vectors(self) -> bool:
+        if self._rows is not None:
+            return True
+        if self._texts is None:
+            # Not chunked yet, so nothing can have been embedded
+            return False
+        if not self._texts:
+            return True
+        return self._filled is not None and bool(self._filled.all())
+
+    def pending_rows(self) -> Iterator[int]:
+        if self.has_vectors:
+            return iter(())
+        if self._filled is None:
+            return iter(range(len(self.texts)))
+        import numpy as np
+
+        return iter(np.flatnonzero(~self._filled).tolist())
+
+    def fill(self, row: int, vector: List[float]):
+        if self._vectors is None:
+            import numpy as np
+
+            self._vectors = np.empty((len(self.texts), len(vector)), dtype=np.float32)
+            self._filled = np.zeros(len(self.texts), dtype=bool)
+        self._vectors[row] = vector
+        self._filled[row] = True
+
+    @property
+    def vectors(self) -> Optional["np.ndarray"]:
+        if self._rows is not None:
+            index, start = self._rows
+            return index.reconstruct_n(start, len(self.texts))
+        return self._vectors
+
+
+class IndexSnapshot:
+    """Indexes built from one version of the knowledge base.
+
+    Never modified after it is built; a reload builds a new snapshot and
+    swaps it in, so a search keeps a consistent view from start to end.
+    """
+
+    __slots__ = ("files", "vector_store", "retriever", "lexical_index")
+
+    def __init__(self, files: Dict[str, KnowledgeFile], vector_store: Optional["FAISS"],
+                 lexical_index: Optional[BM25Index]):
+        self.files = files
+        self.vector_store = vector_store
+        self.lexical_index = lexical_index
+        self.retriever = vector_store.as_retriever(
+            search_type="similarity",
+            search_kwargs={"k": SEARCH_K},
+        ) if vector_store is not None else None
+
+    @property
+    def chunk_count(self) -> int:
+        return sum(len(f.texts) for f in self.files.values())
+
+
+def _signature(path: Path) -> tuple:
+    stat = path.stat()
+    return stat.st_mtime_ns, stat.st_size
+
+
+def _vector_store(files: Dict[str, KnowledgeFile], embeddings) -> Optional["FAISS"]:
+    """Assemble a flat FAISS index from per-file vectors without embedding anything."""
+    import faiss
+    import numpy as np
+    from langchain_community.docstore.in_memory import InMemoryDocstore
+    from langchain_community.vectorstores import FAISS
+
+    texts, metadatas, vectors = [], [], []
+    for name in sorted(files):
+        knowledge_file = files[name]
+        if knowledge_file.texts:
+            texts.extend(knowledge_file.texts)
+            metadatas.extend({"source": name} for _ in knowledge_file.texts)
+            vectors.append(knowledge_file.vectors)
+    if not texts:
+        return None
+    matrix = np.ascontiguousarray(np.vstack(vectors), dtype=np.float32)
+    index = faiss.IndexFlatL2(matrix.shape[1])
+    index.add(matrix)
+    ids = [str(i) for i in range(len(texts))]
+    docstore = InMemoryDocstore({
+        doc_id: Document(page_content=text, metadata=metadata, id=doc_id)
+        for doc_id, text, metadata in zip(ids, texts, metadatas)
+    })
+    return FAISS(embeddings, index, docstore, dict(enumerate(ids)))
 
 
 class RAGService:
-    def __init__(self):
-        self.vector_store = None
-        self.retriever = None
-        self._init_vector_store()
+    def __init__(self, embeddings: Optional[Embeddings] = None):
+        """``embeddings`` replaces the provider configured in settings, e.g. a local fake for benchmarks."""
+        self.snapshot: Optional[IndexSnapshot] = None
+        self.embeddings: Optional[CachedEmbeddings] = None
+        from search_cache import SearchResultCache
+
+        self.search_mode = settings.rag_search_mode
+        self.result_cache = SearchResultCache(
+            max_entries=settings.rag_result_cache_size,
+            ttl=settings.rag_result_cache_ttl_seconds,
+            similarity_threshold=settings.rag_result_cache_similarity,
+        )
+        self._config: dict = {}
+        self._reload_lock = threading.Lock()
+        # Files of a failed reload, kept so the next one resumes where it stopped
+        self._partial: Dict[str, KnowledgeFile] = {}
+        self.pipeline: Optional[EmbeddingPipeline] = None
+        self._stop = threading.Event()
+        self._init_vector_store(embeddings)
+
+    @property
+    def vector_store(self) -> Optional["FAISS"]:
+        return self.snapshot.vector_store if self.snapshot else None
+
+    @property
+    def retriever(self):
+        return self.snapshot.retriever if self.snapshot else None
 
-    def _init_vector_store(self):
+    @property
+    def lexical_index(self) -> Optional[BM25Index]:
+        return self.snapshot.lexical_index if self.snapshot else None
+
+    def _sources(self) -> Dict[str, Path]:
+        """Knowledge files by name: every text file under RAG_KNOWLEDGE_DIR, or the bundled terms."""
+        if settings.rag_knowledge_dir:
+            root = Path(settings.rag_knowledge_dir)
+            return {
+                path.relative_to(root).as_posix(): path
+                for pattern in KNOWLEDGE_PATTERNS
+                for path in sorted(root.rglob(pattern))
+                if path.is_file()
+            }
         terms_file = Path(__file__).parent / "terms_of_service.txt"
-        if not terms_file.exists():
-            print("Warning: terms_of_service.txt not found. RAG will have limited functionality.")
+        return {terms_file.name: terms_file} if terms_file.exists() else {}
+
+    def _init_vector_store(self, embeddings: Optional[Embeddings] = None):
+        if not self._sources():
+            print("Warning: no knowledge base documents found. RAG will have limited functionality.")
             return
 
+        if self.search_mode != "lexical":
+            try:
+                if embeddings is not None:
+                    self._config = {"model_provider": "custom", "model": type(embeddings).__name__}
+                    # Memory cache only, so injected vectors never reach the shared disk cache
+                    self.embeddings = CachedEmbeddings(embeddings, model=f"custom/{type(embeddings).__name__}",
+                                                       memory_size=settings.rag_embedding_cache_size)
+                else:
+                    self._config = settings.get_embedded_llm_config()
+                    self.embeddings = _create_embeddings(self._config)
+                self._load_saved()
+            except Exception as e:
+                print(f"Warning: RAG vector index unavailable ({e}). Falling back to lexical search.")
+
         try:
-            loader = TextLoader(str(terms_file))
-            documents = loader.load()
-
-            text_splitter = RecursiveCharacterTextSplitter(
-                chunk_size=1000,
-                chunk_overlap=200,
-                length_function=len,
-            )
-            splits = text_splitter.split_documents(documents)
-
-            config = settings.get_embedded_llm_config()
-
-            if config.get("model_provider") == "nvidia":
-                embeddings = NVIDIAEmbeddings(
-                    model=config.get("model"),
-                    api_key=config.get("api_key"),
-                )
-            else: 
-                embeddings = OpenAIEmbeddings(
-                model=config.get("model"),
-                api_key=config.get("api_key"),
-                base_url=config.get("base_url"),
-            )
-
-            self.vector_store = FAISS.from_documents(
-                documents=splits,
-                embedding=embeddings,
-            )
-            self.retriever = self.vector_store.as_retriever(
-                search_type="similarity",
-                search_kwargs={"k": 4},
-            )
-            print(f"RAG Service initialized with {len(splits)} document chunks")
+            self.reload()
         except Exception as e:
             print(f"Warning: RAG Service initialization failed ({e}). RAG will have limited functionality.")
 
+    def _load_saved(self):
+        """Install the saved index of the current knowledge base, if there is one."""
+        sources = self._sources()
+        manifest = {name: hashlib.sha256(path.read_bytes()).hexdigest() for name, path in sources.items()}
+        index_path = Path(settings.rag_index_dir) / index_key(manifest, self._config)
+        if not index_path.exists():
+            return
+        try:
+            vector_store = load_index(index_path, self.embeddings)
+        except Exception as e:
+            print(f"Warning: could not load RAG index ({e}), rebuilding it.")
+            return
+
+        texts: Dict[str, List[str]] = {name: [] for name in sources}
+        starts: Dict[str, int] = {}
+        for i in range(vector_store.index.ntotal):
+            doc = vector_store.docstore.search(vector_store.index_to_docstore_id[i])
+            name = doc.metadata["source"]
+            starts.setdefault(name, i)
+            texts[name].append(doc.page_content)
+        files = {
+            name: KnowledgeFile(manifest[name], _signature(path), texts=texts[name],
+                                rows=(vector_store.index, starts[name]) if name in starts else None)
+            for name, path in sources.items()
+        }
+        lexical_index = BM25Index([text for name in sorted(files) for text in files[name].texts])
+        self._install(IndexSnapshot(files, vector_store, lexical_index))
+        print(f"RAG Service loaded index {index_path.name[:12]} from disk")
+
+    def reload(self) -> dict:
+        """Re-index the knowledge files that changed and swap in the new indexes.
+
+        Files are compared by mtime and size, then by content hash; only new
+        or changed files are chunked and embedded. Searches in flight finish
+        on the snapshot they started with.
+        """
+        with self._reload_lock:
+            current = self.snapshot
+            previous = current.files if current else {}
+            files: Dict[str, KnowledgeFile] = {}
+            changed = []
+            for name, path in self._sources().items():
+                signature = _signature(path)
+                known = previous.get(name)
+                if known is not None and known.signature == signature:
+                    files[name] = known
+                    continue
+                content = path.read_bytes()
+                digest = hashlib.sha256(content).hexdigest()
+                if known is not None and known.digest == digest:
+                    known.signature = signature
+                    files[name] = known
+                    continue
+                partial = self._partial.get(name)
+                if partial is not None and partial.digest == digest:
+                    # Embedded in part by a failed reload; only its missing rows are redone
+                    partial.signature = signature
+                    files[name] = partial
+                else:
+                    files[name] = KnowledgeFile(digest, signature, content)
+                changed.append(name)
+            removed = sorted(previous.keys() - files.keys())
+
+            # A lexical-only snapshot is rebuilt on every reload until embeddings work again
+            lexical_fallback = current is not None and current.vector_store is None and self.embeddings is not None
+            if current is not None and not changed and not removed and not lexical_fallback:
+                return {"changed": [], "removed": [], "chunks": current.chunk_count}
+
+            try:
+                snapshot = self._build_snapshot(files, current)
+            except Exception:
+                self._partial = {name: files[name] for name in changed}
+                raise
+            self._partial = {}
+            self._install(snapshot)
+            print(f"RAG Service indexed {len(files)} documents, {snapshot.chunk_count} chunks "
+                  f"({len(changed)} changed, {len(removed)} removed)")
+            return {"changed": changed, "removed": removed, "chunks": snapshot.chunk_count}
+
+    def _build_snapshot(self, files: Dict[str, KnowledgeFile], current: Optional[IndexSnapshot]) -> IndexSnapshot:
+        vector_store = None
+        if self.embeddings is not None:
+            try:
+                self._embed_missing(files)
+                vector_store = _vector_store(files, self.embeddings)
+            except Exception as e:
+                if current is not None and current.vector_store is not None:
+                    # Keep serving the previous vectors rather than degrade to lexical
+                    raise
+                print(f"Warning: RAG vector index unavailable ({e}). Falling back to lexical search.")
+            if vector_store is not None:
+                self._save(files, vector_store)
+        lexical_index = BM25Index([text for name in sorted(files) for text in files[name].texts])
+        return IndexSnapshot(files, vector_store, lexical_index)
+
+    def _embed_missing(self, files: Dict[str, KnowledgeFile]):
+        """Embed every chunk that has no vector yet through a batched, concurrent pipeline."""
+        pending = [files[name] for name in sorted(files) if not files[name].has_vectors]
+        if not pending:
+            return
+        self.pipeline = EmbeddingPipeline(
+            self.embeddings,
+            batch_size=settings.rag_embedding_batch_size,
+            concurrency=settings.rag_embedding_concurrency,
+            max_retries=settings.rag_embedding_max_retries,
+        )
+        # Files not chunked yet are chunked lazily as the pipeline reaches them
+        chunks = (
+            ((knowledge_file, row), knowledge_file.texts[row])
+            for knowledge_file in pending
+            for row in knowledge_file.pending_rows()
+        )
+        for keys, vectors in self.pipeline.run(chunks):
+            for (knowledge_file, row), vector in zip(keys, vectors):
+                knowledge_file.fill(row, vector)
+        print(f"RAG embedding finished: {self.pipeline.progress_text()}")
+
+    def _save(self, files: Dict[str, KnowledgeFile], vector_store: "FAISS"):
+        index_path = Path(settings.rag_index_dir) / index_key(
+            {name: f.digest for name, f in files.items()}, self._config,
+        )
+        try:
+            save_index(vector_store, index_path)
+            prune_indexes(index_path.parent, keep=index_path.name)
+        except OSError as e:
+            print(f"Warning: could not save RAG index ({e}).")
+
+    def _install(self, snapshot: IndexSnapshot):
+        """Swap in a new snapshot; cached results of the previous one are dropped."""
+        # Searches read the cache generation before the snapshot, so results
+        # computed on the old snapshot carry the old generation and are
+        # discarded by the cache
+        self.snapshot = snapshot
+        self.result_cache.invalidate()
+
+    def start_auto_reload(self, interval: float):
+        """Poll the knowledge base for changes every ``interval`` seconds in a daemon thread."""
+        def poll():
+            while not self._stop.wait(interval):
+                try:
+                    self.reload()
+                except Exception as e:
+                    print(f"Warning: RAG reload failed ({e}); keeping the current index.")
+
+        threading.Thread(target=poll, name="rag-reload", daemon=True).start()
+
+    def stop_auto_reload(self):
+        self._stop.set()
+
+    def _uses_vectors(self, snapshot: IndexSnapshot) -> bool:
+        return snapshot.vector_store is not None and self.search_mode != "lexical"
+
+    def _retrieve(self, snapshot: IndexSnapshot, query: str, vector: Optional[List[float]]) -> List[str]:
+        """Rank chunks by vector, by BM25 or by both fused, depending on the mode."""
+        if vector is None:
+            with metrics.RAG_RETRIEVAL_SECONDS.labels("lexical").time():
+                return snapshot.lexical_index.search_texts(query, SEARCH_K)
+        if self.search_mode == "vector" or snapshot.lexical_index is None:
+            with metrics.RAG_RETRIEVAL_SECONDS.labels("vector").time():
+                docs = snapshot.vector_store.similarity_search_by_vector(vector, k=SEARCH_K)
+                return [doc.page_content for doc in docs]
+        with metrics.RAG_RETRIEVAL_SECONDS.labels("hybrid").time():
+            docs = snapshot.vector_store.similarity_search_by_vector(vector, k=HYBRID_CANDIDATES)
+            rankings = [[doc.page_content for doc in docs],
+                        snapshot.lexical_index.search_texts(query, HYBRID_CANDIDATES)]
+            return reciprocal_rank_fusion(rankings)[:SEARCH_K]
+
+    def _retrieve_cached(self, snapshot: IndexSnapshot, query: str, vector: Optional[List[float]],
+                         generation: int) -> List[str]:
+        results = self.result_cache.get_similar(vector) if vector is not None else None
+        if results is None:
+            results = self._retrieve(snapshot, query, vector)
+            self.result_cache.put(query, vector, results, generation)
+        return results
+
+    def _embedding_failed(self, snapshot: IndexSnapshot, query: str, error: Exception) -> List[str]:
+        if snapshot.lexical_index is None:
+            raise error
+        print(f"Warning: query embedding failed ({error!r}), using lexical search.")
+        metrics.RAG_FALLBACKS.inc()
+        # Not cached, so the next search tries the vector index again
+        return self._retrieve(snapshot, query, None)
+
     def search(self, query: str) -> List[str]:
-        if not self.retriever:
+        with metrics.RAG_SEARCH_SECONDS.time():
+            return self._search(query)
+
+    async def asearch(self, query: str) -> List[str]:
+        with metrics.RAG_SEARCH_SECONDS.time():
+            return await self._asearch(query)
+
+    def _search(self, query: str) -> List[str]:
+        results = self.result_cache.get(query)
+        if results is not None:
+            return results
+        generation = self.result_cache.generation
+        snapshot = self.snapshot
+        if snapshot is None:
             return []
-        docs = self.retriever.invoke(query)
-        return [doc.page_content for doc in docs]
+        vector = None
+        if self._uses_vectors(snapshot):
+            try:
+                vector = self.embeddings.embed_query(query)
+            except Exception as e:
+                return self._embedding_failed(snapshot, query, e)
+        return self._retrieve_cached(snapshot, query, vector, generation)
 
+    async def _asearch(self, query: str) -> List[str]:
+        results = self.result_cache.get(query)
+        if results is not None:
+            return results
+        generation = self.result_cache.generation
+        snapshot = self.snapshot
+        if snapshot is None:
+            return []
+        vector = None
+        if self._uses_vectors(snapshot):
+            try:
+                vector = await asyncio.wait_for(self.embeddings.aembed_query(query),
+                                                timeout=settings.rag_embedding_timeout_seconds)
+            except Exception as e:
+                return self._embedding_failed(snapshot, query, e)
+        return self._retrieve_cached(snapshot, query, vector, generation)
 
-@tool
-def search_rag_policy(query: str) -> str:
-    """Search for airline policy information from the knowledge base."""
-    rag_service = get_rag_service()
-    results = rag_service.search(query)
-    
+    def stats(self) -> dict:
+        snapshot = self.snapshot
+        vector_store = snapshot.vector_store if snapshot else None
+        lexical_index = snapshot.lexical_index if snapshot else None
+        return {
+            "search_mode": self.search_mode if vector_store is not None or lexical_index is None else "lexical",
+            "documents": len(snapshot.files) if snapshot else 0,
+            "vector_chunks": vector_store.index.ntotal if vector_store is not None else 0,
+            "lexical_chunks": len(lexical_index) if lexical_index is not None else 0,
+            "embedding_cache": self.embeddings.stats() if self.embeddings else None,
+            "embedding_build": self.pipeline.stats() if self.pipeline else None,
+            "result_cache": self.result_cache.stats(),
+        }
+
+
+def _format_results(results: List[str]) -> str:
     if not results:
         return "No relevant policy information found."
     return "\n\n".join(results)
 
 
+def _search_rag_policy(query: str) -> str:
+    """Search for airline policy information from the knowledge base."""
+    rag_service = get_rag_service()
+    return _format_results(rag_service.search(query))
+
+
+async def _asearch_rag_policy(query: str) -> str:
+    """Search for airline policy information from the knowledge base."""
+    # Building the index on first use is blocking work; keep it off the event loop
+    rag_service = await asyncio.to_thread(get_rag_service)
+    return _format_results(await rag_service.asearch(query))
+
+
+search_rag_policy = StructuredTool.from_function(
+    func=_search_rag_policy,
+    coroutine=_asearch_rag_policy,
+    name="search_rag_policy",
+)
+
+
 _rag_service = None
+_rag_service_lock = threading.Lock()
 
 
 def get_rag_service() -> RAGService:
     global _rag_service
     if _rag_service is None:
-        _rag_service = RAGService()
+        # Warm-up and the first searches may race here; only one of them builds
+        with _rag_service_lock:
+            if _rag_service is None:
+                service = RAGService()
+                if settings.rag_knowledge_dir and settings.rag_reload_interval_seconds > 0:
+                    service.start_auto_reload(settings.rag_reload_interval_seconds)
+                _rag_service = service
     return _rag_service
@@ -0,0 +1,162 @@
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+_PUNCTUATION = re.compile(r"[^\w\s]")
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_query(query: str) -> str:
+    return _WHITESPACE.sub(" ", _PUNCTUATION.sub(" ", query.lower())).strip()
+
+
+class _Entry:
+    __slots__ = ("results", "row", "expires_at")
+
+    def __init__(self, results: List[str], expires_at: float):
+        self.results = results
+        # Row of the query's unit vector in the cache matrix, if it has one
+        self.row: Optional[int] = None
+        self.expires_at = expires_at
+
+
+class SearchResultCache:
+    """Cache of retrieval results by normalized query and by query embedding.
+
+    ``get`` answers repeated phrasings that normalize to the same text;
+    ``get_similar`` answers queries whose embedding has a cosine similarity
+    of at least ``similarity_threshold`` with a cached one. Entries expire
+    after ``ttl`` seconds and the least recently used are dropped beyond
+    ``max_entries``. ``invalidate`` empties the cache and bumps
+    ``generation`` so searches that started before a rebuild cannot store
+    stale results.
+    """
+
+    def __init__(self, max_entries: int = 1000, ttl: float = 3600, similarity_threshold: float = 0.95):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.similarity_threshold = similarity_threshold
+        self.generation = 0
+        self.exact_hits = 0
+        self.similar_hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[str, _Entry]" = OrderedDict()
+        self._lock = threading.Lock()
+        # Unit vectors of the entries, one row each. A new entry takes a freed
+        # row or appends one; rows of dropped entries are zeroed and reused.
+        self._matrix: Optional[np.ndarray] = None
+        self._row_keys: List[Optional[str]] = []
+        self._free_rows: List[int] = []
+
+    def get(self, query: str) -> Optional[List[str]]:
+        key = normalize_query(query)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry.expires_at < time.monotonic():
+                self._drop(key)
+                return None
+            self._entries.move_to_end(key)
+            self.exact_hits += 1
+            return entry.results
+
+    def get_similar(self, vector: Sequence[float]) -> Optional[List[str]]:
+        query = _unit(vector)
+        with self._lock:
+            if self._matrix is None or self._matrix.shape[1] != len(query):
+                self.misses += 1
+                return None
+            scores = self._matrix[:len(self._row_keys)] @ query
+            best = int(np.argmax(scores))
+            key = self._row_keys[best]
+            entry = self._entries.get(key) if key is not None else None
+            if scores[best] < self.similarity_threshold or entry is None or entry.expires_at < time.monotonic():
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.similar_hits += 1
+            return entry.results
+
+    def put(self, query: str, vector: Optional[Sequence[float]], results: List[str], generation: int):
+        key = normalize_query(query)
+        with self._lock:
+            if generation != self.generation:
+                return
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._free_row(old)
+            entry = self._entries[key] = _Entry(results, time.monotonic() + self.ttl)
+            self._prune()
+            if vector is not None and key in self._entries:
+                self._add_row(key, entry, _unit(vector))
+
+    def invalidate(self):
+        with self._lock:
+            self._entries.clear()
+            self._matrix = None
+            self._row_keys = []
+            self._free_rows = []
+            self.generation += 1
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            hits = self.exact_hits + self.similar_hits
+            total = hits + self.misses
+            return {
+                "exact_hits": self.exact_hits,
+                "similar_hits": self.similar_hits,
+                "misses": self.misses,
+                "hit_rate": hits / total if total else 0.0,
+                "entries": len(self._entries),
+                "generation": self.generation,
+            }
+
+    def _drop(self, key: str):
+        self._free_row(self._entries.pop(key))
+
+    def _prune(self):
+        now = time.monotonic()
+        for key in [k for k, e in self._entries.items() if e.expires_at < now]:
+            self._drop(key)
+        while len(self._entries) > self.max_entries:
+            self._free_row(self._entries.popitem(last=False)[1])
+
+    def _add_row(self, key: str, entry: _Entry, unit: np.ndarray):
+        if self._matrix is not None and self._matrix.shape[1] != len(unit):
+            # A different embedding model; vectors of the old one can't be compared
+            for other in self._entries.values():
+                other.row = None
+            self._matrix = None
+            self._row_keys = []
+            self._free_rows = []
+        if self._free_rows:
+            row = self._free_rows.pop()
+        else:
+            row = len(self._row_keys)
+            self._row_keys.append(None)
+            if self._matrix is None or row == len(self._matrix):
+                grown = np.zeros((max(16, 2 * row), len(unit)), dtype=np.float32)
+                if self._matrix is not None:
+                    grown[:row] = self._matrix
+                self._matrix = grown
+        self._matrix[row] = unit
+        self._row_keys[row] = key
+        entry.row = row
+
+    def _free_row(self, entry: _Entry):
+        if entry.row is not None:
+            self._matrix[entry.row] = 0
+            self._row_keys[entry.row] = None
+            self._free_rows.append(entry.row)
+            entry.row = None
+
+
+def _unit(vector: Sequence[float]) -> np.ndarray:
+    array = np.asarray(vector, dtype=np.float32)
+    norm = np.linalg.norm(array)
+    return array / norm if norm else array
@@ -0,0 +1,239 @@
+import re
+import secrets
+import threading
+import time
+from datetime import date
+from typing import Callable, Dict, Iterable, Optional, Tuple
+
+FlightKey = Tuple[date, str, str]
+
+_SEAT = re.compile(r"\s*(\d{1,3})\s*([A-Za-z])\s*")
+
+
+class SeatUnavailableError(ValueError):
+    """The seat is taken or held by someone else."""
+
+
+def flight_key(flight_date: date, from_airport: str, to_airport: str) -> FlightKey:
+    return flight_date, from_airport.upper(), to_airport.upper()
+
+
+class _Flight:
+    """Seat state of one flight: a bitmap of assigned seats plus the active holds."""
+    __slots__ = ("lock", "occupied", "occupied_count", "holds")
+
+    def __init__(self, seats: int):
+        self.lock = threading.Lock()
+        self.occupied = bytearray((seats + 7) // 8)
+        self.occupied_count = 0
+        # seat index -> (hold token, expiry on the monotonic clock)
+        self.holds: Dict[int, Tuple[str, float]] = {}
+
+    def is_occupied(self, index: int) -> bool:
+        return bool(self.occupied[index >> 3] & (1 << (index & 7)))
+
+    def set_occupied(self, index: int, value: bool):
+        if self.is_occupied(index) == value:
+            return
+        self.occupied[index >> 3] ^= 1 << (index & 7)
+        self.occupied_count += 1 if value else -1
+
+    def hold_of(self, index: int, now: float) -> Optional[str]:
+        hold = self.holds.get(index)
+        if hold is None:
+            return None
+        if hold[1] < now:
+            del self.holds[index]
+            return None
+        return hold[0]
+
+    def purge_holds(self, now: float):
+        for index in [i for i, (_, expires) in self.holds.items() if expires < now]:
+            del self.holds[index]
+
+
+class SeatInventory:
+    """Seat assignments per flight (date and route), one bit per seat.
+
+    A flight's bitmap is built on first use from the bookings returned by
+    ``loader`` and then kept up to date by ``reserve`` and ``release``, so
+    availability checks cost the same however many bookings there are.
+    ``reserve`` checks and assigns under the flight's lock, so two callers
+    can never get the same seat. ``hold`` sets a seat aside for
+    ``hold_ttl`` seconds; only the holder's token can then assign it.
+
+    With ``shared`` set, other processes write to the same store, so a seat
+    this process sees as taken may have been freed elsewhere. Before a seat
+    is refused, and before a seat map is returned, the flight's bitmap is
+    re-read from ``loader``. The store's own seat check stays the authority
+    against double assignment. Holds are kept per process only.
+    """
+
+    def __init__(self, loader: Callable[[FlightKey], Iterable[str]], rows: int = 30,
+                 letters: str = "ABCDEF", hold_ttl: float = 300, shared: bool = False):
+        self.loader = loader
+        self.shared = shared
+        self.rows = rows
+        self.letters = letters.upper()
+        self.hold_ttl = hold_ttl
+        self.seats = rows * len(self.letters)
+        self._letter_index = {letter: i for i, letter in enumerate(self.letters)}
+        # Guards flight creation; loading under it means a release can't slip in between
+        # a flight's bookings being read and its bitmap being published
+        self._lock = threading.Lock()
+        self._flights: Dict[FlightKey, _Flight] = {}
+
+    def seat_index(self, seat: str) -> int:
+        found = _SEAT.fullmatch(seat or "")
+        row = int(found[1]) if found else 0
+        letter = self._letter_index.get(found[2].upper()) if found else None
+        if not 1 <= row <= self.rows or letter is None:
+            raise ValueError(f"Invalid seat {seat!r}: rows are 1-{self.rows}, letters {self.letters}.")
+        return (row - 1) * len(self.letters) + letter
+
+    def seat_label(self, index: int) -> str:
+        row, letter = divmod(index, len(self.letters))
+        return f"{row + 1}{self.letters[letter]}"
+
+    def _flight(self, key: FlightKey) -> _Flight:
+        flight = self._flights.get(key)
+        if flight is not None:
+            return flight
+        with self._lock:
+            flight = self._flights.get(key)
+            if flight is None:
+                flight = _Flight(self.seats)
+                flight.occupied, flight.occupied_count = self._occupancy(key)
+                self._flights[key] = flight
+            return flight
+
+    def _occupancy(self, key: FlightKey) -> Tuple[bytearray, int]:
+        """Bitmap and count of the seats ``loader`` reports as assigned."""
+        occupied = bytearray((self.seats + 7) // 8)
+        count = 0
+        for seat in self.loader(key):
+            try:
+                index = self.seat_index(seat)
+            except ValueError:
+                # Seats outside the layout predate the inventory; they block nothing
+                continue
+            bit = 1 << (index & 7)
+            if occupied[index >> 3] & bit:
+                print(f"Warning: seat {seat} is assigned twice on flight {key[0]} {key[1]}-{key[2]}")
+                continue
+            occupied[index >> 3] |= bit
+            count += 1
+        return occupied, count
+
+    def _refresh(self, key: FlightKey, flight: _Flight):
+        """Re-read a flight's assigned seats from the shared store."""
+        with flight.lock:
+            before = bytes(flight.occupied)
+        occupied, _ = self._occupancy(key)
+        with flight.lock:
+            # Seats reserved here while the store was read may not be written yet; keep them
+            for i, (stored, now, old) in enumerate(zip(occupied, flight.occupied, before)):
+                occupied[i] = stored | (now & ~old)
+            flight.occupied = occupied
+            flight.occupied_count = sum(bin(byte).count("1") for byte in occupied)
+
+    def hold(self, key: FlightKey, seat: str) -> str:
+        """Set a free seat aside and return the token that can assign it."""
+        index = self.seat_index(seat)
+        flight = self._flight(key)
+        token = secrets.token_urlsafe(12)
+        for attempt in range(2):
+            with flight.lock:
+                held = flight.hold_of(index, time.monotonic()) is not None
+                if not held and not flight.is_occupied(index):
+                    flight.holds[index] = (token, time.monotonic() + self.hold_ttl)
+                    return token
+            if held or not self._may_be_stale(attempt):
+                break
+            self._refresh(key, flight)
+        raise SeatUnavailableError(f"Seat {self.seat_label(index)} is not available.")
+
+    def _may_be_stale(self, attempt: int) -> bool:
+        """Whether a seat refused from the bitmap is worth re-checking against the store."""
+        return self.shared and attempt == 0
+
+    def reserve(self, key: FlightKey, seat: str, hold_token: Optional[str] = None) -> str:
+        """Assign a seat if it is free, or held with ``hold_token``; returns its canonical label."""
+        index = self.seat_index(seat)
+        flight = self._flight(key)
+        for attempt in range(2):
+            with flight.lock:
+                held = flight.hold_of(index, time.monotonic()) not in (None, hold_token)
+                if not held and not flight.is_occupied(index):
+                    flight.holds.pop(index, None)
+                    flight.set_occupied(index, True)
+                    return self.seat_label(index)
+            if held or not self._may_be_stale(attempt):
+                break
+            self._refresh(key, flight)
+        raise SeatUnavailableError(f"Seat {self.seat_label(index)} is not available.")
+
+    def reserve_any(self, key: FlightKey, preferred: Optional[str] = None) -> str:
+        """Assign ``preferred`` if it is free, else the first free seat."""
+        if preferred:
+            try:
+                return self.reserve(key, preferred)
+            except ValueError:
+                pass
+        flight = self._flight(key)
+        for attempt in range(2):
+            with flight.lock:
+                now = time.monotonic()
+                for byte, bits in enumerate(flight.occupied):
+                    if bits == 0xFF:
+                        continue
+                    for index in range(byte * 8, min(byte * 8 + 8, self.seats)):
+                        if not flight.is_occupied(index) and flight.hold_of(index, now) is None:
+                            flight.set_occupied(index, True)
+                            return self.seat_label(index)
+            if not self._may_be_stale(attempt):
+                break
+            self._refresh(key, flight)
+        raise SeatUnavailableError("No seats available on this flight.")
+
+    def release(self, key: FlightKey, seat: str):
+        try:
+            index = self.seat_index(seat)
+        except ValueError:
+            return
+        with self._lock:
+            flight = self._flights.get(key)
+        # A flight not loaded yet will read the released seat from the bookings when it is
+        if flight is not None:
+            with flight.lock:
+                flight.set_occupied(index, False)
+
+    def seat_map(self, key: FlightKey) -> Dict[str, object]:
+        flight = self._flight(key)
+        if self.shared:
+            self._refresh(key, flight)
+        with flight.lock:
+            flight.purge_holds(time.monotonic())
+            occupied = bytes(flight.occupied)
+            occupied_count = flight.occupied_count
+            held = sorted(flight.holds)
+        return {
+            "date": key[0].isoformat(),
+            "from_airport": key[1],
+            "to_airport": key[2],
+            "rows": self.rows,
+            "letters": self.letters,
+            "available": self.seats - occupied_count - len(held),
+            "occupied": [self.seat_label(i) for i in range(self.seats) if occupied[i >> 3] & (1 << (i & 7))],
+            "held": [self.seat_label(i) for i in held],
+        }
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            flights = list(self._flights.values())
+        return {
+            "flights": len(flights),
+            "seats_per_flight": self.seats,
+            "occupied": sum(f.occupied_count for f in flights),
+            "holds": sum(len(f.holds) for f in flights),
+        }
@@ -0,0 +1,181 @@
+import os
+import sys
+import threading
+import time
+from collections import OrderedDict, defaultdict
+from typing import Callable, Dict, Hashable, Optional, Set, Tuple
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from booking_service import BookingKey
+
+_CacheKey = Tuple[str, BookingKey]
+
+
+class _Flight:
+    __slots__ = ("version", "done", "result", "error")
+
+    def __init__(self, version: int):
+        self.version = version
+        self.done = threading.Event()
+        self.result: Optional[dict] = None
+        self.error: Optional[BaseException] = None
+
+
+class _Pending:
+    """Lookups of one booking that have not stored their result yet."""
+    __slots__ = ("version", "lookups")
+
+    def __init__(self):
+        self.version = 0
+        self.lookups = 0
+
+
+class _Entry:
+    __slots__ = ("result", "expires_at")
+
+    def __init__(self, result: dict, expires_at: float):
+        self.result = result
+        self.expires_at = expires_at
+
+
+class ToolResultCache:
+    """Per-conversation cache of read-only booking tool results.
+
+    Results are cached per chat thread and per booking. ``invalidate`` drops
+    every cached result for a booking in all threads; it is registered as a
+    ``BookingService`` change listener, so writes through the tools and the
+    REST endpoints both invalidate. Concurrent identical lookups, from any
+    thread, are coalesced into one call. ``ttl`` bounds staleness for
+    changes made by other worker processes, which this cache cannot see.
+    """
+
+    def __init__(self, max_threads: int = 1000, max_entries: int = 32, ttl: float = 300):
+        self.max_threads = max_threads
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.invalidations = 0
+        self._lock = threading.Lock()
+        self._threads: "OrderedDict[Hashable, OrderedDict[_CacheKey, _Entry]]" = OrderedDict()
+        # Threads holding a result for each booking, for invalidation
+        self._holders: Dict[BookingKey, Set[Hashable]] = defaultdict(set)
+        # Bookings with lookups in progress; each invalidation bumps the version so lookups
+        # that started earlier cannot store stale results. Dropped when the last lookup ends.
+        self._pending: Dict[BookingKey, _Pending] = {}
+        self._in_flight: Dict[_CacheKey, _Flight] = {}
+
+    def get_or_call(self, thread_id: Optional[Hashable], tool: str, key: BookingKey,
+                    call: Callable[[], dict]) -> dict:
+        if thread_id is None or self.max_entries <= 0:
+            return call()
+        cache_key = (tool, key)
+        with self._lock:
+            entries = self._threads.get(thread_id)
+            entry = entries.get(cache_key) if entries is not None else None
+            if entry is not None and entry.expires_at >= time.monotonic():
+                self._threads.move_to_end(thread_id)
+                entries.move_to_end(cache_key)
+                self.hits += 1
+                return entry.result
+            pending = self._pending.get(key)
+            if pending is None:
+                pending = self._pending[key] = _Pending()
+            pending.lookups += 1
+            version = pending.version
+            flight = self._in_flight.get(cache_key)
+            # A lookup started before the last invalidation may return stale data; don't join it
+            leader = flight is None or flight.version != version
+            if leader:
+                flight = self._in_flight[cache_key] = _Flight(version)
+                self.misses += 1
+            else:
+                self.coalesced += 1
+
+        result = None
+        try:
+            if not leader:
+                flight.done.wait()
+                if flight.error is not None:
+                    raise flight.error
+                result = flight.result
+            else:
+                try:
+                    result = flight.result = call()
+                except BaseException as e:
+                    flight.error = e
+                    raise
+                finally:
+                    with self._lock:
+                        if self._in_flight.get(cache_key) is flight:
+                            del self._in_flight[cache_key]
+                    flight.done.set()
+        finally:
+            self._finish(thread_id, cache_key, result, version)
+        return result
+
+    def _finish(self, thread_id: Hashable, cache_key: _CacheKey, result: Optional[dict], version: int):
+        key = cache_key[1]
+        with self._lock:
+            pending = self._pending[key]
+            pending.lookups -= 1
+            if not pending.lookups:
+                del self._pending[key]
+            # Failed lookups ("Booking not found") are not cached so a retry sees new bookings
+            if result is None or not result.get("success") or pending.version != version:
+                return
+            entries = self._threads.get(thread_id)
+            if entries is None:
+                entries = self._threads[thread_id] = OrderedDict()
+            self._threads.move_to_end(thread_id)
+            entries[cache_key] = _Entry(result, time.monotonic() + self.ttl)
+            self._holders[key].add(thread_id)
+            while len(entries) > self.max_entries:
+                evicted, _ = entries.popitem(last=False)
+                self._release(thread_id, evicted[1])
+            while len(self._threads) > self.max_threads:
+                self._drop_thread(*self._threads.popitem(last=False))
+
+    def _release(self, thread_id: Hashable, key: BookingKey):
+        holders = self._holders.get(key)
+        if holders is not None:
+            holders.discard(thread_id)
+            if not holders:
+                del self._holders[key]
+
+    def _drop_thread(self, thread_id: Hashable, entries: "OrderedDict[_CacheKey, _Entry]"):
+        for _, key in entries:
+            self._release(thread_id, key)
+
+    def invalidate(self, key: BookingKey):
+        with self._lock:
+            pending = self._pending.get(key)
+            if pending is not None:
+                pending.version += 1
+            self.invalidations += 1
+            for thread_id in self._holders.pop(key, ()):
+                entries = self._threads.get(thread_id)
+                if entries is None:
+                    continue
+                for cache_key in [k for k in entries if k[1] == key]:
+                    del entries[cache_key]
+
+    def clear_thread(self, thread_id: Hashable):
+        with self._lock:
+            entries = self._threads.pop(thread_id, None)
+            if entries is not None:
+                self._drop_thread(thread_id, entries)
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            total = self.hits + self.misses + self.coalesced
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "coalesced": self.coalesced,
+                "invalidations": self.invalidations,
+                "hit_rate": (self.hits + self.coalesced) / total if total else 0.0,
+                "threads": len(self._threads),
+            }
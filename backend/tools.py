@@ -1,17 +1,69 @@
+import asyncio
+import threading
 from datetime import datetime
-from typing import Optional
-from langchain_core.tools import tool
+from inspect import signature
+from typing import Callable, Optional
+from langchain_core.runnables import RunnableConfig
+from langchain_core.tools import StructuredTool
 
-from booking_service import get_booking_service
+from booking_service import booking_key, get_booking_service
+from config import settings
 from models import BookingDetails
+from tool_cache import ToolResultCache
 
 
 def _get_booking_service():
     return get_booking_service()
 
 
-@tool(description="Get booking details (requires booking number, first name, last name)")
-def get_booking_details(booking_number: str, first_name: str, last_name: str) -> dict:
+_tool_cache: Optional[ToolResultCache] = None
+_tool_cache_lock = threading.Lock()
+
+
+def get_tool_cache() -> ToolResultCache:
+    global _tool_cache
+    if _tool_cache is None:
+        with _tool_cache_lock:
+            if _tool_cache is None:
+                cache = ToolResultCache(
+                    max_threads=settings.chat_max_threads,
+                    max_entries=settings.chat_tool_cache_size,
+                    ttl=settings.chat_tool_cache_ttl_seconds,
+                )
+                _get_booking_service().add_change_listener(cache.invalidate)
+                _tool_cache = cache
+    return _tool_cache
+
+
+def _thread_id(config: Optional[RunnableConfig]) -> Optional[str]:
+    return ((config or {}).get("configurable") or {}).get("thread_id")
+
+
+def booking_tool(description: str) -> Callable[[Callable[..., dict]], StructuredTool]:
+    """Like ``@tool``, but also gives the tool a coroutine for the async agent path.
+
+    The coroutine runs the blocking booking call in a worker thread only for
+    the duration of the lookup itself. A ``config: RunnableConfig`` parameter
+    of the function is injected by the agent and hidden from the model.
+    """
+    def decorator(func: Callable[..., dict]) -> StructuredTool:
+        takes_config = "config" in signature(func).parameters
+
+        async def coroutine(config: RunnableConfig = None, **kwargs) -> dict:
+            if takes_config:
+                kwargs["config"] = config
+            return await asyncio.to_thread(func, **kwargs)
+
+        return StructuredTool.from_function(
+            func=func,
+            coroutine=coroutine,
+            name=func.__name__,
+            description=description,
+        )
+    return decorator
+
+
+def _get_booking_details(booking_number: str, first_name: str, last_name: str) -> dict:
     try:
         booking_service = _get_booking_service()
         booking = booking_service.get_booking_details(booking_number, first_name, last_name)
@@ -26,7 +78,19 @@ def get_booking_details(booking_number: str, first_name: str, last_name: str) ->
         }
 
 
-@tool(description="Change booking dates and route (requires booking number, first name, last name, new date, from airport, to airport)")
+@booking_tool(description="Get booking details (requires booking number, first name, last name)")
+def get_booking_details(booking_number: str, first_name: str, last_name: str,
+                        config: RunnableConfig = None) -> dict:
+    # Cached per conversation; any change to the booking drops the cached result
+    return get_tool_cache().get_or_call(
+        _thread_id(config),
+        "get_booking_details",
+        booking_key(booking_number, first_name, last_name),
+        lambda: _get_booking_details(booking_number, first_name, last_name),
+    )
+
+
+@booking_tool(description="Change booking dates and route (requires booking number, first name, last name, new date, from airport, to airport)")
 def change_booking(booking_number: str, first_name: str, last_name: str,
                    new_date: str, from_airport: str, to_airport: str) -> dict:
     try:
@@ -43,7 +107,7 @@ def change_booking(booking_number: str, first_name: str, last_name: str,
         }
 
 
-@tool(description="Cancel a booking (requires booking number, first name, last name)")
+@booking_tool(description="Cancel a booking (requires booking number, first name, last name)")
 def cancel_booking(booking_number: str, first_name: str, last_name: str) -> dict:
     try:
         booking_service = _get_booking_service()
@@ -0,0 +1,62 @@
+import threading
+import time
+from typing import Callable, Dict, Optional
+
+import metrics
+
+
+class Readiness:
+    """Builds the service singletons in background threads and tracks when they are done.
+
+    Each component runs in its own daemon thread, so a slow one (the RAG
+    index, the chat model client) neither blocks startup nor the others.
+    Times are measured from ``started``, which the app sets before its heavy
+    imports, so ``seconds_to_ready`` includes them.
+    """
+
+    def __init__(self, started: float):
+        self.started = started
+        self._lock = threading.Lock()
+        # component -> {"status": "pending" | "ready" | "failed", "seconds": ..., "error": ...}
+        self._components: Dict[str, Dict[str, object]] = {}
+        self._ready_at: Optional[float] = None
+
+    def start(self, components: Dict[str, Callable[[], object]]):
+        with self._lock:
+            for name in components:
+                self._components[name] = {"status": "pending"}
+            if not self._components:
+                self._ready_at = time.perf_counter() - self.started
+        for name, build in components.items():
+            threading.Thread(target=self._warm, args=(name, build), name=f"warmup-{name}", daemon=True).start()
+
+    def _warm(self, name: str, build: Callable[[], object]):
+        try:
+            build()
+            result = {"status": "ready"}
+        except Exception as e:
+            print(f"Warning: warm-up of {name} failed: {e}")
+            result = {"status": "failed", "error": str(e)}
+        seconds = time.perf_counter() - self.started
+        result["seconds"] = round(seconds, 3)
+        metrics.STARTUP_SECONDS.labels(name).set(seconds)
+        with self._lock:
+            self._components[name] = result
+            if self._ready_at is None and all(c["status"] == "ready" for c in self._components.values()):
+                self._ready_at = seconds
+                metrics.STARTUP_SECONDS.labels("ready").set(seconds)
+                print(f"Ready in {seconds:.2f}s")
+
+    @property
+    def ready(self) -> bool:
+        with self._lock:
+            return self._ready_at is not None
+
+    def status(self) -> Dict[str, object]:
+        with self._lock:
+            return {
+                "ready": self._ready_at is not None,
+                "seconds_to_ready": None if self._ready_at is None else round(self._ready_at, 3),
+                "uptime_seconds": round(time.perf_counter() - self.started, 3),
+                "components": {name: dict(c) for name, c in self._components.items()},
+            }
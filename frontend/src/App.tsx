@@ -19,6 +19,7 @@ function App() {
     firstName: string;
     lastName: string;
     currentSeat: string;
+    flight: { date: string; fromAirport: string; toAirport: string };
   } | null>(null);
 
   const loadBookings = async () => {
@@ -34,6 +35,15 @@ function App() {
     loadBookings();
   }, []);
 
+  useEffect(() => {
+    // Free the server-side conversation when the page is closed or reloaded
+    const handleUnload = () => {
+      api.clearChat(chatId).catch(() => undefined);
+    };
+    window.addEventListener('pagehide', handleUnload);
+    return () => window.removeEventListener('pagehide', handleUnload);
+  }, [chatId]);
+
   const handleSeatChange = async (newSeat: string) => {
     if (!selectedBooking) return;
 
@@ -58,7 +68,8 @@ function App() {
       bookingNumber: booking.booking_number,
       firstName: booking.first_name,
       lastName: booking.last_name,
-      currentSeat: booking.seat_number
+      currentSeat: booking.seat_number,
+      flight: { date: booking.date, fromAirport: booking.from_airport, toAirport: booking.to_airport }
     });
     setShowSeatSelector(true);
   };
@@ -93,6 +104,7 @@ function App() {
       {showSeatSelector && selectedBooking && (
         <SeatSelector
           currentSeat={selectedBooking.currentSeat}
+          flight={selectedBooking.flight}
           onSeatSelected={handleSeatChange}
           onClose={() => {
             setShowSeatSelector(false);
@@ -1,6 +1,6 @@
 import React, { useState, useRef, useEffect } from 'react';
 import { ChatMessage } from '../types';
-import { api } from '../services/api';
+import { api, ChatBusyError } from '../services/api';
 import './ChatInterface.css';
 
 interface ChatInterfaceProps {
@@ -49,9 +49,6 @@ export const ChatInterface: React.FC<ChatInterfaceProps> = ({ chatId, onBookingC
 
       let accumulatedContent = '';
       for await (const chunk of api.chatStream(inputValue, chatId)) {
-        if (chunk === '[DONE]') {
-          break;
-        }
         accumulatedContent += chunk;
         setMessages(prev => {
           const updated = [...prev];
@@ -71,7 +68,9 @@ export const ChatInterface: React.FC<ChatInterfaceProps> = ({ chatId, onBookingC
       const errorMessage: ChatMessage = {
         id: (Date.now() + 2).toString(),
         role: 'assistant',
-        content: 'Sorry, I encountered an error. Please try again.',
+        content: error instanceof ChatBusyError
+          ? `We're helping a lot of travellers right now. Please try again in ${error.retryAfter} seconds.`
+          : 'Sorry, I encountered an error. Please try again.',
         timestamp: new Date()
       };
       setMessages(prev => [...prev.slice(0, -1), errorMessage]);
@@ -1,38 +1,57 @@
-import React, { useState, useCallback } from 'react';
-import { SeatInfo } from '../types';
+import React, { useState, useCallback, useEffect } from 'react';
+import { SeatInfo, SeatMap } from '../types';
+import { api } from '../services/api';
 import './SeatSelector.css';
 
 interface SeatSelectorProps {
   currentSeat?: string;
+  flight?: { date: string; fromAirport: string; toAirport: string };
   onSeatSelected: (seatId: string) => void;
   onClose: () => void;
 }
 
-const ROWS = 12;
-const SEAT_LETTERS = ['A', 'B', 'C', 'D', 'E', 'F'];
+// Layout used until the flight's seat map has loaded
+const DEFAULT_ROWS = 30;
+const DEFAULT_LETTERS = 'ABCDEF';
 
 export const SeatSelector: React.FC<SeatSelectorProps> = ({
   currentSeat,
+  flight,
   onSeatSelected,
   onClose
 }) => {
   const [selectedSeat, setSelectedSeat] = useState<string>(currentSeat || '');
+  const [seatMap, setSeatMap] = useState<SeatMap | null>(null);
+
+  useEffect(() => {
+    if (!flight) return;
+    let cancelled = false;
+    api.getSeatMap(flight.date, flight.fromAirport, flight.toAirport)
+      .then(map => { if (!cancelled) setSeatMap(map); })
+      .catch(error => console.error('Failed to load seat map:', error));
+    return () => { cancelled = true; };
+  }, [flight?.date, flight?.fromAirport, flight?.toAirport]);
+
+  const rows = seatMap?.rows ?? DEFAULT_ROWS;
 
   const generateSeats = useCallback((): SeatInfo[] => {
+    const letters = (seatMap?.letters ?? DEFAULT_LETTERS).split('');
+    const taken = new Set([...(seatMap?.occupied ?? []), ...(seatMap?.held ?? [])]);
     const seats: SeatInfo[] = [];
-    for (let row = 1; row <= ROWS; row++) {
-      for (const letter of SEAT_LETTERS) {
+    for (let row = 1; row <= rows; row++) {
+      for (const letter of letters) {
         const id = `${row}${letter}`;
         seats.push({
           id,
           row,
           letter,
-          isSelected: id === selectedSeat
+          isSelected: id === selectedSeat,
+          isTaken: taken.has(id) && id !== currentSeat
         });
       }
     }
     return seats;
-  }, [selectedSeat]);
+  }, [selectedSeat, seatMap, currentSeat, rows]);
 
   const handleSeatClick = (seatId: string) => {
     setSelectedSeat(seatId);
@@ -67,10 +86,14 @@ export const SeatSelector: React.FC<SeatSelectorProps> = ({
             <div className="seat sample current"></div>
             <span>Current</span>
           </div>
+          <div className="legend-item">
+            <div className="seat sample taken"></div>
+            <span>Taken</span>
+          </div>
         </div>
 
         <div className="seat-grid">
-          {Array.from({ length: ROWS }).map((_, rowIndex) => {
+          {Array.from({ length: rows }).map((_, rowIndex) => {
             const row = rowIndex + 1;
             const rowSeats = seats.filter(s => s.row === row);
             
@@ -82,9 +105,10 @@ export const SeatSelector: React.FC<SeatSelectorProps> = ({
                   return (
                     <button
                       key={seat.id}
-                      className={`seat ${seat.isSelected ? 'selected' : ''} ${isCurrentSeat ? 'current' : ''}`}
+                      className={`seat ${seat.isSelected ? 'selected' : ''} ${isCurrentSeat ? 'current' : ''} ${seat.isTaken ? 'taken' : ''}`}
                       onClick={() => handleSeatClick(seat.id)}
-                      title={`Seat ${seat.id}`}
+                      disabled={seat.isTaken}
+                      title={seat.isTaken ? `Seat ${seat.id} is taken` : `Seat ${seat.id}`}
                     >
                       {seat.letter}
                     </button>
@@ -1,6 +1,15 @@
-import { BookingDetails } from '../types';
+import { BookingDetails, SeatMap } from '../types';
 
 const API_BASE = '/api';
+const MAX_STREAM_RECONNECTS = 5;
+const STREAM_RECONNECT_DELAY_MS = 500;
+
+/** The server is at its chat capacity (429); retry after `retryAfter` seconds. */
+export class ChatBusyError extends Error {
+  constructor(public retryAfter: number) {
+    super('Chat service is busy');
+  }
+}
 
 export const api = {
   async getBookings(): Promise<BookingDetails[]> {
@@ -73,38 +82,86 @@ export const api = {
     return response.json();
   },
 
-  async *chatStream(message: string, chatId: string): AsyncGenerator<string> {
-    const response = await fetch(`${API_BASE}/chat/stream`, {
-      method: 'POST',
-      headers: { 'Content-Type': 'application/json' },
-      body: JSON.stringify({ message, chat_id: chatId })
+  async getSeatMap(date: string, fromAirport: string, toAirport: string): Promise<SeatMap> {
+    const path = [date, fromAirport, toAirport].map(encodeURIComponent).join('/');
+    const response = await fetch(`${API_BASE}/flights/${path}/seats`);
+    if (!response.ok) throw new Error('Failed to fetch seat map');
+    return response.json();
+  },
+
+  async clearChat(chatId: string): Promise<void> {
+    // keepalive lets the request finish while the page is unloading
+    await fetch(`${API_BASE}/chat/${encodeURIComponent(chatId)}`, {
+      method: 'DELETE',
+      keepalive: true
     });
+  },
 
-    if (!response.ok) {
-      throw new Error('Failed to get chat response');
-    }
+  async *chatStream(message: string, chatId: string): AsyncGenerator<string> {
+    // Id of the last frame received; a reconnect sends it to resume the same reply
+    let lastEventId: string | null = null;
+    for (let reconnects = 0; ; reconnects++) {
+      const headers: Record<string, string> = { 'Content-Type': 'application/json' };
+      if (lastEventId) headers['Last-Event-ID'] = lastEventId;
 
-    const reader = response.body?.getReader();
-    if (!reader) return;
+      let reader: ReadableStreamDefaultReader<Uint8Array> | undefined;
+      try {
+        const response = await fetch(`${API_BASE}/chat/stream`, {
+          method: 'POST',
+          headers,
+          body: JSON.stringify({ message, chat_id: chatId })
+        });
+        if (response.status === 429) {
+          throw new ChatBusyError(Number(response.headers.get('Retry-After')) || 1);
+        }
+        if (!response.ok) {
+          throw new Error('Failed to get chat response');
+        }
+        reader = response.body?.getReader();
+      } catch (error) {
+        // Only network failures (TypeError) are retried, and only with a frame id to resume
+        // from: sending the message again would start a new reply
+        if (!(error instanceof TypeError) || !lastEventId || reconnects >= MAX_STREAM_RECONNECTS) throw error;
+      }
 
-    const decoder = new TextDecoder();
-    while (true) {
-      const { done, value } = await reader.read();
-      if (done) break;
-      const chunk = decoder.decode(value);
-      const lines = chunk.split('\n');
-      for (const line of lines) {
-        if (line.startsWith('data: ')) {
-          const data = line.slice(6);
-          if (data === '[DONE]') return;
-          try {
-            const { chunk: content } = JSON.parse(data);
-            if (content) yield content;
-          } catch (e) {
-            // Skip invalid JSON
+      if (reader) {
+        const decoder = new TextDecoder();
+        let buffer = '';
+        let eventId: string | null = null;
+        try {
+          while (true) {
+            const { done, value } = await reader.read();
+            if (done) break;
+            // Token streaming sends many small frames; keep a partial line for the next read
+            buffer += decoder.decode(value, { stream: true });
+            const lines = buffer.split('\n');
+            buffer = lines.pop() ?? '';
+            for (const line of lines) {
+              if (line.startsWith('id: ')) {
+                eventId = line.slice(4);
+              } else if (line.startsWith('data: ')) {
+                let content: string | undefined;
+                try {
+                  content = JSON.parse(line.slice(6)).chunk;
+                } catch (e) {
+                  // Skip invalid JSON
+                }
+                lastEventId = eventId ?? lastEventId;
+                if (content === '[DONE]') return;
+                if (content) yield content;
+              }
+            }
           }
+        } catch (error) {
+          // Connection dropped mid-reply: fall through and resume it
+          if (!lastEventId || reconnects >= MAX_STREAM_RECONNECTS) throw error;
         }
       }
+
+      if (!lastEventId || reconnects >= MAX_STREAM_RECONNECTS) {
+        throw new Error('Chat stream interrupted');
+      }
+      await new Promise(resolve => setTimeout(resolve, STREAM_RECONNECT_DELAY_MS * (reconnects + 1)));
     }
   }
 };
@@ -23,4 +23,16 @@ export interface SeatInfo {
   row: number;
   letter: string;
   isSelected: boolean;
+  isTaken: boolean;
+}
+
+export interface SeatMap {
+  date: string;
+  from_airport: string;
+  to_airport: string;
+  rows: number;
+  letters: string;
+  available: number;
+  occupied: string[];
+  held: string[];
 }